@@ -0,0 +1,4 @@
+"""Benchmarks for the Xiaozhi integration hot paths.
+
+Run from the repository root, e.g. ``python -m benchmarks.bench_codec``.
+"""
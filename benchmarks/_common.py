@@ -0,0 +1,55 @@
+"""Shared helpers for the benchmark scripts."""
+
+from __future__ import annotations
+
+import importlib
+import math
+import statistics
+import struct
+import sys
+import types
+from pathlib import Path
+from types import ModuleType
+
+INTEGRATION_DIR = Path(__file__).resolve().parent.parent / "custom_components" / "xiaozhi"
+
+_PACKAGE = "xiaozhi_bench"
+
+
+def load(module: str) -> ModuleType:
+    """Import an integration module without running the package __init__.
+
+    The integration package imports Home Assistant on load; the audio and
+    model modules do not, so benchmarks can run without HA installed.
+    """
+    if _PACKAGE not in sys.modules:
+        pkg = types.ModuleType(_PACKAGE)
+        pkg.__path__ = [str(INTEGRATION_DIR)]
+        sys.modules[_PACKAGE] = pkg
+    return importlib.import_module(f"{_PACKAGE}.{module}")
+
+
+def sine_pcm(seconds: float, sample_rate: int, freq: float = 440.0) -> bytes:
+    """Generate a mono s16le sine tone (voice-band stand-in)."""
+    n = int(seconds * sample_rate)
+    step = 2 * math.pi * freq / sample_rate
+    samples = [int(12000 * math.sin(i * step)) for i in range(n)]
+    return struct.pack(f"<{n}h", *samples)
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Return the pct-th percentile (nearest rank) of values."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    idx = max(0, math.ceil(pct / 100 * len(ordered)) - 1)
+    return ordered[idx]
+
+
+def summarize(values: list[float]) -> str:
+    """Format mean/p50/p95 of millisecond values."""
+    return (
+        f"mean={statistics.fmean(values):8.2f} ms  "
+        f"p50={percentile(values, 50):8.2f} ms  "
+        f"p95={percentile(values, 95):8.2f} ms"
+    )
@@ -0,0 +1,202 @@
+"""Allocations and peak memory of one reply's audio path: lists vs arena.
+
+Follows a reply's opus packets from the socket to the OGG muxer, as a voice
+turn does: unpack each binary frame, append it to the session, hand the
+packets to the pipeline cache and mux them for the TTS entity. The legacy
+path (bytes slices in lists, a list copy for the cache, page-by-page muxing)
+is kept here as the "before" baseline; the current path uses
+unpack_audio_frame's views, an AudioArena and the single-buffer muxer.
+
+tracemalloc counts the bytes allocated along the way, the peak, and what is
+still held once the cache owns the reply.
+
+    python -m benchmarks.bench_arena --reply-seconds 60
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import random
+import struct
+import time
+import tracemalloc
+from collections.abc import Callable
+from typing import Any
+
+from ._common import load
+
+arena = load("arena")
+audio = load("audio")
+const = load("const")
+
+_FRAME_HEADER = struct.Struct(">BBH")
+
+# ---------------------------------------------------------------------------
+# Legacy implementation (before the audio arena)
+# ---------------------------------------------------------------------------
+
+
+def _legacy_unpack(data: bytes) -> bytes | None:
+    if len(data) < _FRAME_HEADER.size:
+        return None
+    frame_type, _, size = _FRAME_HEADER.unpack_from(data)
+    if frame_type != const.BINARY_FRAME_TYPE_AUDIO:
+        return None
+    payload = data[_FRAME_HEADER.size : _FRAME_HEADER.size + size]
+    if len(payload) != size:
+        return None
+    return payload
+
+
+def _legacy_page(
+    serial: int, page_seq: int, granule: int, flags: int, packets: list[bytes]
+) -> bytes:
+    segment_table = b"".join([audio._lacing(len(packet)) for packet in packets])
+    page = bytearray(
+        struct.pack(
+            "<4sBBqIIIB", b"OggS", 0, flags, granule, serial, page_seq, 0,
+            len(segment_table),
+        )
+    )
+    page += segment_table
+    page += b"".join(packets)
+    struct.pack_into("<I", page, 22, audio._ogg_crc32(page))
+    return bytes(page)
+
+
+def _legacy_stream(packets: list[bytes], sample_rate: int, channels: int) -> bytes:
+    serial = 0x58495A48
+    opus_head = struct.pack("<8sBBHIhB", b"OpusHead", 1, channels, 312, sample_rate, 0, 0)
+    vendor = b"xiaozhi"
+    opus_tags = struct.pack("<8sI", b"OpusTags", len(vendor)) + vendor + struct.pack("<I", 0)
+    headers = _legacy_page(serial, 0, 0, 0x02, [opus_head]) + _legacy_page(
+        serial, 1, 0, 0, [opus_tags]
+    )
+    out: list[bytes] = []
+    batch: list[bytes] = []
+    segments = 0
+    granule = 0
+    seq = 2
+    for packet in packets:
+        lacing_len = len(packet) // 255 + 1
+        if segments + lacing_len > 255:
+            out.append(_legacy_page(serial, seq, granule, 0, batch))
+            seq += 1
+            batch = []
+            segments = 0
+        batch.append(packet)
+        segments += lacing_len
+        granule += audio._opus_packet_samples(packet)
+    out.append(_legacy_page(serial, seq, granule, 0x04, batch))
+    return headers + b"".join(out)
+
+
+def _decode(packet: bytes | memoryview) -> None:
+    """Stand-in for the decoder, which consumes each packet as it arrives."""
+
+
+def _legacy_turn(frames: Callable[[], Any]) -> tuple[list[bytes], bytes]:
+    session_chunks: list[bytes] = []
+    for frame in frames():
+        payload = _legacy_unpack(frame)
+        if payload is not None:
+            session_chunks.append(payload)
+            _decode(payload)
+    cached = list(session_chunks)
+    ogg = _legacy_stream(cached, const.AUDIO_SAMPLE_RATE_OUTPUT, const.AUDIO_CHANNELS)
+    return cached, ogg
+
+
+# ---------------------------------------------------------------------------
+# Current implementation
+# ---------------------------------------------------------------------------
+
+
+def _arena_turn(frames: Callable[[], Any]) -> tuple[Any, bytes]:
+    chunks = arena.AudioArena()
+    for frame in frames():
+        payload = audio.unpack_audio_frame(frame)
+        if payload is not None:
+            _decode(chunks.append(payload))
+    ogg = audio._build_ogg_opus_stream(
+        chunks, const.AUDIO_SAMPLE_RATE_OUTPUT, const.AUDIO_CHANNELS
+    )
+    return chunks, ogg
+
+
+# ---------------------------------------------------------------------------
+# Benchmark
+# ---------------------------------------------------------------------------
+
+
+def _synthetic_packets(seconds: float, frame_ms: int = 60) -> list[bytes]:
+    """Opus-shaped packets: SILK WB 60 ms TOC + random VBR-sized payload."""
+    rng = random.Random(0)
+    toc = bytes(((11 << 3) | 0,))  # config 11 = SILK WB 60 ms, code 0
+    count = int(seconds * 1000 / frame_ms)
+    return [toc + rng.randbytes(rng.randint(90, 250)) for _ in range(count)]
+
+
+def _measure(turn: Callable[[Callable[[], Any]], Any], packets: list[bytes]) -> dict[str, float]:
+    """Run one turn under tracemalloc; frames are built as the socket would."""
+
+    def _frames() -> Any:
+        # A fresh bytes object per frame, dropped once handled
+        for packet in packets:
+            yield audio.pack_audio_frame(packet)
+
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = turn(_frames)
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    # Blocks allocated during the turn and still alive (the result)
+    held_blocks = sum(
+        stat.count for stat in tracemalloc.take_snapshot().statistics("filename")
+    )
+    tracemalloc.stop()
+    del result
+    return {
+        "peak_kib": peak / 1024,
+        "held_kib": current / 1024,
+        "held_blocks": held_blocks,
+        "ms": elapsed * 1000,
+    }
+
+
+def main() -> None:
+    """Parse arguments and run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--reply-seconds", type=float, default=60.0)
+    args = parser.parse_args()
+
+    packets = _synthetic_packets(args.reply_seconds)
+    payload = sum(len(p) for p in packets)
+    legacy_cached, legacy_ogg = _legacy_turn(
+        lambda: (audio.pack_audio_frame(p) for p in packets)
+    )
+    arena_cached, arena_ogg = _arena_turn(
+        lambda: (audio.pack_audio_frame(p) for p in packets)
+    )
+    assert legacy_ogg == arena_ogg, "OGG streams differ"
+    assert [bytes(p) for p in arena_cached] == legacy_cached, "packets differ"
+
+    print(
+        f"reply={args.reply_seconds}s: {len(packets)} packets, "
+        f"{payload / 1024:.1f} KiB payload, {len(arena_ogg) / 1024:.1f} KiB OGG"
+    )
+    before = _measure(_legacy_turn, packets)
+    after = _measure(_arena_turn, packets)
+    for key, label in (
+        ("peak_kib", "peak traced KiB"),
+        ("held_kib", "held KiB (cache + OGG)"),
+        ("held_blocks", "held blocks"),
+        ("ms", "time ms (traced)"),
+    ):
+        print(f"  {label:<24} before={before[key]:10.1f}  after={after[key]:10.1f}")
+
+
+if __name__ == "__main__":
+    main()
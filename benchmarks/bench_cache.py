@@ -0,0 +1,279 @@
+"""PipelineCacheManager at scale: linear scans vs indexes and expiry heap.
+
+Fills the cache with --collectors outstanding voice collectors (a tenth of
+them with a live voice session) plus as many cached turns, then times each
+operation against that state. The legacy manager (collector queues and the
+response index scanned on fail, expiry and live-session lookup) is kept
+here as the "before" baseline.
+
+create_collector and complete_collector come out a few µs slower than the
+baseline (an expiry heap push and the index upkeep per call); that is the
+price of fail, expiry and live-session lookup no longer scanning.
+
+    python -m benchmarks.bench_cache --collectors 10000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import gc
+import time
+from collections import OrderedDict, deque
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from ._common import load
+
+arena = load("arena")
+models = load("models")
+
+# ---------------------------------------------------------------------------
+# Legacy implementation (before the reverse indexes and expiry heap)
+# ---------------------------------------------------------------------------
+
+
+class _LegacyCacheManager:
+    def __init__(self, ttl: float, max_bytes: int, max_entries: int) -> None:
+        self._cache: OrderedDict[str, Any] = OrderedDict()
+        self._by_age: dict[str, Any] = {}
+        self._response_index: dict[str, str] = {}
+        self._collectors: dict[str, deque[Any]] = {}
+        self._ttl = ttl
+        self._max_bytes = max_bytes
+        self._max_entries = max_entries
+        self._bytes = 0
+        self._lock = asyncio.Lock()
+        self._expiry_handle: asyncio.TimerHandle | None = None
+        self.evictions = 0
+        self.expirations = 0
+
+    def close(self) -> None:
+        if self._expiry_handle is not None:
+            self._expiry_handle.cancel()
+            self._expiry_handle = None
+
+    async def create_collector(self, stt_text: str, session: Any = None) -> Any:
+        async with self._lock:
+            collector = models.PipelineResultCollector(stt_text, session)
+            if stt_text not in self._collectors:
+                self._collectors[stt_text] = deque()
+            self._collectors[stt_text].append(collector)
+            self._schedule_expiry()
+            return collector
+
+    async def find_live_session(self, response_text: str) -> Any:
+        text = response_text.strip()
+        if not text:
+            return None
+        async with self._lock:
+            for q in self._collectors.values():
+                for collector in q:
+                    session = collector.session
+                    if (
+                        session is not None
+                        and not collector.ready.is_set()
+                        and session.response_text.startswith(text)
+                    ):
+                        return session
+            return None
+
+    async def complete_collector(
+        self, stt_text: str, response_text: str, audio_chunks: Any
+    ) -> None:
+        async with self._lock:
+            q = self._collectors.get(stt_text)
+            if q:
+                collector = q.popleft()
+                collector.complete(response_text, audio_chunks)
+                if not q:
+                    del self._collectors[stt_text]
+            self._store_locked(stt_text, response_text, audio_chunks)
+
+    async def fail_collector(self, stt_text: str) -> None:
+        async with self._lock:
+            q = self._collectors.get(stt_text)
+            if q:
+                collector = q.popleft()
+                collector.fail()
+                if not q:
+                    del self._collectors[stt_text]
+            keys_to_remove = [k for k, v in self._response_index.items() if v == stt_text]
+            for k in keys_to_remove:
+                del self._response_index[k]
+
+    async def store(self, stt_text: str, response_text: str, audio_chunks: Any) -> None:
+        async with self._lock:
+            self._store_locked(stt_text, response_text, audio_chunks)
+
+    def _store_locked(self, stt_text: str, response_text: str, audio_chunks: Any) -> None:
+        entry = models.PipelineCache(
+            stt_text=stt_text, response_text=response_text, audio_chunks=audio_chunks
+        )
+        self._remove_locked(stt_text)
+        self._cache[stt_text] = entry
+        self._by_age[stt_text] = entry
+        self._response_index[response_text] = stt_text
+        self._bytes += entry.nbytes
+        while len(self._cache) > 1 and (
+            self._bytes > self._max_bytes or len(self._cache) > self._max_entries
+        ):
+            self._remove_locked(next(iter(self._cache)))
+            self.evictions += 1
+        self._schedule_expiry()
+
+    def _remove_locked(self, stt_text: str) -> Any:
+        entry = self._cache.pop(stt_text, None)
+        if entry is None:
+            return None
+        del self._by_age[stt_text]
+        if self._response_index.get(entry.response_text) == stt_text:
+            del self._response_index[entry.response_text]
+        self._bytes -= entry.nbytes
+        return entry
+
+    def _schedule_expiry(self) -> None:
+        if self._expiry_handle is not None:
+            return
+        oldest = [q[0].created_at for q in self._collectors.values() if q]
+        if self._by_age:
+            oldest.append(next(iter(self._by_age.values())).created_at)
+        if not oldest:
+            return
+        delay = max(min(oldest) + self._ttl - time.monotonic(), 0)
+        self._expiry_handle = asyncio.get_running_loop().call_later(
+            delay, self._expire
+        )
+
+    def _expire(self) -> None:
+        self._expiry_handle = None
+        deadline = time.monotonic() - self._ttl
+        while self._by_age:
+            stt_text, entry = next(iter(self._by_age.items()))
+            if entry.created_at > deadline:
+                break
+            self._remove_locked(stt_text)
+            self.expirations += 1
+        expired_keys: list[str] = []
+        for k, q in self._collectors.items():
+            while q and q[0].created_at <= deadline:
+                q[0].fail()
+                q.popleft()
+            if not q:
+                expired_keys.append(k)
+        for k in expired_keys:
+            del self._collectors[k]
+        self._schedule_expiry()
+
+
+# ---------------------------------------------------------------------------
+# Benchmark
+# ---------------------------------------------------------------------------
+
+# Far beyond the benchmark's duration, so nothing expires on its own
+_TTL = 3600.0
+
+
+async def _fill(
+    factory: Callable[..., Any], collectors: int
+) -> tuple[Any, list[tuple[int, str]]]:
+    """Return a cache with outstanding collectors and as many cached turns.
+
+    Also returns (collector number, response) of the live sessions.
+    """
+    cache = factory(ttl=_TTL, max_bytes=1 << 40, max_entries=2 * collectors)
+    audio_chunks = arena.AudioArena.from_packets([b"\xf8" * 120] * 10)
+    responses = []
+    for i in range(collectors):
+        session = None
+        if i % 10 == 0:
+            session = models.VoicePipelineSession()
+            session.response_chunks.append(f"Live reply number {i}.")
+        await cache.create_collector(f"pending request {i}", session)
+        await cache.store(f"cached request {i}", f"Cached reply {i}.", audio_chunks)
+        if session is not None:
+            responses.append((i, f"Live reply number {i}."))
+    return cache, responses
+
+
+async def _time(ops: int, op: Callable[[int], Awaitable[Any] | Any]) -> float:
+    """Run op(0..ops-1) and return µs per call (without GC pauses, as timeit)."""
+    gc.collect()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        for i in range(ops):
+            result = op(i)
+            if asyncio.iscoroutine(result):
+                await result
+        return (time.perf_counter() - start) / ops * 1e6
+    finally:
+        gc.enable()
+
+
+async def _measure(factory: Callable[..., Any], collectors: int, ops: int) -> dict[str, float]:
+    cache, live = await _fill(factory, collectors)
+    audio_chunks = arena.AudioArena.from_packets([b"\xf8" * 120] * 10)
+    results: dict[str, float] = {}
+
+    async def _create(i: int) -> None:
+        await cache.create_collector(f"new request {i}")
+
+    results["create_collector"] = await _time(ops, _create)
+
+    async def _complete(i: int) -> None:
+        await cache.complete_collector(
+            f"new request {i}", f"New reply {i}.", audio_chunks
+        )
+
+    results["complete_collector"] = await _time(ops, _complete)
+
+    async def _fail(i: int) -> None:
+        await cache.fail_collector(f"pending request {i}")
+
+    results["fail_collector"] = await _time(ops, _fail)
+
+    # The newest live sessions are found last by a scan; _fail removed
+    # collectors 0..ops-1
+    targets = [response for i, response in live if i >= ops][-ops:]
+
+    async def _find(i: int) -> None:
+        assert await cache.find_live_session(targets[i % len(targets)]) is not None
+
+    results["find_live_session"] = await _time(ops, _find)
+
+    def _expire(_: int) -> None:
+        # One timer run with nothing due, as when the timer fires for a
+        # turn that was already completed
+        cache._expire()
+        cache.close()
+
+    results["expiry timer run"] = await _time(ops, _expire)
+    cache.close()
+    return results
+
+
+async def _main(args: argparse.Namespace) -> None:
+    print(
+        f"{args.collectors} outstanding collectors "
+        f"({args.collectors // 10} live sessions), {args.collectors} cached turns"
+    )
+    before = await _measure(_LegacyCacheManager, args.collectors, args.ops)
+    after = await _measure(models.PipelineCacheManager, args.collectors, args.ops)
+    for name, value in before.items():
+        print(
+            f"  {name:<22} before={value:10.2f} µs  after={after[name]:8.2f} µs"
+            f"  ({value / after[name]:.1f}x)"
+        )
+
+
+def main() -> None:
+    """Parse arguments and run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--collectors", type=int, default=10_000)
+    parser.add_argument("--ops", type=int, default=200)
+    asyncio.run(_main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
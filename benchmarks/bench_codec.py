@@ -0,0 +1,167 @@
+"""Per-turn latency and CPU: in-process libopus vs FFmpeg subprocess.
+
+A "turn" is one uplink encode (speech PCM → opus packets, as the STT entity
+does) plus one downlink decode (opus reply → WAV, as the TTS entity does).
+
+    python -m benchmarks.bench_codec --turns 20 --concurrency 4 --ffmpeg-pool 2
+
+With --ffmpeg-pool N the FFmpeg backend is also measured with N pre-warmed
+workers per command line (FFmpegWorkerPool).
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import resource
+import shutil
+import time
+from collections.abc import AsyncIterator
+
+from ._common import load, sine_pcm, summarize
+
+audio = load("audio")
+const = load("const")
+ffmpeg_pool = load("ffmpeg_pool")
+
+# HA delivers microphone audio in small chunks; 1024 samples is typical
+_CHUNK_BYTES = 2048
+
+
+async def _pcm_chunks(pcm: bytes) -> AsyncIterator[bytes]:
+    for i in range(0, len(pcm), _CHUNK_BYTES):
+        yield pcm[i : i + _CHUNK_BYTES]
+
+
+async def _turn(
+    backend: str, speech: bytes, reply: list[bytes], pool: object | None
+) -> tuple[float, float, float]:
+    """Run one turn; return (first uplink packet, uplink total, decode) in ms."""
+    start = time.perf_counter()
+    first = 0.0
+    async for _ in audio.pcm_to_opus_frames(
+        _pcm_chunks(speech), backend=backend, pool=pool
+    ):
+        if not first:
+            first = time.perf_counter()
+    uplink_done = time.perf_counter()
+
+    wav = await audio.opus_frames_to_wav(reply, backend=backend, pool=pool)
+    decode_done = time.perf_counter()
+    assert wav, f"{backend}: decode failed"
+
+    return (
+        (first - start) * 1000,
+        (uplink_done - start) * 1000,
+        (decode_done - uplink_done) * 1000,
+    )
+
+
+def _cpu_seconds() -> tuple[float, float]:
+    """Return (this process, reaped children) CPU seconds."""
+    own = resource.getrusage(resource.RUSAGE_SELF)
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return (
+        own.ru_utime + own.ru_stime,
+        children.ru_utime + children.ru_stime,
+    )
+
+
+async def _bench(
+    backend: str,
+    args: argparse.Namespace,
+    speech: bytes,
+    reply: list[bytes],
+    pool: object | None = None,
+) -> None:
+    # Warm up (library load, first process spawn)
+    await _turn(backend, speech, reply, pool)
+
+    firsts: list[float] = []
+    uplinks: list[float] = []
+    decodes: list[float] = []
+    own_before, children_before = _cpu_seconds()
+    wall_start = time.perf_counter()
+
+    remaining = args.turns
+    while remaining > 0:
+        batch = min(args.concurrency, remaining)
+        results = await asyncio.gather(
+            *(_turn(backend, speech, reply, pool) for _ in range(batch))
+        )
+        for first, uplink, decode in results:
+            firsts.append(first)
+            uplinks.append(uplink)
+            decodes.append(decode)
+        remaining -= batch
+
+    wall = time.perf_counter() - wall_start
+    own_after, children_after = _cpu_seconds()
+    own_cpu = (own_after - own_before) * 1000 / args.turns
+    child_cpu = (children_after - children_before) * 1000 / args.turns
+
+    label = f"{backend}+pool({pool.size})" if pool else backend
+    print(f"\n[{label}] {args.turns} turns, concurrency={args.concurrency}, wall={wall:.2f}s")
+    print(f"  first uplink packet  {summarize(firsts)}")
+    print(f"  uplink encode total  {summarize(uplinks)}")
+    print(f"  reply decode → WAV   {summarize(decodes)}")
+    print(f"  CPU per turn         self={own_cpu:.1f} ms  subprocesses={child_cpu:.1f} ms")
+    if pool:
+        print(f"  pool stats           {pool.stats}")
+
+
+async def _main(args: argparse.Namespace) -> None:
+    backends = []
+    if load("codec").libopus_available():
+        backends.append(const.CODEC_BACKEND_LIBOPUS)
+    else:
+        print("libopus not found — skipping in-process backend")
+    if shutil.which("ffmpeg"):
+        backends.append(const.CODEC_BACKEND_FFMPEG)
+    else:
+        print("ffmpeg not on PATH — skipping FFmpeg backend")
+    if not backends:
+        raise SystemExit("No codec backend available")
+
+    speech = sine_pcm(args.speech_seconds, const.AUDIO_SAMPLE_RATE_INPUT)
+    reply_pcm = sine_pcm(args.reply_seconds, const.AUDIO_SAMPLE_RATE_OUTPUT, freq=220.0)
+    reply = [
+        packet
+        async for packet in audio.pcm_to_opus_frames(
+            _pcm_chunks(reply_pcm),
+            sample_rate=const.AUDIO_SAMPLE_RATE_OUTPUT,
+            backend=backends[0],
+        )
+    ]
+    print(
+        f"speech={args.speech_seconds}s @16 kHz, "
+        f"reply={args.reply_seconds}s ({len(reply)} opus packets)"
+    )
+
+    for backend in backends:
+        await _bench(backend, args, speech, reply)
+
+    if args.ffmpeg_pool and const.CODEC_BACKEND_FFMPEG in backends:
+        pool = ffmpeg_pool.FFmpegWorkerPool(args.ffmpeg_pool)
+        await pool.async_start(
+            prewarm=[audio.ffmpeg_encoder_args(), audio.ffmpeg_decoder_args()]
+        )
+        try:
+            await _bench(const.CODEC_BACKEND_FFMPEG, args, speech, reply, pool)
+        finally:
+            await pool.async_stop()
+
+
+def main() -> None:
+    """Parse arguments and run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--speech-seconds", type=float, default=3.0)
+    parser.add_argument("--reply-seconds", type=float, default=8.0)
+    parser.add_argument("--ffmpeg-pool", type=int, default=0, metavar="N")
+    asyncio.run(_main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,460 @@
+"""Microbenchmarks for the per-frame and per-turn hot paths.
+
+Covers binary frame pack/unpack, the OGG muxer and parser, the pipeline
+cache under thousands of keys, and MCP tools/call dispatch for every
+built-in tool against a stub hass with many entities.
+
+    python -m benchmarks.bench_hotpaths --json results.json
+    python -m benchmarks.bench_hotpaths --compare results.json --threshold 20
+
+Results are per-operation times (best of --repeat runs). --json saves them
+so a later run (e.g. the next release) can --compare against them; the
+exit status is 1 if any benchmark regressed by more than --threshold %.
+The MCP benchmarks need Home Assistant installed and are skipped otherwise.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+from unittest import mock
+
+from ._common import load
+
+arena = load("arena")
+audio = load("audio")
+const = load("const")
+models = load("models")
+
+# One 60 ms voice packet is ~120 bytes at the server's bitrate
+_PACKET_BYTES = 120
+_PACKETS_PER_SECOND = 1000 // const.AUDIO_FRAME_DURATION_MS
+
+
+@dataclass
+class _Result:
+    name: str
+    per_op_us: float
+    ops: int
+
+    @property
+    def ops_per_s(self) -> float:
+        return 1e6 / self.per_op_us if self.per_op_us else 0.0
+
+
+class _Runner:
+    """Times benchmarks and collects their results."""
+
+    def __init__(self, args: argparse.Namespace) -> None:
+        self._args = args
+        self.results: list[_Result] = []
+
+    def _wanted(self, name: str) -> bool:
+        return not self._args.only or any(part in name for part in self._args.only)
+
+    def _record(self, name: str, best: float, ops: int) -> None:
+        result = _Result(name, best * 1e6 / ops, ops)
+        self.results.append(result)
+        print(f"  {name:<42} {result.per_op_us:12.3f} µs/op  {result.ops_per_s:14,.0f} ops/s")
+
+    def bench(self, name: str, func: Callable[[], object], number: int) -> None:
+        """Time number calls of func, best of repeat."""
+        if not self._wanted(name):
+            return
+        best = float("inf")
+        for _ in range(self._args.repeat):
+            start = time.perf_counter()
+            for _ in range(number):
+                func()
+            best = min(best, time.perf_counter() - start)
+        self._record(name, best, number)
+
+    async def bench_async(
+        self,
+        name: str,
+        run: Callable[[], Awaitable[int]],
+        setup: Callable[[], Awaitable[None]] | None = None,
+    ) -> None:
+        """Time run(), which returns how many operations it did; best of repeat.
+
+        setup, if given, runs untimed before every repetition.
+        """
+        if not self._wanted(name):
+            return
+        best = float("inf")
+        ops = 1
+        for _ in range(self._args.repeat):
+            if setup is not None:
+                await setup()
+            start = time.perf_counter()
+            ops = await run()
+            best = min(best, time.perf_counter() - start)
+        self._record(name, best, ops)
+
+
+# ---------------------------------------------------------------------------
+# Audio framing and OGG
+# ---------------------------------------------------------------------------
+
+
+def _packets(seconds: float, rng: random.Random) -> list[bytes]:
+    return [
+        # Valid TOC byte; the muxer never looks at the payload
+        bytes((0xF8,)) + rng.randbytes(_PACKET_BYTES - 1)
+        for _ in range(int(seconds * _PACKETS_PER_SECOND))
+    ]
+
+
+async def _bench_audio(runner: _Runner, args: argparse.Namespace) -> None:
+    rng = random.Random(0)
+    packets = _packets(args.reply_seconds, rng)
+    packet = packets[0]
+    frame = audio.pack_audio_frame(packet)
+    page_packets = packets[:50]
+    page = audio._build_ogg_page(1, 2, 0, 0, page_packets)
+    stream = audio._build_ogg_opus_stream(
+        packets, const.AUDIO_SAMPLE_RATE_OUTPUT, const.AUDIO_CHANNELS
+    )
+    print(
+        f"\naudio: {len(packets)} packets ({args.reply_seconds}s reply), "
+        f"page {len(page)} B, stream {len(stream)} B"
+    )
+
+    runner.bench("pack_audio_frame", lambda: audio.pack_audio_frame(packet), 100_000)
+    runner.bench("unpack_audio_frame", lambda: audio.unpack_audio_frame(frame), 100_000)
+    runner.bench("_ogg_crc32 (page)", lambda: audio._ogg_crc32(page), 10_000)
+    runner.bench(
+        "_build_ogg_page (50 packets)",
+        lambda: audio._build_ogg_page(1, 2, 0, 0, page_packets),
+        5_000,
+    )
+    runner.bench(
+        "_build_ogg_opus_stream (reply)",
+        lambda: audio._build_ogg_opus_stream(
+            packets, const.AUDIO_SAMPLE_RATE_OUTPUT, const.AUDIO_CHANNELS
+        ),
+        200,
+    )
+
+    async def _parse() -> int:
+        for _ in range(50):
+            reader = asyncio.StreamReader()
+            reader.feed_data(stream)
+            reader.feed_eof()
+            count = 0
+            async for _packet in audio._parse_ogg_opus_packets(reader):
+                count += 1
+            assert count == len(packets), count
+        return 50
+
+    await runner.bench_async("_parse_ogg_opus_packets (reply)", _parse)
+
+
+# ---------------------------------------------------------------------------
+# Pipeline cache
+# ---------------------------------------------------------------------------
+
+
+async def _bench_cache(runner: _Runner, args: argparse.Namespace) -> None:
+    keys = args.keys
+    inputs = [f"turn on the light number {i}" for i in range(keys)]
+    responses = [f"Done, light number {i} is on." for i in range(keys)]
+    audio_chunks = arena.AudioArena.from_packets([b"\xf8" * _PACKET_BYTES] * 10)
+    print(f"\npipeline cache: {keys} keys")
+
+    def _new_cache() -> Any:
+        # Bounds above the key count, so nothing is evicted while timing
+        return models.PipelineCacheManager(max_bytes=1 << 40, max_entries=keys)
+
+    cache = _new_cache()
+
+    async def _reset() -> None:
+        nonlocal cache
+        cache.close()
+        cache = _new_cache()
+
+    async def _create_complete() -> int:
+        for stt_text, response in zip(inputs, responses):
+            await cache.create_collector(stt_text)
+            await cache.complete_collector(stt_text, response, audio_chunks)
+        return keys
+
+    await runner.bench_async("cache create+complete_collector", _create_complete, _reset)
+
+    async def _fill() -> None:
+        await _reset()
+        for stt_text, response in zip(inputs, responses):
+            await cache.store(stt_text, response, audio_chunks)
+
+    async def _get_by_input() -> int:
+        for stt_text in inputs:
+            await cache.get_by_input(stt_text)
+        return keys
+
+    async def _get_by_response() -> int:
+        for response in responses:
+            assert await cache.get_by_response(response) is not None
+        return keys
+
+    await runner.bench_async("cache get_by_input", _get_by_input, _fill)
+    await runner.bench_async("cache get_by_response (pop)", _get_by_response, _fill)
+
+    # Streaming TTS scans in-flight voice sessions; keep a tenth of keys live
+    live = max(keys // 10, 1)
+
+    async def _fill_live() -> None:
+        await _reset()
+        for stt_text, response in zip(inputs[:live], responses[:live]):
+            session = models.VoicePipelineSession()
+            session.response_chunks.append(response)
+            await cache.create_collector(stt_text, session)
+
+    # The newest sessions are found last
+    targets = responses[max(live - 100, 0) : live]
+
+    async def _find_live() -> int:
+        for response in targets:
+            assert await cache.find_live_session(response) is not None
+        return len(targets)
+
+    await runner.bench_async(
+        f"cache find_live_session ({live} live)", _find_live, _fill_live
+    )
+
+
+# ---------------------------------------------------------------------------
+# MCP dispatch
+# ---------------------------------------------------------------------------
+
+
+class _State:
+    __slots__ = ("attributes", "entity_id", "last_changed", "state")
+
+    def __init__(self, entity_id: str, state: str, attributes: dict[str, Any]) -> None:
+        self.entity_id = entity_id
+        self.state = state
+        self.attributes = attributes
+        self.last_changed = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+class _States:
+    def __init__(self, states: list[_State]) -> None:
+        self._states = {state.entity_id: state for state in states}
+
+    def get(self, entity_id: str) -> _State | None:
+        return self._states.get(entity_id)
+
+    def async_all(self) -> list[_State]:
+        return list(self._states.values())
+
+
+class _Services:
+    async def async_call(self, *args: Any, **kwargs: Any) -> None:
+        return None
+
+
+class _Bus:
+    def async_fire(self, event_type: str, event_data: dict[str, Any]) -> None:
+        return None
+
+
+class _StubHass:
+    """Just enough of HomeAssistant for the built-in MCP tools."""
+
+    def __init__(self, states: list[_State]) -> None:
+        self.states = _States(states)
+        self.services = _Services()
+        self.bus = _Bus()
+        self.data: dict[str, Any] = {}
+        self._history = {state.entity_id: [state] * 24 for state in states[:5]}
+
+    async def async_add_executor_job(self, func: Callable[..., Any], *args: Any) -> Any:
+        # Only the recorder history query runs in the executor
+        return self._history
+
+
+class _Entry:
+    def __init__(self, entry_id: str, name: str) -> None:
+        self.id = entry_id
+        self.entity_id = entry_id
+        self.name = name
+        self.name_by_user = None
+        self.original_name = name
+
+
+class _Index:
+    def __init__(self, by_area: dict[str, list[_Entry]]) -> None:
+        self._by_area = by_area
+
+    def get_devices_for_area_id(self, area_id: str) -> list[_Entry]:
+        return self._by_area.get(area_id, [])
+
+    get_entries_for_area_id = get_devices_for_area_id
+
+
+class _Registry:
+    def __init__(self, areas: list[_Entry], by_area: dict[str, list[_Entry]]) -> None:
+        self._areas = areas
+        self.devices = _Index(by_area)
+        self.entities = _Index(by_area)
+
+    def async_list_areas(self) -> list[_Entry]:
+        return self._areas
+
+
+def _stub_hass(entities: int) -> tuple[_StubHass, _Registry]:
+    domains = ["light", "switch", "sensor", "binary_sensor", "climate", "cover"]
+    states = [
+        _State(
+            f"{domains[i % len(domains)]}.entity_{i}",
+            "on" if i % 2 else "off",
+            {"friendly_name": f"Entity {i}", "brightness": i % 255},
+        )
+        for i in range(entities)
+    ]
+    areas = [_Entry(f"area_{i}", f"Area {i}") for i in range(50)]
+    by_area: dict[str, list[_Entry]] = {area.id: [] for area in areas}
+    for i, state in enumerate(states):
+        by_area[areas[i % len(areas)].id].append(_Entry(state.entity_id, state.entity_id))
+    return _StubHass(states), _Registry(areas, by_area)
+
+
+async def _bench_mcp(runner: _Runner, args: argparse.Namespace) -> None:
+    try:
+        mcp_handler = load("mcp_handler")
+    except ImportError as err:
+        print(f"\nMCP: skipped ({err}); install homeassistant to run it")
+        return
+
+    hass, registry = _stub_hass(args.entities)
+    handler = mcp_handler.MCPHandler(hass)
+    print(f"\nMCP: {args.entities} entities, 50 areas")
+    some = [f"light.entity_{i}" for i in range(0, 60, 6)]
+    calls: dict[str, dict[str, Any]] = {
+        "homeassistant_call_service": {
+            "domain": "light",
+            "service": "turn_on",
+            "target": {"entity_id": some[0]},
+        },
+        "homeassistant_get_states": {"entity_ids": some},
+        "homeassistant_list_entities": {"domain": "light"},
+        "homeassistant_get_history": {"entity_ids": some[:5], "hours": 24},
+        "homeassistant_get_areas": {"include_devices": True, "include_entities": True},
+        "homeassistant_fire_event": {"event_type": "xiaozhi_bench", "event_data": {}},
+        "homeassistant_execute_action": {"entity_id": "script.good_night"},
+    }
+
+    def _runner_for(request: dict[str, Any], number: int) -> Callable[[], Awaitable[int]]:
+        async def _run() -> int:
+            for _ in range(number):
+                response = await handler.handle_request(request)
+                assert response is not None and "error" not in response, response
+            return number
+
+        return _run
+
+    await runner.bench_async(
+        "mcp tools/list",
+        _runner_for({"jsonrpc": "2.0", "id": 1, "method": "tools/list"}, 1000),
+    )
+    with mock.patch(
+        "homeassistant.helpers.area_registry.async_get", return_value=registry
+    ), mock.patch(
+        "homeassistant.helpers.device_registry.async_get", return_value=registry
+    ), mock.patch(
+        "homeassistant.helpers.entity_registry.async_get", return_value=registry
+    ):
+        for name, arguments in calls.items():
+            label = f"mcp {name.removeprefix('homeassistant_')}"
+            if name == "homeassistant_get_history":
+                try:
+                    from homeassistant.components.recorder import history  # noqa: F401
+                except ImportError:
+                    print(f"  {label:<42} skipped (recorder not importable)")
+                    continue
+            heavy = name in ("homeassistant_list_entities", "homeassistant_get_areas")
+            request = {
+                "jsonrpc": "2.0",
+                "id": 1,
+                "method": "tools/call",
+                "params": {"name": name, "arguments": arguments},
+            }
+            await runner.bench_async(
+                label,
+                _runner_for(request, 5 if heavy else 1000),
+            )
+
+
+# ---------------------------------------------------------------------------
+# Results
+# ---------------------------------------------------------------------------
+
+
+def _compare(results: list[_Result], baseline_path: Path, threshold: float) -> bool:
+    """Print the change vs baseline; return True if anything regressed."""
+    baseline = json.loads(baseline_path.read_text())["results"]
+    regressed = False
+    print(f"\nvs {baseline_path} (threshold {threshold:.0f}%):")
+    for result in results:
+        before = baseline.get(result.name)
+        if before is None:
+            continue
+        change = (result.per_op_us / before["per_op_us"] - 1) * 100
+        flag = ""
+        if change > threshold:
+            flag = "  REGRESSION"
+            regressed = True
+        print(f"  {result.name:<42} {change:+7.1f}%{flag}")
+    return regressed
+
+
+async def _main(args: argparse.Namespace) -> int:
+    runner = _Runner(args)
+    await _bench_audio(runner, args)
+    await _bench_cache(runner, args)
+    await _bench_mcp(runner, args)
+
+    if args.json:
+        args.json.write_text(
+            json.dumps(
+                {
+                    "python": sys.version.split()[0],
+                    "results": {
+                        result.name: {"per_op_us": result.per_op_us, "ops": result.ops}
+                        for result in runner.results
+                    },
+                },
+                indent=2,
+            )
+        )
+        print(f"\nSaved {len(runner.results)} results to {args.json}")
+    if args.compare and _compare(runner.results, args.compare, args.threshold):
+        return 1
+    return 0
+
+
+def main() -> None:
+    """Parse arguments and run the benchmarks."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--only", action="append", metavar="TEXT", help="run matching benchmarks")
+    parser.add_argument("--reply-seconds", type=float, default=8.0)
+    parser.add_argument("--keys", type=int, default=5000, help="pipeline cache keys")
+    parser.add_argument("--entities", type=int, default=10_000, help="stub hass entities")
+    parser.add_argument("--json", type=Path, help="save results to this file")
+    parser.add_argument("--compare", type=Path, help="compare with saved results")
+    parser.add_argument("--threshold", type=float, default=20.0, metavar="PCT")
+    sys.exit(asyncio.run(_main(parser.parse_args())))
+
+
+if __name__ == "__main__":
+    main()
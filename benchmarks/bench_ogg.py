@@ -0,0 +1,159 @@
+"""OGG/Opus muxer throughput (MB/s): legacy per-byte CRC vs current muxer.
+
+The legacy implementation (one packet per page, pure-Python CRC loop) is
+kept here verbatim as the "before" baseline.
+
+    python -m benchmarks.bench_ogg --reply-seconds 30
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import struct
+import time
+from collections.abc import Callable
+
+from ._common import load
+
+audio = load("audio")
+const = load("const")
+
+# ---------------------------------------------------------------------------
+# Legacy implementation (before the multi-packet muxer)
+# ---------------------------------------------------------------------------
+
+_OGG_CRC_TABLE = [0] * 256
+for _i in range(256):
+    _r = _i << 24
+    for _ in range(8):
+        _r = ((_r << 1) ^ 0x04C11DB7) if _r & 0x80000000 else _r << 1
+    _OGG_CRC_TABLE[_i] = _r & 0xFFFFFFFF
+
+
+def _legacy_crc32(data: bytes) -> int:
+    crc = 0
+    for b in data:
+        crc = ((_legacy_crc32_lookup(crc, b))) & 0xFFFFFFFF
+    return crc
+
+
+def _legacy_crc32_lookup(crc: int, byte: int) -> int:
+    return ((crc << 8) ^ _OGG_CRC_TABLE[((crc >> 24) & 0xFF) ^ byte])
+
+
+def _legacy_build_page(
+    serial: int, page_seq: int, granule: int, flags: int, segments_data: list[bytes]
+) -> bytes:
+    segment_table = bytearray()
+    body = bytearray()
+    for seg in segments_data:
+        data_len = len(seg)
+        while data_len >= 255:
+            segment_table.append(255)
+            data_len -= 255
+        segment_table.append(data_len)
+        body.extend(seg)
+    header = struct.pack(
+        "<4sBBqIIIB", b"OggS", 0, flags, granule, serial, page_seq, 0, len(segment_table)
+    )
+    page_no_crc = header + bytes(segment_table) + bytes(body)
+    crc = _legacy_crc32(page_no_crc)
+    page = bytearray(page_no_crc)
+    struct.pack_into("<I", page, 22, crc)
+    return bytes(page)
+
+
+def _legacy_build_stream(opus_packets: list[bytes], sample_rate: int, channels: int) -> bytes:
+    serial = 0x58495A48
+    pages = []
+    opus_head = struct.pack("<8sBBHIhB", b"OpusHead", 1, channels, 312, sample_rate, 0, 0)
+    pages.append(_legacy_build_page(serial, 0, 0, 0x02, [opus_head]))
+    vendor = b"xiaozhi"
+    opus_tags = struct.pack("<8sI", b"OpusTags", len(vendor)) + vendor + struct.pack("<I", 0)
+    pages.append(_legacy_build_page(serial, 1, 0, 0, [opus_tags]))
+    granule = 0
+    for i, packet in enumerate(opus_packets):
+        granule += 960
+        flags = 0x04 if i == len(opus_packets) - 1 else 0
+        pages.append(_legacy_build_page(serial, i + 2, granule, flags, [packet]))
+    return b"".join(pages)
+
+
+# ---------------------------------------------------------------------------
+# Benchmark
+# ---------------------------------------------------------------------------
+
+
+def _synthetic_packets(seconds: float, frame_ms: int = 60) -> list[bytes]:
+    """Opus-shaped packets: SILK WB 60 ms TOC + random VBR-sized payload."""
+    rng = random.Random(0)
+    toc = bytes(((11 << 3) | 0,))  # config 11 = SILK WB 60 ms, code 0
+    count = int(seconds * 1000 / frame_ms)
+    return [toc + rng.randbytes(rng.randint(90, 250)) for _ in range(count)]
+
+
+def _throughput(fn: Callable[[], object], nbytes: int, min_time: float) -> float:
+    """Run fn repeatedly for at least min_time seconds; return MB/s."""
+    fn()
+    runs = 0
+    start = time.perf_counter()
+    while True:
+        fn()
+        runs += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return nbytes * runs / elapsed / 1e6
+
+
+def main() -> None:
+    """Parse arguments and run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--reply-seconds", type=float, default=30.0)
+    parser.add_argument("--min-time", type=float, default=1.0)
+    args = parser.parse_args()
+
+    packets = _synthetic_packets(args.reply_seconds)
+    payload = sum(len(p) for p in packets)
+    rate = const.AUDIO_SAMPLE_RATE_OUTPUT
+    channels = const.AUDIO_CHANNELS
+
+    blob = random.Random(1).randbytes(64 * 1024)
+    assert _legacy_crc32(blob) == audio._ogg_crc32(blob), "CRC mismatch"
+
+    legacy_stream = _legacy_build_stream(packets, rate, channels)
+    new_stream = audio._build_ogg_opus_stream(packets, rate, channels)
+
+    print(
+        f"reply={args.reply_seconds}s: {len(packets)} packets, "
+        f"{payload / 1024:.1f} KiB payload"
+    )
+    print(f"  stream size      before={len(legacy_stream)} B  after={len(new_stream)} B")
+
+    rows = [
+        (
+            "_ogg_crc32 (64 KiB)",
+            _throughput(lambda: _legacy_crc32(blob), len(blob), args.min_time),
+            _throughput(lambda: audio._ogg_crc32(blob), len(blob), args.min_time),
+        ),
+        (
+            "_build_ogg_opus_stream",
+            _throughput(
+                lambda: _legacy_build_stream(packets, rate, channels), payload, args.min_time
+            ),
+            _throughput(
+                lambda: audio._build_ogg_opus_stream(packets, rate, channels),
+                payload,
+                args.min_time,
+            ),
+        ),
+    ]
+    for name, before, after in rows:
+        print(
+            f"  {name:<24} before={before:9.2f} MB/s  after={after:9.2f} MB/s  "
+            f"({after / before:.0f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
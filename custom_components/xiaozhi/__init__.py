@@ -3,33 +3,61 @@
 from __future__ import annotations
 
 import logging
+import time
+from pathlib import Path
 
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.const import Platform
 from homeassistant.core import HomeAssistant
 from homeassistant.exceptions import ConfigEntryNotReady
 
-from .client import XiaozhiWebSocketClient
+from .audio import ffmpeg_decoder_args, ffmpeg_uplink_encoder_args
+from .client_pool import XiaozhiClientPool
+from .codec import libopus_available
 from .const import (
     CONF_ACCESS_TOKEN,
+    CONF_CACHE_MAX_AUDIO,
+    CONF_CACHE_MAX_ENTRIES,
     CONF_CLIENT_ID,
+    CONF_CONNECTION_POOL_SIZE,
     CONF_DEVICE_ID,
+    CONF_FFMPEG_POOL_SIZE,
     CONF_MCP_URL,
+    CONF_MQTT,
     CONF_PROTOCOL_VERSION,
+    CONF_RECORD_SESSIONS,
     CONF_RESPONSE_TIMEOUT,
     CONF_SERVER_URL,
+    CONF_TRANSPORT,
+    CONF_UPLINK_BITRATE_MAX,
+    CONF_UPLINK_BITRATE_MIN,
+    DEFAULT_CACHE_MAX_AUDIO,
+    DEFAULT_CACHE_MAX_ENTRIES,
+    DEFAULT_CONNECTION_POOL_SIZE,
+    DEFAULT_FFMPEG_POOL_SIZE,
     DEFAULT_PROTOCOL_VERSION,
+    DEFAULT_RECORD_SESSIONS,
     DEFAULT_RESPONSE_TIMEOUT,
+    DEFAULT_TRANSPORT,
+    DEFAULT_UPLINK_BITRATE_MAX,
+    DEFAULT_UPLINK_BITRATE_MIN,
     DOMAIN,
+    RECORDING_SUFFIX,
+    RECORDINGS_DIR,
+    TRANSPORT_MQTT_UDP,
+    TRANSPORT_WEBSOCKET,
 )
 from .custom_tools import register_custom_tools
+from .ffmpeg_pool import FFmpegWorkerPool
 from .mcp_client import MCPWebSocketClient
 from .mcp_handler import MCPHandler
-from .models import PipelineCacheManager, XiaozhiConfig
+from .metrics import TurnMetrics
+from .models import MqttConfig, PipelineCacheManager, XiaozhiConfig
+from .recorder import SessionRecorder
 
 _LOGGER = logging.getLogger(__name__)
 
-PLATFORMS = [Platform.CONVERSATION, Platform.STT, Platform.TTS]
+PLATFORMS = [Platform.CONVERSATION, Platform.SENSOR, Platform.STT, Platform.TTS]
 
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
@@ -37,6 +65,12 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     response_timeout = entry.options.get(
         CONF_RESPONSE_TIMEOUT, DEFAULT_RESPONSE_TIMEOUT
     )
+    transport = entry.options.get(CONF_TRANSPORT, DEFAULT_TRANSPORT)
+    mqtt_data = entry.data.get(CONF_MQTT)
+    mqtt = MqttConfig.from_dict(mqtt_data) if mqtt_data else None
+    if transport == TRANSPORT_MQTT_UDP and mqtt is None:
+        _LOGGER.warning("No MQTT credentials for this device, using WebSocket")
+        transport = TRANSPORT_WEBSOCKET
 
     config = XiaozhiConfig(
         server_url=entry.data[CONF_SERVER_URL],
@@ -48,12 +82,29 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
         ),
         response_timeout=response_timeout,
         language=hass.config.language,
+        transport=transport,
+        mqtt=mqtt,
+        uplink_bitrate_min=entry.options.get(
+            CONF_UPLINK_BITRATE_MIN, DEFAULT_UPLINK_BITRATE_MIN
+        ) * 1000,
+        uplink_bitrate_max=entry.options.get(
+            CONF_UPLINK_BITRATE_MAX, DEFAULT_UPLINK_BITRATE_MAX
+        ) * 1000,
     )
 
-    client = XiaozhiWebSocketClient(config)
+    client_pool = XiaozhiClientPool(
+        config,
+        entry.options.get(CONF_CONNECTION_POOL_SIZE, DEFAULT_CONNECTION_POOL_SIZE),
+    )
     mcp_handler = MCPHandler(hass)
-    cache = PipelineCacheManager()
-    client.set_mcp_handler(mcp_handler)
+    cache = PipelineCacheManager(
+        max_bytes=entry.options.get(CONF_CACHE_MAX_AUDIO, DEFAULT_CACHE_MAX_AUDIO)
+        * 1024 * 1024,
+        max_entries=entry.options.get(
+            CONF_CACHE_MAX_ENTRIES, DEFAULT_CACHE_MAX_ENTRIES
+        ),
+    )
+    client_pool.set_mcp_handler(mcp_handler)
 
     # Register user-defined custom tools from options
     custom_tools_cfg = entry.options.get("custom_tools", [])
@@ -61,9 +112,13 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
         count = register_custom_tools(hass, mcp_handler, custom_tools_cfg)
         _LOGGER.info("Loaded %d custom tool(s)", count)
 
+    if entry.options.get(CONF_RECORD_SESSIONS, DEFAULT_RECORD_SESSIONS):
+        await _async_start_recording(hass, entry, client_pool)
+
     try:
-        await client.connect()
+        await client_pool.connect()
     except Exception as err:
+        await client_pool.disconnect()
         raise ConfigEntryNotReady(
             f"Could not connect to Xiaozhi server: {err}"
         ) from err
@@ -77,12 +132,26 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
         except Exception:
             _LOGGER.warning("Could not connect to MCP endpoint: %s", mcp_url, exc_info=True)
 
+    # Pre-warm FFmpeg workers only when audio can't be handled in-process
+    ffmpeg_pool: FFmpegWorkerPool | None = None
+    if not await hass.async_add_executor_job(libopus_available):
+        ffmpeg_pool = FFmpegWorkerPool(
+            entry.options.get(CONF_FFMPEG_POOL_SIZE, DEFAULT_FFMPEG_POOL_SIZE)
+        )
+        await ffmpeg_pool.async_start(prewarm=[ffmpeg_decoder_args()])
+        # The encoders the adaptive uplink can pick for the next voice turn;
+        # the STT entity updates the set after every choice
+        ffmpeg_pool.set_warm(ffmpeg_uplink_encoder_args(client_pool.uplink_choices()))
+
     hass.data.setdefault(DOMAIN, {})
     hass.data[DOMAIN][entry.entry_id] = {
-        "client": client,
+        "client": client_pool.primary,
+        "client_pool": client_pool,
         "mcp_handler": mcp_handler,
         "mcp_client": mcp_ws_client,
         "cache": cache,
+        "ffmpeg_pool": ffmpeg_pool,
+        "metrics": TurnMetrics(),
     }
 
     entry.async_on_unload(entry.add_update_listener(_async_update_listener))
@@ -92,17 +161,37 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     return True
 
 
+async def _async_start_recording(
+    hass: HomeAssistant, entry: ConfigEntry, client_pool: XiaozhiClientPool
+) -> None:
+    """Record every pooled connection to its own file for later replay."""
+    directory = Path(hass.config.path(RECORDINGS_DIR))
+    await hass.async_add_executor_job(
+        lambda: directory.mkdir(parents=True, exist_ok=True)
+    )
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    for index, client in enumerate(client_pool.clients):
+        path = directory / f"{entry.entry_id}-{stamp}-{index}{RECORDING_SUFFIX}"
+        client.set_recorder(SessionRecorder(path))
+    _LOGGER.info("Recording Xiaozhi sessions to %s", directory)
+
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
     unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
 
     if unload_ok:
         data = hass.data[DOMAIN].pop(entry.entry_id)
-        client: XiaozhiWebSocketClient = data["client"]
-        await client.disconnect()
+        client_pool: XiaozhiClientPool = data["client_pool"]
+        await client_pool.disconnect()
+        cache: PipelineCacheManager = data["cache"]
+        cache.close()
         mcp_client: MCPWebSocketClient | None = data.get("mcp_client")
         if mcp_client:
             await mcp_client.disconnect()
+        ffmpeg_pool: FFmpegWorkerPool | None = data.get("ffmpeg_pool")
+        if ffmpeg_pool:
+            await ffmpeg_pool.async_stop()
 
     return unload_ok
 
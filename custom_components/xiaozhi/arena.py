@@ -0,0 +1,236 @@
+"""Per-turn storage for received opus packets.
+
+A reply's packets are copied once, from the socket's frame into a single
+growable buffer, and from then on passed around as memoryviews into it:
+the voice session or text request, the pipeline cache and the decoder all
+share the same AudioArena instead of building lists of bytes.
+
+The buffer is never resized in place (a bytearray with exported views
+can't be), so views stay valid while it grows: growing allocates a larger
+buffer and copies the used part, and views handed out earlier keep the old
+buffer alive until they are dropped.
+
+Storage is bounded twice:
+
+- per turn, an arena holds at most AUDIO_ARENA_MAX_BYTES; packets past the
+  cap are dropped, so a runaway reply stops growing
+- process-wide, the buffers of all live arenas are charged to AUDIO_MEMORY;
+  an arena that would take it past its budget moves its packets to a
+  memory-mapped temp file (sized to the per-turn cap) and keeps appending
+  there, where the kernel can page them out
+"""
+
+from __future__ import annotations
+
+import logging
+import mmap
+import tempfile
+import weakref
+from array import array
+from collections.abc import Iterable, Iterator
+from typing import Any
+
+from .const import (
+    AUDIO_ARENA_INITIAL_CAPACITY,
+    AUDIO_ARENA_MAX_BYTES,
+    AUDIO_MEMORY_BUDGET,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class AudioMemoryBudget:
+    """Bytes held by audio arenas, in RAM and spilled to disk."""
+
+    def __init__(self, limit: int) -> None:
+        """Initialize with the RAM limit in bytes."""
+        self.limit = limit
+        self.memory_bytes = 0
+        self.peak_memory_bytes = 0
+        self.spilled_bytes = 0
+        self.spills = 0
+        self.truncated_turns = 0
+
+    def reserve(self, nbytes: int, force: bool = False) -> bool:
+        """Charge nbytes of RAM; False (nothing charged) if over the limit.
+
+        With force=True the bytes are charged even past the limit.
+        """
+        if self.memory_bytes + nbytes > self.limit and not force:
+            return False
+        self.memory_bytes += nbytes
+        self.peak_memory_bytes = max(self.peak_memory_bytes, self.memory_bytes)
+        return True
+
+    def release(self, memory_bytes: int, spilled_bytes: int = 0) -> None:
+        """Return RAM and disk bytes charged earlier."""
+        self.memory_bytes -= memory_bytes
+        self.spilled_bytes -= spilled_bytes
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the counters for diagnostics."""
+        return {
+            "budget_bytes": self.limit,
+            "memory_bytes": self.memory_bytes,
+            "peak_memory_bytes": self.peak_memory_bytes,
+            "spilled_bytes": self.spilled_bytes,
+            "spills": self.spills,
+            "truncated_turns": self.truncated_turns,
+        }
+
+
+# Shared by every arena in the process
+AUDIO_MEMORY = AudioMemoryBudget(AUDIO_MEMORY_BUDGET)
+
+
+class AudioArena:
+    """One turn's opus packets, back to back in one buffer.
+
+    Behaves as a read-only sequence of memoryviews (len, index, iterate),
+    one per packet, in arrival order.
+    """
+
+    def __init__(
+        self,
+        capacity: int = AUDIO_ARENA_INITIAL_CAPACITY,
+        max_bytes: int = AUDIO_ARENA_MAX_BYTES,
+        budget: AudioMemoryBudget = AUDIO_MEMORY,
+    ) -> None:
+        """Initialize an empty arena; the buffer is allocated on first append."""
+        self._capacity = capacity
+        self._max_bytes = max_bytes
+        self._budget = budget
+        self._buffer: bytearray | mmap.mmap = bytearray()
+        self._view = memoryview(self._buffer)
+        self._size = 0
+        # End offset of each packet; a packet starts where the previous ends
+        self._ends = array("I")
+        self.truncated = False
+        self._spilled = False
+        # RAM and spilled bytes charged to the budget, returned on collection
+        self._charge = [0, 0]
+        weakref.finalize(self, _release_charge, budget, self._charge)
+
+    @classmethod
+    def from_packets(cls, packets: Iterable[bytes | memoryview]) -> AudioArena:
+        """Build an arena holding a copy of packets."""
+        arena = cls()
+        for packet in packets:
+            arena.append(packet)
+        return arena
+
+    def append(self, payload: bytes | memoryview) -> memoryview | None:
+        """Copy one packet in and return a view of it.
+
+        Returns None, dropping the packet, once the per-turn cap is reached.
+        """
+        start = self._size
+        end = start + len(payload)
+        if end > len(self._buffer):
+            if end > self._max_bytes:
+                self._truncate()
+                return None
+            self._grow(end)
+        self._view[start:end] = payload
+        self._size = end
+        self._ends.append(end)
+        if self._spilled:
+            self._charge[1] += end - start
+            self._budget.spilled_bytes += end - start
+        return self._view[start:end]
+
+    def _truncate(self) -> None:
+        if self.truncated:
+            return
+        self.truncated = True
+        self._budget.truncated_turns += 1
+        _LOGGER.warning(
+            "Turn audio reached %d bytes, dropping the rest", self._max_bytes
+        )
+
+    def _grow(self, needed: int) -> None:
+        current = len(self._buffer)
+        capacity = max(needed, current * 3 // 2, self._capacity)
+        capacity = min(capacity, self._max_bytes)
+        if not self._budget.reserve(capacity - current):
+            try:
+                self._spill()
+                return
+            except OSError as err:
+                _LOGGER.warning(
+                    "Could not move turn audio to disk (%s), keeping it in memory",
+                    err,
+                )
+                self._budget.reserve(capacity - current, force=True)
+        buffer = bytearray(capacity)
+        buffer[: self._size] = self._view[: self._size]
+        self._buffer = buffer
+        self._view = memoryview(buffer)
+        self._charge[0] = capacity
+
+    def _spill(self) -> None:
+        """Move the packets to a temp file mapped at the per-turn cap."""
+        with tempfile.TemporaryFile(prefix="xiaozhi-audio-") as file:
+            file.truncate(self._max_bytes)
+            # The mapping keeps its own handle to the (unlinked) file
+            buffer = mmap.mmap(file.fileno(), self._max_bytes)
+        buffer[: self._size] = self._view[: self._size]
+        self._buffer = buffer
+        self._view = memoryview(buffer)
+        self._budget.release(self._charge[0])
+        self._spilled = True
+        self._budget.spills += 1
+        self._budget.spilled_bytes += self._size
+        self._charge[:] = [0, self._size]
+        _LOGGER.debug(
+            "Audio memory budget reached, moved %d bytes of turn audio to disk",
+            self._size,
+        )
+
+    def __len__(self) -> int:
+        """Return the number of packets."""
+        return len(self._ends)
+
+    def __getitem__(self, index: int) -> memoryview:
+        """Return a view of packet index (negative indexes count from the end)."""
+        if index < 0:
+            index += len(self._ends)
+        if not 0 <= index < len(self._ends):
+            raise IndexError("packet index out of range")
+        start = self._ends[index - 1] if index else 0
+        return self._view[start : self._ends[index]]
+
+    def span(self, start: int, stop: int) -> memoryview:
+        """Return one view covering packets start..stop-1, back to back."""
+        if not 0 <= start <= stop <= len(self._ends):
+            raise IndexError("packet range out of range")
+        begin = self._ends[start - 1] if start else 0
+        end = self._ends[stop - 1] if stop else 0
+        return self._view[begin:end]
+
+    def __iter__(self) -> Iterator[memoryview]:
+        """Yield a view of each packet."""
+        start = 0
+        for end in self._ends:
+            yield self._view[start:end]
+            start = end
+
+    @property
+    def nbytes(self) -> int:
+        """Return the total size of the packets."""
+        return self._size
+
+    @property
+    def capacity(self) -> int:
+        """Return the size of the current buffer."""
+        return len(self._buffer)
+
+    @property
+    def spilled(self) -> bool:
+        """Return True if the packets live in a temp file rather than RAM."""
+        return self._spilled
+
+
+def _release_charge(budget: AudioMemoryBudget, charge: list[int]) -> None:
+    # Runs when the arena is collected; must not reference the arena
+    budget.release(*charge)
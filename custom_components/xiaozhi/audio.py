@@ -1,50 +1,155 @@
 """Audio utilities for Xiaozhi integration.
 
 Handles binary WebSocket frame packing/unpacking (Protocol V3)
-and opus ↔ PCM conversion via FFmpeg subprocess.
+and opus ↔ PCM conversion, in-process via libopus when available
+or via FFmpeg subprocess otherwise.
+
+Received opus packets are memoryviews (into the socket's frame, then into
+the turn's AudioArena); everything here accepts them wherever it accepts
+bytes, so packets are not copied on their way to the decoder or muxer.
 """
 
 from __future__ import annotations
 
 import asyncio
+import contextlib
 import io
 import logging
 import struct
 import wave
-from collections.abc import AsyncIterator
+import zlib
+from collections.abc import AsyncIterator, Iterable, Sequence
+from typing import TYPE_CHECKING, TypeAlias
 
+from .arena import AudioArena
 from .const import (
+    AUDIO_BITRATE,
     AUDIO_CHANNELS,
     AUDIO_FRAME_DURATION_MS,
     AUDIO_SAMPLE_RATE_INPUT,
     AUDIO_SAMPLE_RATE_OUTPUT,
     BINARY_FRAME_TYPE_AUDIO,
+    CODEC_BACKEND_AUTO,
+    CODEC_BACKEND_FFMPEG,
+    CODEC_BACKEND_LIBOPUS,
 )
+from .codec import OpusDecoder, OpusEncoder, OpusError, libopus_available
+
+if TYPE_CHECKING:
+    from .ffmpeg_pool import FFmpegWorkerPool
+    from .uplink import UplinkParams
 
 _LOGGER = logging.getLogger(__name__)
 
+# An opus packet: bytes, or a view into a received frame or an AudioArena
+OpusPacket: TypeAlias = bytes | memoryview
+
 # Binary frame format: type(u8) | reserved(u8) | size(u16 BE) | payload
 _FRAME_HEADER = struct.Struct(">BBH")
 
-# OGG CRC-32 lookup table (polynomial 0x04C11DB7, no reflection)
-_OGG_CRC_TABLE = [0] * 256
-for _i in range(256):
-    _r = _i << 24
-    for _ in range(8):
-        _r = ((_r << 1) ^ 0x04C11DB7) if _r & 0x80000000 else _r << 1
-    _OGG_CRC_TABLE[_i] = _r & 0xFFFFFFFF
+# Page header: "OggS" | version | flags | granule (i64) | serial | page_seq |
+# CRC | num_segments
+_OGG_PAGE_HEADER = struct.Struct("<4sBBqIIIB")
+_OGG_CRC_OFFSET = 22
+_OGG_FLAG_BOS = 0x02
+_OGG_FLAG_EOS = 0x04
+_OGG_MAX_SEGMENTS = 255
+_OGG_SERIAL = 0x58495A48  # "XIZH"
+
+# Pre-skip advertised in OpusHead (samples at 48kHz)
+_OPUS_PRE_SKIP = 312
+
+# Each byte value with its bit order reversed
+_BIT_REVERSE = bytes(int(f"{i:08b}"[::-1], 2) for i in range(256))
+
+# Samples (at 48kHz) per Opus frame for each TOC config number (RFC 6716 §3.1)
+_OPUS_CONFIG_SAMPLES = (
+    480, 960, 1920, 2880,  # SILK NB 10/20/40/60 ms
+    480, 960, 1920, 2880,  # SILK MB
+    480, 960, 1920, 2880,  # SILK WB
+    480, 960,              # Hybrid SWB 10/20 ms
+    480, 960,              # Hybrid FB
+    120, 240, 480, 960,    # CELT NB 2.5/5/10/20 ms
+    120, 240, 480, 960,    # CELT WB
+    120, 240, 480, 960,    # CELT SWB
+    120, 240, 480, 960,    # CELT FB
+)
 
 
-def _ogg_crc32(data: bytes) -> int:
-    """Compute OGG-specific CRC-32."""
-    crc = 0
-    for b in data:
-        crc = ((_ogg_crc32_lookup(crc, b))) & 0xFFFFFFFF
-    return crc
+def _ogg_crc32(*chunks: OpusPacket | bytearray) -> int:
+    """Compute OGG-specific CRC-32 (poly 0x04C11DB7, MSB-first, init 0).
 
+    OGG's CRC is the bit-reflected twin of zlib's CRC-32: reflecting every
+    input byte, running zlib's CRC with its init/final XOR cancelled out and
+    reflecting the 32-bit result gives the OGG value. Every step runs in C.
+    The CRC runs over the chunks as if they were concatenated.
+    """
+    value = 0xFFFFFFFF
+    for chunk in chunks:
+        value = zlib.crc32(bytes(chunk).translate(_BIT_REVERSE), value)
+    raw = value ^ 0xFFFFFFFF
+    return int.from_bytes(raw.to_bytes(4, "little").translate(_BIT_REVERSE), "big")
+
+
+def _opus_packet_samples(packet: OpusPacket) -> int:
+    """Return the duration of an Opus packet in 48kHz samples, from its TOC."""
+    if not packet:
+        return 0
+    toc = packet[0]
+    frame_samples = _OPUS_CONFIG_SAMPLES[toc >> 3]
+    code = toc & 0x03
+    if code == 0:
+        return frame_samples
+    if code in (1, 2):
+        return 2 * frame_samples
+    # Code 3: frame count in the low 6 bits of the second byte
+    if len(packet) < 2:
+        return 0
+    return (packet[1] & 0x3F) * frame_samples
+
+
+def _lacing(packet_len: int) -> bytes:
+    """Return the OGG lacing values for a packet of packet_len bytes."""
+    return b"\xff" * (packet_len // 255) + bytes((packet_len % 255,))
+
+
+def _ogg_page_parts(
+    serial: int,
+    page_seq: int,
+    granule: int,
+    flags: int,
+    packet_lengths: list[int],
+    body: list[OpusPacket],
+) -> list[OpusPacket]:
+    """Build a single OGG page holding complete packets, as a list of parts.
 
-def _ogg_crc32_lookup(crc: int, byte: int) -> int:
-    return ((crc << 8) ^ _OGG_CRC_TABLE[((crc >> 24) & 0xFF) ^ byte])
+    flags: 0x02=BOS, 0x04=EOS
+    Packets of 255+ bytes span several 255-byte lacing values plus a final
+    value < 255 (0 when the length is an exact multiple of 255). body holds
+    the packets' bytes (one chunk per packet, or fewer larger chunks) and is
+    not copied: the page is its header and segment table followed by body,
+    ready for b"".join().
+    """
+    segment_table = b"".join([_lacing(length) for length in packet_lengths])
+    if len(segment_table) > _OGG_MAX_SEGMENTS:
+        raise ValueError(f"OGG page overflow: {len(segment_table)} segments")
+
+    header = bytearray(
+        _OGG_PAGE_HEADER.pack(
+            b"OggS",
+            0,                # version
+            flags,
+            granule,          # granule position (signed i64 LE)
+            serial,
+            page_seq,
+            0,                # CRC placeholder
+            len(segment_table),
+        )
+    )
+    # One transient copy of the body: zlib runs once per page, not per packet
+    crc = _ogg_crc32(header, segment_table, b"".join(body))
+    struct.pack_into("<I", header, _OGG_CRC_OFFSET, crc)
+    return [bytes(header), segment_table, *body]
 
 
 def _build_ogg_page(
@@ -52,110 +157,188 @@ def _build_ogg_page(
     page_seq: int,
     granule: int,
     flags: int,
-    segments_data: list[bytes],
+    segments_data: list[OpusPacket],
 ) -> bytes:
-    """Build a single OGG page from segment data.
-
-    flags: 0x02=BOS, 0x04=EOS
-    """
-    # Build segment table: each segment can be at most 255 bytes.
-    # Packets > 255 bytes need multiple 255-byte segments + a final < 255 segment.
-    segment_table = bytearray()
-    body = bytearray()
-    for seg in segments_data:
-        data_len = len(seg)
-        while data_len >= 255:
-            segment_table.append(255)
-            data_len -= 255
-        segment_table.append(data_len)
-        body.extend(seg)
-
-    num_segments = len(segment_table)
-
-    # Header with CRC placeholder = 0
-    header = struct.pack(
-        "<4sBBqIIIB",
-        b"OggS",     # capture pattern
-        0,            # version
-        flags,
-        granule,      # granule position (signed i64 LE)
-        serial,       # stream serial number
-        page_seq,     # page sequence number
-        0,            # CRC placeholder
-        num_segments,
+    """Build a single OGG page holding complete packets."""
+    lengths = [len(packet) for packet in segments_data]
+    return b"".join(
+        _ogg_page_parts(serial, page_seq, granule, flags, lengths, segments_data)
     )
 
-    page_no_crc = header + bytes(segment_table) + bytes(body)
-    crc = _ogg_crc32(page_no_crc)
 
-    # Patch CRC at offset 22
-    page = bytearray(page_no_crc)
-    struct.pack_into("<I", page, 22, crc)
-    return bytes(page)
+class OggOpusWriter:
+    """Incremental OGG/Opus muxer.
+
+    Packs as many packets per page as the 255-entry segment table allows
+    (standard lacing) and sets each page's granule position from the TOC
+    byte of the packets it completes, so any Opus frame duration works.
+    """
+
+    def __init__(
+        self,
+        sample_rate: int,
+        channels: int,
+        serial: int = _OGG_SERIAL,
+    ) -> None:
+        """Initialize the writer for one logical stream."""
+        self._sample_rate = sample_rate
+        self._channels = channels
+        self._serial = serial
+        self._page_seq = 0
+        self._granule = 0
+        self._finished = False
+
+    def _page(
+        self,
+        parts: list[OpusPacket],
+        flags: int,
+        lengths: list[int],
+        body: list[OpusPacket],
+    ) -> None:
+        parts += _ogg_page_parts(
+            self._serial, self._page_seq, self._granule, flags, lengths, body
+        )
+        self._page_seq += 1
+
+    def headers(self) -> bytes:
+        """Return the OpusHead (BOS) and OpusTags header pages."""
+        return b"".join(self.header_parts())
+
+    def header_parts(self) -> list[OpusPacket]:
+        """Like headers(), as a list of parts to join."""
+        opus_head = struct.pack(
+            "<8sBBHIhB",
+            b"OpusHead",
+            1,                  # version
+            self._channels,
+            _OPUS_PRE_SKIP,
+            self._sample_rate,  # original sample rate
+            0,                  # output gain
+            0,                  # channel mapping family
+        )
+        vendor = b"xiaozhi"
+        opus_tags = (
+            struct.pack("<8sI", b"OpusTags", len(vendor))
+            + vendor
+            + struct.pack("<I", 0)  # 0 user comments
+        )
+        parts: list[OpusPacket] = []
+        self._page(parts, _OGG_FLAG_BOS, [len(opus_head)], [opus_head])
+        self._page(parts, 0, [len(opus_tags)], [opus_tags])
+        return parts
+
+    def pages(self, opus_packets: Iterable[OpusPacket], last: bool = False) -> bytes:
+        """Mux packets into as few pages as possible.
+
+        All given packets are flushed; with last=True the final page carries
+        the EOS flag and the writer accepts no more packets.
+        """
+        return b"".join(self.page_parts(opus_packets, last))
+
+    def page_parts(
+        self, opus_packets: Iterable[OpusPacket], last: bool = False
+    ) -> list[OpusPacket]:
+        """Like pages(), as a list of parts to join.
+
+        Packets from an AudioArena sit back to back in one buffer, so each
+        page's packets are passed on as a single view of the arena rather
+        than one view per packet.
+        """
+        if self._finished:
+            raise RuntimeError("OGG stream already finished")
+        arena = opus_packets if isinstance(opus_packets, AudioArena) else None
+        parts: list[OpusPacket] = []
+        batch: list[OpusPacket] = []
+        lengths: list[int] = []
+        first = count = 0
+        segments = 0
+        for packet in opus_packets:
+            lacing_len = len(packet) // 255 + 1
+            if segments + lacing_len > _OGG_MAX_SEGMENTS:
+                body = [arena.span(first, count)] if arena is not None else batch
+                self._page(parts, 0, lengths, body)
+                batch = []
+                lengths = []
+                first = count
+                segments = 0
+            if arena is None:
+                batch.append(packet)
+            lengths.append(len(packet))
+            count += 1
+            segments += lacing_len
+            self._granule += _opus_packet_samples(packet)
+        body = [arena.span(first, count)] if arena is not None else batch
+        if last:
+            self._finished = True
+            self._page(parts, _OGG_FLAG_EOS, lengths, body)
+        elif lengths:
+            self._page(parts, 0, lengths, body)
+        return parts
 
 
 def _build_ogg_opus_stream(
-    opus_packets: list[bytes],
+    opus_packets: Iterable[OpusPacket],
     sample_rate: int,
     channels: int,
 ) -> bytes:
     """Build a complete OGG/Opus stream from raw opus packets.
 
     Inverse of _parse_ogg_opus_packets(): wraps raw packets into a valid
-    OGG/Opus container that FFmpeg can decode.
+    OGG/Opus container that FFmpeg can decode. The pages are joined once at
+    the end, so each packet is copied exactly once, into the result.
     """
-    serial = 0x58495A48  # "XIZH"
-    pages: list[bytes] = []
-
-    # Page 0 (BOS): OpusHead
-    opus_head = struct.pack(
-        "<8sBBHIhB",
-        b"OpusHead",
-        1,              # version
-        channels,
-        312,            # pre-skip (samples at 48kHz)
-        sample_rate,    # original sample rate
-        0,              # output gain
-        0,              # channel mapping family
-    )
-    pages.append(_build_ogg_page(serial, 0, 0, 0x02, [opus_head]))
+    writer = OggOpusWriter(sample_rate, channels)
+    parts = writer.header_parts()
+    parts += writer.page_parts(opus_packets, last=True)
+    return b"".join(parts)
+
+
+def opus_frames_to_ogg(
+    opus_frames: Iterable[OpusPacket],
+    sample_rate: int = AUDIO_SAMPLE_RATE_OUTPUT,
+    channels: int = AUDIO_CHANNELS,
+) -> bytes:
+    """Wrap raw opus frames in an OGG/Opus file without decoding them."""
+    return _build_ogg_opus_stream(opus_frames, sample_rate, channels)
 
-    # Page 1: OpusTags
-    vendor = b"xiaozhi"
-    opus_tags = struct.pack("<8sI", b"OpusTags", len(vendor)) + vendor
-    opus_tags += struct.pack("<I", 0)  # 0 user comments
-    pages.append(_build_ogg_page(serial, 1, 0, 0, [opus_tags]))
 
-    # Audio pages: one opus packet per page
-    # Opus always works at 48kHz internally; 20ms frame = 960 samples
-    granule = 0
-    samples_per_frame = 960  # 20ms @ 48kHz
-    for i, packet in enumerate(opus_packets):
-        granule += samples_per_frame
-        is_last = i == len(opus_packets) - 1
-        flags = 0x04 if is_last else 0
-        pages.append(_build_ogg_page(serial, i + 2, granule, flags, [packet]))
+async def opus_stream_to_ogg(
+    opus_packets: AsyncIterator[OpusPacket],
+    sample_rate: int = AUDIO_SAMPLE_RATE_OUTPUT,
+    channels: int = AUDIO_CHANNELS,
+) -> AsyncIterator[bytes]:
+    """Mux raw opus packets into OGG/Opus pages as the packets arrive.
 
-    return b"".join(pages)
+    Yields nothing if the stream has no packets.
+    """
+    writer: OggOpusWriter | None = None
+    async for packet in opus_packets:
+        if writer is None:
+            writer = OggOpusWriter(sample_rate, channels)
+            yield writer.headers()
+        yield writer.pages([packet])
+    if writer is not None:
+        yield writer.pages([], last=True)
 
 
-def pack_audio_frame(opus_data: bytes) -> bytes:
+def pack_audio_frame(opus_data: OpusPacket) -> bytes:
     """Pack opus data into a binary WebSocket frame (Protocol V3)."""
     header = _FRAME_HEADER.pack(BINARY_FRAME_TYPE_AUDIO, 0, len(opus_data))
     return header + opus_data
 
 
-def unpack_audio_frame(data: bytes) -> bytes | None:
-    """Unpack a binary WebSocket frame, returning the opus payload.
+def unpack_audio_frame(data: bytes) -> memoryview | None:
+    """Unpack a binary WebSocket frame, returning a view of the opus payload.
 
-    Returns None if frame type is not audio or data is malformed.
+    The view shares data's memory (no copy). Returns None if frame type is
+    not audio or data is malformed.
     """
     if len(data) < _FRAME_HEADER.size:
         return None
     frame_type, _, size = _FRAME_HEADER.unpack_from(data)
     if frame_type != BINARY_FRAME_TYPE_AUDIO:
         return None
-    payload = data[_FRAME_HEADER.size : _FRAME_HEADER.size + size]
+    payload = memoryview(data)[_FRAME_HEADER.size : _FRAME_HEADER.size + size]
     if len(payload) != size:
         _LOGGER.warning("Audio frame truncated: expected %d, got %d", size, len(payload))
         return None
@@ -233,25 +416,95 @@ async def _parse_ogg_opus_packets(
 _VALID_SAMPLE_RATES = frozenset({8000, 16000, 24000, 48000})
 _VALID_CHANNELS = frozenset({1, 2})
 
+# Read size for PCM coming out of a streaming FFmpeg decoder
+_PCM_READ_SIZE = 8192
+
+
+def _resolve_backend(backend: str) -> str:
+    """Resolve CODEC_BACKEND_AUTO to a concrete backend."""
+    if backend == CODEC_BACKEND_AUTO:
+        return CODEC_BACKEND_LIBOPUS if libopus_available() else CODEC_BACKEND_FFMPEG
+    if backend == CODEC_BACKEND_LIBOPUS and not libopus_available():
+        raise RuntimeError("libopus backend requested but libopus is not available")
+    return backend
+
 
 async def pcm_to_opus_frames(
     pcm_stream: AsyncIterator[bytes],
     sample_rate: int = AUDIO_SAMPLE_RATE_INPUT,
     channels: int = AUDIO_CHANNELS,
     frame_duration_ms: int = AUDIO_FRAME_DURATION_MS,
+    backend: str = CODEC_BACKEND_AUTO,
+    pool: FFmpegWorkerPool | None = None,
+    bitrate: int = AUDIO_BITRATE,
 ) -> AsyncIterator[bytes]:
-    """Convert raw PCM audio stream to individual raw opus packets via FFmpeg.
+    """Convert raw PCM audio stream to individual raw opus packets.
 
     Yields individual opus packets suitable for packing into binary WS frames.
     HA sends raw PCM (s16le); we specify format/rate/channels explicitly.
-    FFmpeg outputs OGG/Opus container; we parse it to extract raw packets.
+    Frame duration and bitrate (VBR target, bps) are per call, so each turn
+    can use the settings its connection's UplinkController chose.
+    Uses in-process libopus when available, FFmpeg otherwise (taking a
+    pre-warmed worker from pool when one is given).
     """
     if sample_rate not in _VALID_SAMPLE_RATES:
         raise ValueError(f"Invalid sample rate: {sample_rate}")
     if channels not in _VALID_CHANNELS:
         raise ValueError(f"Invalid channels: {channels}")
 
-    proc = await asyncio.create_subprocess_exec(
+    if _resolve_backend(backend) == CODEC_BACKEND_LIBOPUS:
+        frames = _libopus_pcm_to_opus_frames(
+            pcm_stream, sample_rate, channels, frame_duration_ms, bitrate
+        )
+    else:
+        frames = _ffmpeg_pcm_to_opus_frames(
+            pcm_stream, sample_rate, channels, frame_duration_ms, bitrate, pool
+        )
+    try:
+        async for opus_packet in frames:
+            yield opus_packet
+    finally:
+        await frames.aclose()
+
+
+async def _libopus_pcm_to_opus_frames(
+    pcm_stream: AsyncIterator[bytes],
+    sample_rate: int,
+    channels: int,
+    frame_duration_ms: int,
+    bitrate: int,
+) -> AsyncIterator[bytes]:
+    """Encode PCM to raw opus packets in-process with libopus.
+
+    Settings mirror the FFmpeg path (VBR, voip). A trailing partial frame is
+    padded with silence, as FFmpeg does.
+    """
+    frame_size = sample_rate * frame_duration_ms // 1000
+    frame_bytes = frame_size * channels * 2
+    encoder = OpusEncoder(sample_rate, channels, bitrate=bitrate, vbr=True)
+    buffer = bytearray()
+    try:
+        async for chunk in pcm_stream:
+            buffer.extend(chunk)
+            while len(buffer) >= frame_bytes:
+                pcm = bytes(buffer[:frame_bytes])
+                del buffer[:frame_bytes]
+                yield encoder.encode(pcm, frame_size)
+        if buffer:
+            pcm = bytes(buffer) + b"\x00" * (frame_bytes - len(buffer))
+            yield encoder.encode(pcm, frame_size)
+    finally:
+        encoder.close()
+
+
+def ffmpeg_encoder_args(
+    sample_rate: int = AUDIO_SAMPLE_RATE_INPUT,
+    channels: int = AUDIO_CHANNELS,
+    frame_duration_ms: int = AUDIO_FRAME_DURATION_MS,
+    bitrate: int = AUDIO_BITRATE,
+) -> tuple[str, ...]:
+    """Return the FFmpeg command line for PCM → OGG/Opus encoding."""
+    return (
         "ffmpeg",
         "-hide_banner",
         "-loglevel", "error",
@@ -260,17 +513,76 @@ async def pcm_to_opus_frames(
         "-ac", str(channels),
         "-i", "pipe:0",
         "-c:a", "libopus",
-        "-b:a", "32k",
+        "-b:a", str(bitrate),
         "-frame_duration", str(frame_duration_ms),
         "-application", "voip",
         "-vbr", "on",
         "-f", "opus",
         "pipe:1",
+    )
+
+
+def ffmpeg_uplink_encoder_args(
+    choices: Iterable[UplinkParams],
+) -> list[tuple[str, ...]]:
+    """Return the FFmpeg encoder command lines for uplink settings."""
+    return [
+        ffmpeg_encoder_args(
+            frame_duration_ms=params.frame_duration_ms, bitrate=params.bitrate
+        )
+        for params in choices
+    ]
+
+
+def ffmpeg_decoder_args(
+    sample_rate: int = AUDIO_SAMPLE_RATE_OUTPUT,
+    channels: int = AUDIO_CHANNELS,
+) -> tuple[str, ...]:
+    """Return the FFmpeg command line for OGG/Opus → PCM decoding."""
+    return (
+        "ffmpeg",
+        "-hide_banner",
+        "-loglevel", "error",
+        "-f", "ogg",
+        "-i", "pipe:0",
+        "-f", "s16le",
+        "-ar", str(sample_rate),
+        "-ac", str(channels),
+        "pipe:1",
+    )
+
+
+async def _start_ffmpeg(
+    argv: tuple[str, ...],
+    pool: FFmpegWorkerPool | None,
+) -> asyncio.subprocess.Process:
+    """Start FFmpeg for argv, preferring a pre-warmed pool worker."""
+    if pool is not None:
+        return await pool.acquire(argv)
+    return await asyncio.create_subprocess_exec(
+        *argv,
         stdin=asyncio.subprocess.PIPE,
         stdout=asyncio.subprocess.PIPE,
         stderr=asyncio.subprocess.PIPE,
     )
 
+
+async def _ffmpeg_pcm_to_opus_frames(
+    pcm_stream: AsyncIterator[bytes],
+    sample_rate: int,
+    channels: int,
+    frame_duration_ms: int,
+    bitrate: int,
+    pool: FFmpegWorkerPool | None,
+) -> AsyncIterator[bytes]:
+    """Encode PCM to raw opus packets via an FFmpeg subprocess.
+
+    FFmpeg outputs OGG/Opus container; we parse it to extract raw packets.
+    """
+    proc = await _start_ffmpeg(
+        ffmpeg_encoder_args(sample_rate, channels, frame_duration_ms, bitrate), pool
+    )
+
     async def _feed_stdin() -> None:
         assert proc.stdin is not None
         try:
@@ -288,75 +600,348 @@ async def pcm_to_opus_frames(
         async for opus_packet in _parse_ogg_opus_packets(proc.stdout):
             yield opus_packet
     finally:
-        feed_task.cancel()
+        await _stop_ffmpeg(proc, feed_task, "pcm→opus")
+
+
+async def _stop_ffmpeg(
+    proc: asyncio.subprocess.Process,
+    feed_task: asyncio.Task[None],
+    label: str,
+) -> None:
+    """Stop feeding an FFmpeg process, log its stderr and reap it."""
+    feed_task.cancel()
+    try:
+        await feed_task
+    except asyncio.CancelledError:
+        pass
+    if proc.stderr:
+        stderr_data = await proc.stderr.read()
+        if stderr_data:
+            _LOGGER.error(
+                "FFmpeg %s: %s",
+                label,
+                stderr_data.decode(errors="replace").strip(),
+            )
+    if proc.returncode is None:
+        proc.kill()
         try:
-            await feed_task
-        except asyncio.CancelledError:
-            pass
-        if proc.stderr:
-            stderr_data = await proc.stderr.read()
-            if stderr_data:
-                _LOGGER.error(
-                    "FFmpeg pcm→opus: %s",
-                    stderr_data.decode(errors="replace").strip(),
-                )
-        if proc.returncode is None:
-            proc.kill()
-            try:
-                await asyncio.wait_for(proc.wait(), timeout=5)
-            except asyncio.TimeoutError:
-                _LOGGER.warning("FFmpeg process did not exit after kill")
+            await asyncio.wait_for(proc.wait(), timeout=5)
+        except asyncio.TimeoutError:
+            _LOGGER.warning("FFmpeg process did not exit after kill")
 
 
-async def opus_frames_to_wav(
-    opus_frames: list[bytes],
+async def opus_frames_to_pcm(
+    opus_frames: Sequence[OpusPacket],
     sample_rate: int = AUDIO_SAMPLE_RATE_OUTPUT,
     channels: int = AUDIO_CHANNELS,
+    backend: str = CODEC_BACKEND_AUTO,
+    pool: FFmpegWorkerPool | None = None,
 ) -> bytes | None:
-    """Decode a list of raw opus frames to a WAV file via FFmpeg.
+    """Decode a list of raw opus frames to s16le PCM.
 
-    The opus_frames are the payloads extracted from binary WebSocket frames
-    (already unpacked from the Protocol V3 framing).
-    Returns WAV file bytes, or None on decode failure.
+    Uses in-process libopus (in the default executor) when available,
+    FFmpeg otherwise. Returns None on decode failure.
     """
     if not opus_frames:
         return b""
 
+    if _resolve_backend(backend) == CODEC_BACKEND_LIBOPUS:
+        return await asyncio.get_running_loop().run_in_executor(
+            None, _libopus_decode, opus_frames, sample_rate, channels
+        )
+    return await _ffmpeg_decode(opus_frames, sample_rate, channels, pool)
+
+
+def _libopus_decode(
+    opus_frames: Sequence[OpusPacket],
+    sample_rate: int,
+    channels: int,
+) -> bytes | None:
+    """Decode raw opus packets with libopus (blocking)."""
+    decoder = OpusDecoder(sample_rate, channels)
+    pcm = bytearray()
+    errors = 0
+    try:
+        for packet in opus_frames:
+            try:
+                pcm.extend(decoder.decode(packet))
+            except OpusError:
+                errors += 1
+    finally:
+        decoder.close()
+
+    if errors:
+        _LOGGER.debug("libopus skipped %d undecodable packet(s)", errors)
+    if errors == len(opus_frames):
+        _LOGGER.error("libopus could not decode any of %d opus packets", errors)
+        return None
+    return bytes(pcm)
+
+
+async def _ffmpeg_decode(
+    opus_frames: Sequence[OpusPacket],
+    sample_rate: int,
+    channels: int,
+    pool: FFmpegWorkerPool | None,
+) -> bytes | None:
+    """Decode raw opus packets via an FFmpeg subprocess."""
     # Wrap raw opus packets into a valid OGG/Opus container for FFmpeg
     opus_data = _build_ogg_opus_stream(opus_frames, sample_rate, channels)
 
-    proc = await asyncio.create_subprocess_exec(
-        "ffmpeg",
-        "-hide_banner",
-        "-loglevel", "error",
-        "-f", "ogg",
-        "-i", "pipe:0",
-        "-f", "s16le",
-        "-ar", str(sample_rate),
-        "-ac", str(channels),
-        "pipe:1",
-        stdin=asyncio.subprocess.PIPE,
-        stdout=asyncio.subprocess.PIPE,
-        stderr=asyncio.subprocess.PIPE,
-    )
+    proc = await _start_ffmpeg(ffmpeg_decoder_args(sample_rate, channels), pool)
 
     stdout_data, stderr_data = await proc.communicate(input=opus_data)
 
     if proc.returncode != 0:
         _LOGGER.error("FFmpeg opus decode failed: %s", stderr_data.decode(errors="replace"))
         return None
+    return stdout_data
+
+
+async def opus_stream_to_pcm(
+    opus_packets: AsyncIterator[OpusPacket],
+    sample_rate: int = AUDIO_SAMPLE_RATE_OUTPUT,
+    channels: int = AUDIO_CHANNELS,
+    backend: str = CODEC_BACKEND_AUTO,
+    pool: FFmpegWorkerPool | None = None,
+) -> AsyncIterator[bytes]:
+    """Decode raw opus packets to s16le PCM chunks as the packets arrive.
+
+    Used for streaming TTS: PCM for the first packets is yielded while
+    later packets are still being received from the server.
+    """
+    if _resolve_backend(backend) == CODEC_BACKEND_LIBOPUS:
+        chunks = _libopus_stream_decode(opus_packets, sample_rate, channels)
+    else:
+        chunks = _ffmpeg_stream_decode(opus_packets, sample_rate, channels, pool)
+    try:
+        async for pcm in chunks:
+            yield pcm
+    finally:
+        await chunks.aclose()
+
 
-    # Wrap raw PCM in WAV container
+async def _libopus_stream_decode(
+    opus_packets: AsyncIterator[OpusPacket],
+    sample_rate: int,
+    channels: int,
+) -> AsyncIterator[bytes]:
+    """Decode packets one by one with libopus (a packet takes well under 1 ms)."""
+    decoder = OpusDecoder(sample_rate, channels)
+    try:
+        async for packet in opus_packets:
+            try:
+                pcm = decoder.decode(packet)
+            except OpusError:
+                _LOGGER.debug("libopus skipped an undecodable packet")
+                continue
+            if pcm:
+                yield pcm
+    finally:
+        decoder.close()
+
+
+async def _ffmpeg_stream_decode(
+    opus_packets: AsyncIterator[OpusPacket],
+    sample_rate: int,
+    channels: int,
+    pool: FFmpegWorkerPool | None,
+) -> AsyncIterator[bytes]:
+    """Decode packets through FFmpeg, muxing OGG pages as packets arrive."""
+    proc = await _start_ffmpeg(ffmpeg_decoder_args(sample_rate, channels), pool)
+    writer = OggOpusWriter(sample_rate, channels)
+
+    async def _feed_stdin() -> None:
+        assert proc.stdin is not None
+        try:
+            proc.stdin.write(writer.headers())
+            async for packet in opus_packets:
+                proc.stdin.write(writer.pages([packet]))
+                await proc.stdin.drain()
+            proc.stdin.write(writer.pages([], last=True))
+            await proc.stdin.drain()
+        finally:
+            proc.stdin.close()
+            await proc.stdin.wait_closed()
+
+    feed_task = asyncio.create_task(_feed_stdin())
+
+    try:
+        assert proc.stdout is not None
+        while chunk := await proc.stdout.read(_PCM_READ_SIZE):
+            yield chunk
+    finally:
+        await _stop_ffmpeg(proc, feed_task, "opus→pcm")
+
+
+class IncrementalOpusDecoder:
+    """Decodes a TTS opus stream while it is still being received.
+
+    Packets are fed as binary frames arrive; a background task decodes them
+    with opus_stream_to_pcm(), so when the server signals TTS stop the PCM
+    is already (almost) complete. Decoding starts on the first packet.
+    """
+
+    def __init__(
+        self,
+        sample_rate: int = AUDIO_SAMPLE_RATE_OUTPUT,
+        channels: int = AUDIO_CHANNELS,
+        backend: str = CODEC_BACKEND_AUTO,
+        pool: FFmpegWorkerPool | None = None,
+    ) -> None:
+        """Initialize the decoder; no work is done until the first packet."""
+        self._sample_rate = sample_rate
+        self._channels = channels
+        self._backend = backend
+        self._pool = pool
+        self._packets: asyncio.Queue[OpusPacket | None] = asyncio.Queue()
+        self._pcm_chunks: list[bytes] = []
+        self._pcm_event = asyncio.Event()
+        self._task: asyncio.Task[None] | None = None
+        self._finished = False
+
+    def feed(self, opus_packet: OpusPacket) -> None:
+        """Queue one raw opus packet for decoding."""
+        if self._finished:
+            return
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        self._packets.put_nowait(opus_packet)
+
+    def finish(self) -> None:
+        """Mark the end of the stream (no more packets will be fed)."""
+        if self._finished:
+            return
+        self._finished = True
+        self._packets.put_nowait(None)
+        self._pcm_event.set()
+
+    async def _packet_iter(self) -> AsyncIterator[OpusPacket]:
+        while (packet := await self._packets.get()) is not None:
+            yield packet
+
+    async def _run(self) -> None:
+        """Decode queued packets until finish() is called."""
+        try:
+            async for pcm in opus_stream_to_pcm(
+                self._packet_iter(),
+                self._sample_rate,
+                self._channels,
+                self._backend,
+                self._pool,
+            ):
+                self._pcm_chunks.append(pcm)
+                self._pcm_event.set()
+        except Exception:
+            _LOGGER.exception("Incremental opus decode failed")
+        finally:
+            self._pcm_event.set()
+
+    @property
+    def done(self) -> bool:
+        """Return True once the stream is finished and fully decoded."""
+        return self._finished and (self._task is None or self._task.done())
+
+    async def iter_pcm(self) -> AsyncIterator[bytes]:
+        """Yield PCM chunks as they are decoded until the stream ends."""
+        index = 0
+        while True:
+            while index < len(self._pcm_chunks):
+                yield self._pcm_chunks[index]
+                index += 1
+            # A finished decode task (normal end or failure) has no more PCM
+            if self._task is not None and self._task.done():
+                return
+            if self._task is None and self._finished:
+                return
+            self._pcm_event.clear()
+            await self._pcm_event.wait()
+
+    async def pcm(self) -> bytes | None:
+        """Wait for the stream to end; return all PCM, or None if there is none."""
+        if self._task is not None:
+            await asyncio.wait({self._task})
+        return b"".join(self._pcm_chunks) or None
+
+    async def wav(self) -> bytes | None:
+        """Wait for the stream to end; return it as a WAV file, or None."""
+        pcm = await self.pcm()
+        if pcm is None:
+            return None
+        return _pcm_to_wav(pcm, self._sample_rate, self._channels)
+
+    async def aclose(self) -> None:
+        """Stop decoding and release the codec/FFmpeg process."""
+        self._finished = True
+        self._pcm_event.set()
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+
+
+async def opus_frames_to_wav(
+    opus_frames: Sequence[OpusPacket],
+    sample_rate: int = AUDIO_SAMPLE_RATE_OUTPUT,
+    channels: int = AUDIO_CHANNELS,
+    backend: str = CODEC_BACKEND_AUTO,
+    pool: FFmpegWorkerPool | None = None,
+) -> bytes | None:
+    """Decode a list of raw opus frames to a WAV file.
+
+    The opus_frames are the payloads extracted from binary WebSocket frames
+    (already unpacked from the Protocol V3 framing).
+    Returns WAV file bytes, or None on decode failure.
+    """
+    if not opus_frames:
+        return b""
+
+    pcm = await opus_frames_to_pcm(opus_frames, sample_rate, channels, backend, pool)
+    if pcm is None:
+        return None
+    return _pcm_to_wav(pcm, sample_rate, channels)
+
+
+def _pcm_to_wav(pcm: bytes, sample_rate: int, channels: int) -> bytes:
+    """Wrap raw s16le PCM in a WAV container."""
     wav_buffer = io.BytesIO()
     with wave.open(wav_buffer, "wb") as wav_file:
         wav_file.setnchannels(channels)
         wav_file.setsampwidth(2)  # 16-bit
         wav_file.setframerate(sample_rate)
-        wav_file.writeframes(stdout_data)
+        wav_file.writeframes(pcm)
 
     return wav_buffer.getvalue()
 
 
+def wav_stream_header(
+    sample_rate: int = AUDIO_SAMPLE_RATE_OUTPUT,
+    channels: int = AUDIO_CHANNELS,
+) -> bytes:
+    """Return a WAV header for PCM of unknown length (streaming).
+
+    RIFF and data sizes are set to 0xFFFFFFFF, which readers such as FFmpeg
+    treat as "read until end of stream".
+    """
+    block_align = channels * 2
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF",
+        0xFFFFFFFF,
+        b"WAVE",
+        b"fmt ",
+        16,                         # fmt chunk size
+        1,                          # PCM
+        channels,
+        sample_rate,
+        sample_rate * block_align,  # byte rate
+        block_align,
+        16,                         # bits per sample
+        b"data",
+        0xFFFFFFFF,
+    )
+
+
 def generate_silence_wav(
     duration_ms: int = 500,
     sample_rate: int = AUDIO_SAMPLE_RATE_OUTPUT,
@@ -368,12 +953,21 @@ def generate_silence_wav(
     """
     num_frames = sample_rate * duration_ms // 1000
     silence_data = b"\x00\x00" * num_frames * channels  # 16-bit silence
+    return _pcm_to_wav(silence_data, sample_rate, channels)
 
-    wav_buffer = io.BytesIO()
-    with wave.open(wav_buffer, "wb") as wav_file:
-        wav_file.setnchannels(channels)
-        wav_file.setsampwidth(2)
-        wav_file.setframerate(sample_rate)
-        wav_file.writeframes(silence_data)
 
-    return wav_buffer.getvalue()
+def generate_silence_ogg(
+    duration_ms: int = 500,
+    sample_rate: int = AUDIO_SAMPLE_RATE_OUTPUT,
+    channels: int = AUDIO_CHANNELS,
+) -> bytes:
+    """Generate a short silence OGG/Opus file.
+
+    OGG counterpart of generate_silence_wav(), built from 20 ms CELT
+    frames that decode to silence, so no encoder is needed.
+    """
+    toc = 0xFC if channels == 2 else 0xF8  # config 31 (CELT FB 20 ms), code 0
+    packet = bytes((toc, 0xFF, 0xFE))
+    return opus_frames_to_ogg(
+        [packet] * max(1, duration_ms // 20), sample_rate, channels
+    )
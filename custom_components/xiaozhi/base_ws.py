@@ -12,6 +12,7 @@ import json
 import logging
 import ssl as ssl_module
 from abc import ABC, abstractmethod
+from collections.abc import Coroutine
 from typing import Any
 from urllib.parse import urlparse
 
@@ -19,10 +20,13 @@ import websockets
 from websockets.asyncio.client import ClientConnection
 
 from .const import (
+    MCP_MAX_CONCURRENT_REQUESTS,
+    MCP_MAX_QUEUED_REQUESTS,
     RECONNECT_BACKOFF_FACTOR,
     RECONNECT_MAX_DELAY,
     RECONNECT_MIN_DELAY,
 )
+from .recorder import FrameDirection, FrameKind, SessionRecorder
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -41,12 +45,21 @@ class BaseWebSocketClient(ABC):
         self._reconnect_delay = RECONNECT_MIN_DELAY
         self._should_reconnect = False
         self._connected = False
+        # Serializes writes: handlers running as background tasks send too
+        self._write_lock = asyncio.Lock()
+        self._background_tasks: set[asyncio.Task[None]] = set()
+        self._background_slots = asyncio.Semaphore(MCP_MAX_CONCURRENT_REQUESTS)
+        self._recorder: SessionRecorder | None = None
 
     @property
     def is_connected(self) -> bool:
         """Return True if connected."""
         return self._connected
 
+    def set_recorder(self, recorder: SessionRecorder | None) -> None:
+        """Record every frame sent and received from now on (None stops)."""
+        self._recorder = recorder
+
     @abstractmethod
     def _get_ws_url(self) -> str:
         """Return the WebSocket URL to connect to."""
@@ -68,11 +81,88 @@ class BaseWebSocketClient(ABC):
     async def _handle_binary_message(self, data: bytes) -> None:
         """Handle a binary message. Override if needed."""
 
+    async def _send(self, message: str | bytes) -> None:
+        """Send one message; concurrent senders are serialized."""
+        async with self._write_lock:
+            if self._ws is None:
+                raise ConnectionError("Not connected")
+            await self._ws.send(message)
+            if self._recorder:
+                self._recorder.record(FrameDirection.OUTBOUND, message)
+
+    async def _recv(self) -> str | bytes:
+        """Receive one message outside the listener loop (e.g. handshakes)."""
+        if self._ws is None:
+            raise ConnectionError("Not connected")
+        message = await self._ws.recv()
+        if self._recorder:
+            self._recorder.record(FrameDirection.INBOUND, message)
+        return message
+
+    def _create_background_task(self, coro: Coroutine[Any, Any, None]) -> bool:
+        """Run a handler off the listener loop, bounded in concurrency.
+
+        Slow work (e.g. MCP tool calls) must not block the listener, or
+        incoming audio and TTS messages stall until it finishes. Returns
+        False, without running coro, if too many handlers already wait for
+        a slot.
+        """
+        if len(self._background_tasks) >= (
+            MCP_MAX_CONCURRENT_REQUESTS + MCP_MAX_QUEUED_REQUESTS
+        ):
+            coro.close()
+            _LOGGER.warning(
+                "Refusing background handler: %d already running or waiting",
+                len(self._background_tasks),
+            )
+            return False
+        task = asyncio.get_running_loop().create_task(self._run_background(coro))
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+        # Closes coro if the task was cancelled before it started
+        task.add_done_callback(lambda _: coro.close())
+        return True
+
+    async def _run_background(self, coro: Coroutine[Any, Any, None]) -> None:
+        """Wait for a free slot, then run coro, logging any failure."""
+        try:
+            async with self._background_slots:
+                await coro
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            _LOGGER.exception("Error in background message handler")
+
+    def _abort_background_tasks(self) -> None:
+        """Cancel background handlers without waiting for them.
+
+        Called when the connection is lost: their replies belong to that
+        connection's server session, and after a reconnect would reach a
+        new session that never sent their request IDs.
+        """
+        for task in self._background_tasks:
+            task.cancel()
+
+    async def _cancel_background_tasks(self) -> None:
+        """Cancel running background handlers."""
+        tasks = list(self._background_tasks)
+        for task in tasks:
+            task.cancel()
+        for task in tasks:
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+        self._background_tasks.clear()
+
     async def connect(self) -> None:
         """Connect to the WebSocket endpoint."""
         self._should_reconnect = True
         await self._connect_once()
 
+    def connect_in_background(self) -> None:
+        """Keep trying to connect (with backoff) without blocking the caller."""
+        self._should_reconnect = True
+        self._schedule_reconnect()
+
     async def _connect_once(self) -> None:
         """Single connection attempt."""
         url = self._get_ws_url()
@@ -89,7 +179,7 @@ class BaseWebSocketClient(ABC):
                     break
 
         ssl_context = None
-        if url.startswith("wss://"):
+        if url.startswith(("wss://", "mqtts://")):
             loop = asyncio.get_running_loop()
             ssl_context = await loop.run_in_executor(
                 None, ssl_module.create_default_context
@@ -97,13 +187,13 @@ class BaseWebSocketClient(ABC):
 
         try:
             self._ws = await asyncio.wait_for(
-                websockets.connect(
-                    url,
-                    additional_headers=headers,
-                    ssl=ssl_context,
-                ),
+                self._open_connection(url, headers, ssl_context),
                 timeout=_CONNECT_TIMEOUT,
             )
+            if self._recorder:
+                self._recorder.record_event(
+                    FrameKind.CONNECT, self._sanitize_url(url)
+                )
             self._connected = True
             self._reconnect_delay = RECONNECT_MIN_DELAY
             _LOGGER.debug("WebSocket connected to %s", self._sanitize_url(url))
@@ -118,12 +208,31 @@ class BaseWebSocketClient(ABC):
             self._connected = False
             raise
 
+    async def _open_connection(
+        self,
+        url: str,
+        headers: dict[str, str] | None,
+        ssl_context: ssl_module.SSLContext | None,
+    ) -> ClientConnection:
+        """Open the connection.
+
+        Subclasses may return any object with the same send/recv/async
+        iteration/close calls (other transports, recorded sessions).
+        """
+        return await websockets.connect(
+            url,
+            additional_headers=headers,
+            ssl=ssl_context,
+        )
+
     async def _listener_loop(self) -> None:
         """Listen for incoming WebSocket messages."""
         assert self._ws is not None
 
         try:
             async for message in self._ws:
+                if self._recorder:
+                    self._recorder.record(FrameDirection.INBOUND, message)
                 if isinstance(message, bytes):
                     await self._handle_binary_message(message)
                     continue
@@ -142,6 +251,9 @@ class BaseWebSocketClient(ABC):
             _LOGGER.exception("Error in WebSocket listener")
         finally:
             self._connected = False
+            if self._recorder:
+                self._recorder.record_event(FrameKind.DISCONNECT)
+            self._abort_background_tasks()
             self._on_disconnected()
             if self._should_reconnect:
                 self._schedule_reconnect()
@@ -186,12 +298,15 @@ class BaseWebSocketClient(ABC):
 
         self._reconnect_task = None
         self._listener_task = None
+        await self._cancel_background_tasks()
 
         if self._ws:
             await self._ws.close()
             self._ws = None
 
         self._connected = False
+        if self._recorder:
+            await self._recorder.aclose()
 
     @staticmethod
     def _sanitize_url(url: str) -> str:
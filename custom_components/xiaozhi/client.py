@@ -3,16 +3,23 @@
 from __future__ import annotations
 
 import asyncio
+import contextlib
 import json
 import logging
+import time
+from collections import deque
+from collections.abc import AsyncIterator
+from dataclasses import dataclass
 from typing import TYPE_CHECKING, Any
 
+from .arena import AudioArena
 from .audio import pack_audio_frame, unpack_audio_frame
 from .base_ws import BaseWebSocketClient
 from .const import (
     LISTEN_STATE_DETECT,
     LISTEN_STATE_START,
     LISTEN_STATE_STOP,
+    MSG_TYPE_ABORT,
     MSG_TYPE_HELLO,
     MSG_TYPE_LISTEN,
     MSG_TYPE_MCP,
@@ -22,30 +29,73 @@ from .const import (
     TTS_STATE_START,
     TTS_STATE_STOP,
 )
-from .models import ConnectionState, PendingRequest, VoicePipelineSession, XiaozhiConfig
+from .metrics import TurnStage, TurnTimeline
+from .models import (
+    ConnectionState,
+    PendingRequest,
+    TextStreamEvent,
+    TextStreamEventType,
+    VoicePipelineSession,
+    XiaozhiConfig,
+)
+from .uplink import UplinkController, UplinkParams
 
 if TYPE_CHECKING:
+    from .audio import IncrementalOpusDecoder
     from .mcp_handler import MCPHandler
 
 _LOGGER = logging.getLogger(__name__)
 
+# After abort, frames of the aborted turn are dropped until its tts stop
+# arrives, or at most this long (seconds) if the server never sends one
+_ABORT_DISCARD_WINDOW = 2.0
+
+
+@dataclass
+class _Turn:
+    """One request/response exchange on the connection.
+
+    The server answers turns in the order they were started, so every
+    incoming stt/tts/audio message belongs to the oldest open turn.
+    """
+
+    pending: PendingRequest | None = None
+    session: VoicePipelineSession | None = None
+    abort_deadline: float | None = None
+
+    @property
+    def aborted(self) -> bool:
+        """Return True if the turn was aborted (its frames are dropped)."""
+        return self.abort_deadline is not None
+
+    def mark(self, stage: TurnStage) -> None:
+        """Record a latency stage on the turn's timeline, if it has one."""
+        owner = self.session or self.pending
+        if owner is not None and owner.timeline is not None:
+            owner.timeline.mark(stage)
+
 
 class XiaozhiWebSocketClient(BaseWebSocketClient):
     """Persistent WebSocket client for the Xiaozhi server."""
 
+    # "transport" announced in the hello message
+    _transport = "websocket"
+
     def __init__(self, config: XiaozhiConfig) -> None:
         """Initialize the client."""
         super().__init__()
         self._config = config
         self._state = ConnectionState.DISCONNECTED
         self._session_id: str | None = None
-        self._pending: PendingRequest | None = None
         self._send_lock = asyncio.Lock()
-        self._tts_done = asyncio.Event()
-        self._tts_done.set()  # clean state, no drain needed initially
         self._mcp_handler: MCPHandler | None = None
         # Voice pipeline sessions (replaces global _stt_callback/_audio_callback)
         self._active_voice_session: VoicePipelineSession | None = None
+        # Open turns, oldest first; incoming messages go to the head
+        self._turns: deque[_Turn] = deque()
+        self.uplink = UplinkController(
+            config.uplink_bitrate_min, config.uplink_bitrate_max
+        )
 
     @property
     def state(self) -> ConnectionState:
@@ -73,7 +123,7 @@ class XiaozhiWebSocketClient(BaseWebSocketClient):
     async def _on_connected(self) -> None:
         """Perform hello handshake after connection."""
         self._state = ConnectionState.CONNECTED
-        self._tts_done.set()  # clean state after reconnect
+        self._turns.clear()  # clean state after reconnect
         await self._hello_handshake()
 
     def _on_disconnected(self) -> None:
@@ -95,11 +145,15 @@ class XiaozhiWebSocketClient(BaseWebSocketClient):
         self._mcp_handler = handler
 
     def register_voice_session(self, session: VoicePipelineSession) -> None:
-        """Register a voice pipeline session as active.
-
-        Only one voice session can be active at a time. The session receives
-        STT results, TTS chunks, and audio frames from the server.
-        If a previous session is still active, it gets cancelled with a warning.
+        """Register the voice session the next start_listening() opens a turn for.
+
+        Each start_listening() and text request queues a turn (_Turn), and
+        the server answers them in order: incoming STT results, TTS messages
+        and audio frames go to the oldest open turn, and so to the session
+        it was opened for, even after a newer session registered. A pipeline
+        run leases the connection for its whole turn, so a previous session
+        still registered and unfinished here was left behind; it is
+        cancelled.
         """
         old = self._active_voice_session
         if old is not None:
@@ -115,8 +169,17 @@ class XiaozhiWebSocketClient(BaseWebSocketClient):
         """Unregister a voice pipeline session.
 
         Only unregisters if the given session_id matches the active session,
-        preventing a late cleanup from clobbering a newer session.
+        preventing a late cleanup from clobbering a newer session. A turn the
+        session still has open (and not aborted) is closed.
         """
+        for turn in self._turns:
+            if (
+                turn.session is not None
+                and turn.session.session_id == session_id
+                and not turn.aborted
+            ):
+                self._end_turn(turn)
+                break
         if (
             self._active_voice_session is not None
             and self._active_voice_session.session_id == session_id
@@ -128,7 +191,26 @@ class XiaozhiWebSocketClient(BaseWebSocketClient):
         if not self.is_connected or self._ws is None:
             raise ConnectionError("Not connected to Xiaozhi server")
         frame = pack_audio_frame(opus_data)
-        await self._ws.send(frame)
+        started = time.monotonic()
+        await self._send(frame)
+        # Backpressure: a send waits while the write buffer is over its
+        # high-water mark, and whatever is left queued hasn't left the host
+        transport = getattr(self._ws, "transport", None)
+        self.uplink.observe_send(
+            time.monotonic() - started,
+            transport.get_write_buffer_size() if transport is not None else 0,
+        )
+
+    def choose_uplink_params(self) -> UplinkParams:
+        """Pick the opus encoder settings for the next voice turn.
+
+        Uses the latest round-trip time (hello exchange, then keepalive
+        pings) and the send backpressure seen on this connection so far.
+        """
+        latency = getattr(self._ws, "latency", None)
+        # websockets reports 0 until the first keepalive pong has come back
+        self.uplink.observe_rtt(latency or None)
+        return self.uplink.choose()
 
     async def start_listening(self, language: str | None = None) -> None:
         """Send listen start command to begin audio streaming."""
@@ -137,7 +219,13 @@ class XiaozhiWebSocketClient(BaseWebSocketClient):
         msg: dict[str, Any] = {"type": MSG_TYPE_LISTEN, "state": LISTEN_STATE_START}
         if language:
             msg["language"] = language
-        await self._ws.send(json.dumps(msg))
+        turn = _Turn(session=self._active_voice_session)
+        self._turns.append(turn)
+        try:
+            await self._send(json.dumps(msg))
+        except BaseException:
+            self._end_turn(turn)
+            raise
         _LOGGER.debug("Sent listen start (language=%s)", language)
 
     async def stop_listening(self) -> None:
@@ -145,9 +233,71 @@ class XiaozhiWebSocketClient(BaseWebSocketClient):
         if not self.is_connected or self._ws is None:
             raise ConnectionError("Not connected to Xiaozhi server")
         msg = {"type": MSG_TYPE_LISTEN, "state": LISTEN_STATE_STOP}
-        await self._ws.send(json.dumps(msg))
+        await self._send(json.dumps(msg))
         _LOGGER.debug("Sent listen stop")
 
+    def _current_turn(self) -> _Turn | None:
+        """Return the turn incoming messages belong to (oldest open turn).
+
+        An aborted turn whose tts stop never came is dropped after
+        _ABORT_DISCARD_WINDOW so it can't block later turns.
+        """
+        now = time.monotonic()
+        while self._turns:
+            turn = self._turns[0]
+            if turn.abort_deadline is not None and now >= turn.abort_deadline:
+                _LOGGER.debug("Aborted turn got no tts stop, closing it")
+                self._turns.popleft()
+                continue
+            return turn
+        return None
+
+    def _end_turn(self, turn: _Turn) -> None:
+        """Remove a turn from the open turns."""
+        with contextlib.suppress(ValueError):
+            self._turns.remove(turn)
+
+    async def abort(
+        self,
+        reason: str | None = None,
+        session: VoicePipelineSession | None = None,
+    ) -> None:
+        """Abort the server's current turn (LLM generation and TTS).
+
+        Frames still in flight for the aborted turn are discarded, and the
+        next request can start right away instead of draining the stream.
+        If session is given, only abort that session's turn, if still open.
+        """
+        for turn in reversed(self._turns):
+            if turn.aborted:
+                continue
+            if session is None or turn.session is session:
+                await self._abort_turn(turn, reason)
+                return
+
+    async def _abort_turn(self, turn: _Turn, reason: str | None = None) -> None:
+        """Mark turn aborted, fail its waiters and tell the server."""
+        if not self.is_connected:
+            self._end_turn(turn)
+            return
+
+        turn.abort_deadline = time.monotonic() + _ABORT_DISCARD_WINDOW
+        if turn.session is not None and not turn.session.tts_future.done():
+            turn.session.tts_future.cancel()
+        if turn.pending is not None and not turn.pending.future.done():
+            turn.pending.future.cancel()
+
+        msg: dict[str, Any] = {"session_id": self._session_id, "type": MSG_TYPE_ABORT}
+        if reason:
+            msg["reason"] = reason
+        try:
+            await self._send(json.dumps(msg))
+        except Exception:  # noqa: BLE001
+            _LOGGER.debug("Could not send abort", exc_info=True)
+            self._end_turn(turn)
+            return
+        _LOGGER.debug("Sent abort (reason=%s)", reason)
+
     async def _hello_handshake(self) -> None:
         """Send hello and wait for server hello response."""
         assert self._ws is not None
@@ -155,7 +305,7 @@ class XiaozhiWebSocketClient(BaseWebSocketClient):
         hello_msg: dict[str, Any] = {
             "type": MSG_TYPE_HELLO,
             "version": 1,
-            "transport": "websocket",
+            "transport": self._transport,
             "features": {"mcp": True},
             "audio_params": {
                 "format": "opus",
@@ -166,16 +316,20 @@ class XiaozhiWebSocketClient(BaseWebSocketClient):
         if self._config.language:
             hello_msg["audio_params"]["language"] = self._config.language
 
-        await self._ws.send(json.dumps(hello_msg))
+        await self._send(json.dumps(hello_msg))
         _LOGGER.debug("Sent hello message")
+        sent = time.monotonic()
 
-        response = await asyncio.wait_for(self._ws.recv(), timeout=10)
+        response = await asyncio.wait_for(self._recv(), timeout=10)
+        # First RTT sample, until keepalive pings measure the link
+        self.uplink.observe_rtt(time.monotonic() - sent)
         if isinstance(response, bytes):
             raise ConnectionError("Expected text hello response, got binary")
 
         data = json.loads(response)
         if data.get("type") != MSG_TYPE_HELLO:
             raise ConnectionError(f"Expected hello response, got: {data.get('type')}")
+        await self._on_server_hello(data)
 
         self._session_id = data.get("session_id")
         if not self._session_id:
@@ -183,40 +337,70 @@ class XiaozhiWebSocketClient(BaseWebSocketClient):
         self._state = ConnectionState.AUTHENTICATED
         _LOGGER.debug("Authenticated, session_id=%s", self._session_id)
 
+    async def _on_server_hello(self, data: dict[str, Any]) -> None:
+        """Called with the server hello, before the session is authenticated."""
+
     async def send_text(
-        self, text: str, language: str | None = None
-    ) -> tuple[str, list[bytes]]:
+        self,
+        text: str,
+        language: str | None = None,
+        decoder: IncrementalOpusDecoder | None = None,
+        timeline: TurnTimeline | None = None,
+    ) -> tuple[str, AudioArena]:
         """Send text to Xiaozhi server and wait for the response.
 
         Returns (response_text, audio_chunks).
         Raises asyncio.TimeoutError if response takes too long.
 
-        Requests are serialized via _send_lock. If a previous request timed
-        out, the server's leftover TTS stream is drained before sending.
+        If a decoder is given, it is fed TTS audio as it arrives and
+        finished when the request ends. If a timeline is given, the turn's
+        latency stages are marked on it.
+        """
+        async with contextlib.aclosing(
+            self.stream_text(
+                text, language=language, decoder=decoder, timeline=timeline
+            )
+        ) as events:
+            async for event in events:
+                if event.type is TextStreamEventType.DONE:
+                    return event.text, event.audio_chunks
+        raise ConnectionError("Response stream ended without a result")
+
+    async def stream_text(
+        self,
+        text: str,
+        language: str | None = None,
+        decoder: IncrementalOpusDecoder | None = None,
+        timeline: TurnTimeline | None = None,
+    ) -> AsyncIterator[TextStreamEvent]:
+        """Send text to Xiaozhi server and yield the response as it arrives.
+
+        Yields a SENTENCE event per sentence and an AUDIO event per opus
+        packet, then one DONE event with the joined text and all audio.
+        Raises asyncio.TimeoutError if the whole response takes longer than
+        response_timeout.
+
+        Requests are serialized via _send_lock. Each one is a turn: replies
+        are routed to it in order, so there is no need to wait for a
+        previous (aborted) turn's stream to finish. On timeout, cancellation
+        or closing the iterator early the server turn is aborted.
         """
         if not self.is_connected:
             raise ConnectionError("Not connected to Xiaozhi server")
 
         async with self._send_lock:
-            # Drain any leftover TTS from a previous timed-out request
-            if not self._tts_done.is_set():
-                _LOGGER.debug("Draining stale TTS before sending: %s", text)
-                try:
-                    await asyncio.wait_for(self._tts_done.wait(), timeout=5)
-                except asyncio.TimeoutError:
-                    _LOGGER.warning(
-                        "Drain timeout — server may not have finished previous request"
-                    )
-
-            self._tts_done.clear()
-
             loop = asyncio.get_running_loop()
             future: asyncio.Future[str] = loop.create_future()
-            self._pending = PendingRequest(
+            events: asyncio.Queue[TextStreamEvent] = asyncio.Queue()
+            pending = PendingRequest(
                 text=text,
                 future=future,
                 session_id=self._session_id,
+                decoder=decoder,
+                events=events,
+                timeline=timeline,
             )
+            turn = _Turn(pending=pending)
 
             msg: dict[str, Any] = {
                 "type": MSG_TYPE_LISTEN,
@@ -226,51 +410,72 @@ class XiaozhiWebSocketClient(BaseWebSocketClient):
             if language:
                 msg["language"] = language
 
-            assert self._ws is not None
-            await self._ws.send(json.dumps(msg))
-            _LOGGER.debug("Sent text: %s", text)
-
+            self._turns.append(turn)
             try:
-                result_text = await asyncio.wait_for(
-                    future, timeout=self._config.response_timeout
-                )
-                # Yield to event loop — let listener process any trailing binary frames
-                await asyncio.sleep(0)
-                audio = list(self._pending.audio_chunks) if self._pending else []
+                await self._send(json.dumps(msg))
+                turn.mark(TurnStage.LISTEN_START)
+                _LOGGER.debug("Sent text: %s", text)
+                deadline = loop.time() + self._config.response_timeout
+                # Audio frames precede tts stop on the wire, so every event
+                # is queued by the time the future resolves
+                while not (future.done() and events.empty()):
+                    if not events.empty():
+                        yield events.get_nowait()
+                        continue
+                    getter = asyncio.ensure_future(events.get())
+                    try:
+                        await asyncio.wait(
+                            (getter, future),
+                            timeout=deadline - loop.time(),
+                            return_when=asyncio.FIRST_COMPLETED,
+                        )
+                    finally:
+                        getter.cancel()
+                    if getter.done() and not getter.cancelled():
+                        yield getter.result()
+                    elif not future.done():
+                        raise asyncio.TimeoutError
+                result_text = future.result()
+                # Hand the arena over as is; the request is done with it
+                audio = pending.audio_chunks
+                if audio is None:
+                    audio = AudioArena()
                 _LOGGER.debug(
                     "send_text result: text=%.50s..., audio_chunks=%d",
                     result_text, len(audio),
                 )
-                return result_text, audio
-            except asyncio.TimeoutError:
-                self._pending = None
-                # Wait for server to finish its TTS stream before next request
-                _LOGGER.debug("Timeout — waiting for server to finish TTS")
-                try:
-                    await asyncio.wait_for(self._tts_done.wait(), timeout=5)
-                except asyncio.TimeoutError:
-                    _LOGGER.warning(
-                        "Server did not finish TTS within drain timeout"
-                    )
+                yield TextStreamEvent(
+                    TextStreamEventType.DONE, text=result_text, audio_chunks=audio
+                )
+            except (asyncio.TimeoutError, asyncio.CancelledError, GeneratorExit):
+                # Stop the server generating a reply nobody will read
+                _LOGGER.debug("Request timed out or cancelled — aborting: %s", text)
+                if not turn.aborted and not future.done():
+                    await self._abort_turn(turn)
+                raise
+            except BaseException:
+                self._end_turn(turn)
                 raise
             finally:
-                if self._pending and self._pending.future is future:
-                    self._pending = None
+                if decoder is not None:
+                    decoder.finish()
 
     async def _handle_binary_message(self, data: bytes) -> None:
-        """Handle incoming binary WebSocket frame (audio)."""
+        """Handle incoming binary WebSocket frame (audio) for the current turn."""
+        turn = self._current_turn()
+        if turn is None or turn.aborted:
+            return
         opus_payload = unpack_audio_frame(data)
         if opus_payload is None:
             return
 
-        # Route to active voice session
-        session = self._active_voice_session
-        if session is not None:
-            session.audio_chunks.append(opus_payload)
-
-        # Also collect for text-mode pending request
-        if self._pending:
-            self._pending.audio_chunks.append(opus_payload)
+        turn.mark(TurnStage.FIRST_AUDIO)
+        # The payload is a view into data; add_audio copies it into the
+        # owner's arena, the only copy the packet gets
+        if turn.session is not None:
+            turn.session.add_audio(opus_payload)
+        if turn.pending is not None:
+            turn.pending.add_audio(opus_payload)
 
     async def _handle_text_message(self, data: dict[str, Any]) -> None:
         """Route incoming message by type."""
@@ -289,59 +494,92 @@ class XiaozhiWebSocketClient(BaseWebSocketClient):
             _LOGGER.debug("Received message type=%s", msg_type)
 
     def _handle_tts(self, data: dict[str, Any]) -> None:
-        """Handle TTS messages, collecting sentence chunks."""
+        """Handle TTS messages for the current turn, collecting sentence chunks."""
         state = data.get("state")
-        session = self._active_voice_session
+        turn = self._current_turn()
+        if turn is None:
+            _LOGGER.debug("Dropping TTS %s outside any turn", state)
+            return
+        session = turn.session
+        pending = turn.pending
 
         if state == TTS_STATE_START:
             _LOGGER.debug("TTS stream started")
         elif state == TTS_STATE_SENTENCE_START:
             text = data.get("text", "")
-            if text and not text.startswith("%"):
+            if text and not text.startswith("%") and not turn.aborted:
+                turn.mark(TurnStage.FIRST_SENTENCE)
                 if session is not None:
-                    session.response_chunks.append(text)
-                if self._pending:
-                    self._pending.response_chunks.append(text)
+                    session.add_sentence(text)
+                if pending is not None:
+                    pending.add_sentence(text)
             _LOGGER.debug("TTS chunk: %s", text)
         elif state == TTS_STATE_STOP:
-            _LOGGER.debug("TTS stream stopped")
-            self._tts_done.set()
+            _LOGGER.debug("TTS stream stopped%s", " (aborted turn)" if turn.aborted else "")
+            self._end_turn(turn)
+            if turn.aborted:
+                return
+            turn.mark(TurnStage.TTS_STOP)
             if session is not None and not session.tts_future.done():
                 result = " ".join(session.response_chunks)
                 session.tts_future.set_result(result)
-            if self._pending and not self._pending.future.done():
-                result = " ".join(self._pending.response_chunks)
-                self._pending.future.set_result(result)
+            if pending is not None and not pending.future.done():
+                result = " ".join(pending.response_chunks)
+                pending.future.set_result(result)
 
     def _handle_stt(self, data: dict[str, Any]) -> None:
         """Handle STT result message from server."""
         text = data.get("text", "")
-        if not text:
+        turn = self._current_turn()
+        if not text or turn is None or turn.aborted:
             return
 
-        session = self._active_voice_session
+        turn.mark(TurnStage.STT_RESULT)
+        session = turn.session
         if session is not None:
             session.stt_text = text
             session.stt_event.set()
         _LOGGER.debug("STT result: %s", text)
 
     async def _handle_mcp(self, data: dict[str, Any]) -> None:
-        """Handle incoming MCP tool call requests."""
+        """Dispatch incoming MCP tool call requests off the listener loop.
+
+        Tool calls can be slow; running them inline would stall TTS text and
+        audio frames arriving on the same connection. A request refused
+        because too many are in progress is answered with an error at once.
+        """
         if self._mcp_handler is None:
             _LOGGER.warning("Received MCP message but no handler configured")
             return
 
-        mcp_data = data.get("payload", {})
-        response = await self._mcp_handler.handle_request(mcp_data)
+        payload = data.get("payload", {})
+        if not self._create_background_task(
+            self._process_mcp(self._mcp_handler, payload)
+        ):
+            response = self._mcp_handler.busy_response(payload)
+            if response:
+                msg = {"type": MSG_TYPE_MCP, "payload": response}
+                await self._send(json.dumps(msg))
+
+    async def _process_mcp(
+        self, handler: MCPHandler, mcp_data: dict[str, Any]
+    ) -> None:
+        """Run an MCP request and send the response back."""
+        response = await handler.handle_request(mcp_data)
 
         if response and self._ws:
             msg = {"type": MSG_TYPE_MCP, "payload": response}
-            await self._ws.send(json.dumps(msg))
+            await self._send(json.dumps(msg))
 
     def _fail_pending(self, reason: str) -> None:
         """Fail any pending request with an error."""
-        if self._pending and not self._pending.future.done():
-            self._pending.future.set_exception(ConnectionError(reason))
+        for turn in self._turns:
+            if turn.pending is not None and not turn.pending.future.done():
+                turn.pending.future.set_exception(ConnectionError(reason))
+            if turn.session is not None and not turn.session.tts_future.done():
+                turn.session.tts_future.set_exception(ConnectionError(reason))
+                turn.session.stt_event.set()
+        self._turns.clear()
         # Also fail active voice session
         session = self._active_voice_session
         if session is not None and not session.tts_future.done():
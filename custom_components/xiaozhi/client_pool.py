@@ -0,0 +1,248 @@
+"""Pool of Xiaozhi WebSocket connections.
+
+A single connection answers one turn at a time, in order (one active voice
+session), so concurrent conversations or satellites would
+queue behind or cancel each other. The pool keeps several authenticated
+connections, each with its own hello handshake and server session_id, and
+leases an idle one to every text request and voice pipeline run.
+
+With the MQTT + UDP transport the broker allows one session per MQTT
+client id, so the pool holds a single connection.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+import time
+from collections import deque
+from collections.abc import AsyncIterator
+from typing import TYPE_CHECKING, Any
+
+from .client import XiaozhiWebSocketClient
+from .const import DEFAULT_CONNECTION_POOL_SIZE, TRANSPORT_MQTT_UDP
+from .models import TextStreamEvent, XiaozhiConfig
+
+if TYPE_CHECKING:
+    from .arena import AudioArena
+    from .audio import IncrementalOpusDecoder
+    from .mcp_handler import MCPHandler
+    from .metrics import TurnTimeline
+    from .uplink import UplinkParams
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def _create_client(config: XiaozhiConfig) -> XiaozhiWebSocketClient:
+    """Create a client for the configured transport."""
+    if config.transport == TRANSPORT_MQTT_UDP:
+        # Imported here so paho-mqtt is only loaded when the transport is used
+        from .mqtt_udp import XiaozhiMqttUdpClient
+
+        return XiaozhiMqttUdpClient(config)
+    return XiaozhiWebSocketClient(config)
+
+
+class XiaozhiClientPool:
+    """Leases idle connections to turns, FIFO when all are busy.
+
+    The FIFO hand-off makes the pool a fair scheduler: at most `size` turns
+    run at once, and waiting turns are served in arrival order.
+    """
+
+    def __init__(
+        self,
+        config: XiaozhiConfig,
+        size: int = DEFAULT_CONNECTION_POOL_SIZE,
+    ) -> None:
+        """Initialize the pool with `size` (unconnected) clients."""
+        self._config = config
+        if config.transport == TRANSPORT_MQTT_UDP and size > 1:
+            _LOGGER.info("MQTT + UDP transport uses a single connection")
+            size = 1
+        self._clients = [_create_client(config) for _ in range(max(1, size))]
+        self._idle: deque[XiaozhiWebSocketClient] = deque(self._clients)
+        self._waiters: deque[asyncio.Future[XiaozhiWebSocketClient]] = deque()
+        # Stats
+        self._requests = 0
+        self._queued = 0
+        self._max_queue_depth = 0
+        self._wait_total_ms = 0.0
+        self._wait_max_ms = 0.0
+
+    @property
+    def size(self) -> int:
+        """Return the number of connections."""
+        return len(self._clients)
+
+    @property
+    def primary(self) -> XiaozhiWebSocketClient:
+        """Return the first connection."""
+        return self._clients[0]
+
+    @property
+    def clients(self) -> list[XiaozhiWebSocketClient]:
+        """Return all connections."""
+        return list(self._clients)
+
+    def uplink_choices(self) -> list[UplinkParams]:
+        """Return the uplink settings any connection can pick next.
+
+        For keeping their encoders warm.
+        """
+        return list(
+            dict.fromkeys(
+                params
+                for client in self._clients
+                for params in client.uplink.next_choices()
+            )
+        )
+
+    @property
+    def is_connected(self) -> bool:
+        """Return True if at least one connection is ready."""
+        return any(client.is_connected for client in self._clients)
+
+    def set_mcp_handler(self, handler: MCPHandler) -> None:
+        """Route MCP tool calls from every connection to handler."""
+        for client in self._clients:
+            client.set_mcp_handler(handler)
+
+    async def connect(self) -> None:
+        """Connect all clients.
+
+        Raises if the primary connection fails. Extra connections that fail
+        keep retrying in the background.
+        """
+        await self.primary.connect()
+        extra = self._clients[1:]
+        results = await asyncio.gather(
+            *(client.connect() for client in extra), return_exceptions=True
+        )
+        for index, (client, result) in enumerate(zip(extra, results), start=1):
+            if isinstance(result, BaseException):
+                _LOGGER.warning(
+                    "Pool connection %d failed, retrying in background: %s",
+                    index,
+                    result,
+                )
+                client.connect_in_background()
+
+    async def disconnect(self) -> None:
+        """Disconnect all clients and fail queued requests."""
+        for waiter in self._waiters:
+            if not waiter.done():
+                waiter.set_exception(ConnectionError("Client disconnected"))
+        self._waiters.clear()
+        await asyncio.gather(*(client.disconnect() for client in self._clients))
+
+    async def send_text(
+        self,
+        text: str,
+        language: str | None = None,
+        decoder: IncrementalOpusDecoder | None = None,
+        timeline: TurnTimeline | None = None,
+    ) -> tuple[str, AudioArena]:
+        """Send text on an idle connection; see XiaozhiWebSocketClient.send_text."""
+        client = await self.acquire()
+        try:
+            return await client.send_text(
+                text, language=language, decoder=decoder, timeline=timeline
+            )
+        finally:
+            self.release(client)
+
+    async def stream_text(
+        self,
+        text: str,
+        language: str | None = None,
+        decoder: IncrementalOpusDecoder | None = None,
+        timeline: TurnTimeline | None = None,
+    ) -> AsyncIterator[TextStreamEvent]:
+        """Stream a response on an idle connection; see XiaozhiWebSocketClient.stream_text."""
+        client = await self.acquire()
+        try:
+            async with contextlib.aclosing(
+                client.stream_text(
+                    text, language=language, decoder=decoder, timeline=timeline
+                )
+            ) as events:
+                async for event in events:
+                    yield event
+        finally:
+            self.release(client)
+
+    def _take_idle(self) -> XiaozhiWebSocketClient | None:
+        """Take a connected idle client, if any."""
+        for client in self._idle:
+            if client.is_connected:
+                self._idle.remove(client)
+                return client
+        return None
+
+    async def acquire(self) -> XiaozhiWebSocketClient:
+        """Lease an idle connected client (FIFO among waiters).
+
+        The caller must hand it back with release(). Raises ConnectionError
+        if nothing is connected, asyncio.TimeoutError if no client frees up
+        within the response timeout.
+        """
+        if not self.is_connected:
+            raise ConnectionError("Not connected to Xiaozhi server")
+
+        self._requests += 1
+        start = time.monotonic()
+        client = None if self._waiters else self._take_idle()
+        if client is None:
+            self._queued += 1
+            waiter: asyncio.Future[XiaozhiWebSocketClient] = (
+                asyncio.get_running_loop().create_future()
+            )
+            self._waiters.append(waiter)
+            self._max_queue_depth = max(self._max_queue_depth, len(self._waiters))
+            try:
+                client = await asyncio.wait_for(
+                    asyncio.shield(waiter), timeout=self._config.response_timeout
+                )
+            except (asyncio.TimeoutError, asyncio.CancelledError):
+                if waiter.done() and not waiter.cancelled() and not waiter.exception():
+                    # Handed a client just as we gave up: pass it on
+                    self.release(waiter.result())
+                else:
+                    waiter.cancel()
+                    with contextlib.suppress(ValueError):
+                        self._waiters.remove(waiter)
+                raise
+
+        waited_ms = (time.monotonic() - start) * 1000
+        self._wait_total_ms += waited_ms
+        self._wait_max_ms = max(self._wait_max_ms, waited_ms)
+        return client
+
+    def release(self, client: XiaozhiWebSocketClient) -> None:
+        """Return a leased client: hand it to the oldest waiter, or mark it idle."""
+        if client.is_connected:
+            while self._waiters:
+                waiter = self._waiters.popleft()
+                if not waiter.done():
+                    waiter.set_result(client)
+                    return
+        self._idle.append(client)
+
+    @property
+    def stats(self) -> dict[str, Any]:
+        """Return pool counters (connections, queue depth, wait time)."""
+        return {
+            "size": self.size,
+            "connected": sum(1 for c in self._clients if c.is_connected),
+            "busy": self.size - len(self._idle),
+            "queue_depth": len(self._waiters),
+            "max_queue_depth": self._max_queue_depth,
+            "requests": self._requests,
+            "queued": self._queued,
+            "queue_wait_avg_ms": (
+                round(self._wait_total_ms / self._requests, 2) if self._requests else 0.0
+            ),
+            "queue_wait_max_ms": round(self._wait_max_ms, 2),
+        }
@@ -0,0 +1,223 @@
+"""In-process Opus codec for Xiaozhi integration.
+
+Thin ctypes binding to the system libopus. Lets audio.py encode uplink
+audio and decode TTS replies without spawning an FFmpeg process per turn.
+If libopus cannot be loaded, audio.py falls back to the FFmpeg path.
+"""
+
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import logging
+
+_LOGGER = logging.getLogger(__name__)
+
+# libopus constants (opus_defines.h)
+_OPUS_OK = 0
+_OPUS_APPLICATION_VOIP = 2048
+_OPUS_SET_BITRATE_REQUEST = 4002
+_OPUS_SET_VBR_REQUEST = 4006
+
+# Largest packet libopus may produce (RFC 6716 recommends 4000 bytes)
+_MAX_PACKET_BYTES = 4000
+# Longest packet duration Opus allows (120 ms)
+_MAX_PACKET_DURATION_MS = 120
+
+# Shared library names tried when ctypes.util.find_library() finds nothing
+_LIBOPUS_NAMES = ("libopus.so.0", "libopus.so", "libopus.0.dylib", "opus.dll")
+
+_libopus: ctypes.CDLL | None = None
+_libopus_loaded = False
+
+
+class OpusError(Exception):
+    """libopus call failed."""
+
+
+def _load_libopus() -> ctypes.CDLL | None:
+    """Load libopus and declare the function signatures we use."""
+    names: list[str] = []
+    found = ctypes.util.find_library("opus")
+    if found:
+        names.append(found)
+    names.extend(_LIBOPUS_NAMES)
+
+    lib: ctypes.CDLL | None = None
+    for name in names:
+        try:
+            lib = ctypes.CDLL(name)
+            break
+        except OSError:
+            continue
+    if lib is None:
+        return None
+
+    c_int_p = ctypes.POINTER(ctypes.c_int)
+
+    lib.opus_encoder_create.argtypes = [ctypes.c_int32, ctypes.c_int, ctypes.c_int, c_int_p]
+    lib.opus_encoder_create.restype = ctypes.c_void_p
+    lib.opus_encoder_destroy.argtypes = [ctypes.c_void_p]
+    lib.opus_encoder_destroy.restype = None
+    lib.opus_encode.argtypes = [
+        ctypes.c_void_p,
+        ctypes.c_char_p,
+        ctypes.c_int,
+        ctypes.c_char_p,
+        ctypes.c_int32,
+    ]
+    lib.opus_encode.restype = ctypes.c_int32
+    # opus_encoder_ctl is variadic — argument types are passed per call
+    lib.opus_encoder_ctl.restype = ctypes.c_int
+
+    lib.opus_decoder_create.argtypes = [ctypes.c_int32, ctypes.c_int, c_int_p]
+    lib.opus_decoder_create.restype = ctypes.c_void_p
+    lib.opus_decoder_destroy.argtypes = [ctypes.c_void_p]
+    lib.opus_decoder_destroy.restype = None
+    lib.opus_decode.argtypes = [
+        ctypes.c_void_p,
+        ctypes.c_char_p,
+        ctypes.c_int32,
+        ctypes.c_char_p,
+        ctypes.c_int,
+        ctypes.c_int,
+    ]
+    lib.opus_decode.restype = ctypes.c_int
+
+    lib.opus_strerror.argtypes = [ctypes.c_int]
+    lib.opus_strerror.restype = ctypes.c_char_p
+    lib.opus_get_version_string.argtypes = []
+    lib.opus_get_version_string.restype = ctypes.c_char_p
+    return lib
+
+
+def _get_libopus() -> ctypes.CDLL | None:
+    """Return the loaded libopus handle, loading it on first use."""
+    global _libopus, _libopus_loaded  # noqa: PLW0603
+    if not _libopus_loaded:
+        _libopus_loaded = True
+        try:
+            _libopus = _load_libopus()
+        except (OSError, AttributeError):
+            _LOGGER.debug("libopus found but unusable", exc_info=True)
+            _libopus = None
+        if _libopus is not None:
+            _LOGGER.debug(
+                "Using in-process %s", _libopus.opus_get_version_string().decode()
+            )
+        else:
+            _LOGGER.debug("libopus not available, FFmpeg will be used for audio")
+    return _libopus
+
+
+def libopus_available() -> bool:
+    """Return True if libopus can be used in-process."""
+    return _get_libopus() is not None
+
+
+def _strerror(lib: ctypes.CDLL, code: int) -> str:
+    return lib.opus_strerror(code).decode(errors="replace")
+
+
+class OpusEncoder:
+    """Stateful libopus encoder producing raw Opus packets from s16le PCM."""
+
+    def __init__(
+        self,
+        sample_rate: int,
+        channels: int,
+        bitrate: int = 32000,
+        vbr: bool = True,
+    ) -> None:
+        """Create the encoder (voip application, like the FFmpeg path)."""
+        lib = _get_libopus()
+        if lib is None:
+            raise OpusError("libopus is not available")
+        self._lib = lib
+        self._channels = channels
+        error = ctypes.c_int()
+        self._state = lib.opus_encoder_create(
+            sample_rate, channels, _OPUS_APPLICATION_VOIP, ctypes.byref(error)
+        )
+        if error.value != _OPUS_OK or not self._state:
+            raise OpusError(f"opus_encoder_create failed: {_strerror(lib, error.value)}")
+        self._ctl(_OPUS_SET_BITRATE_REQUEST, bitrate)
+        self._ctl(_OPUS_SET_VBR_REQUEST, 1 if vbr else 0)
+        self._out = ctypes.create_string_buffer(_MAX_PACKET_BYTES)
+        # Slicing a view copies only the bytes written (.raw copies it all)
+        self._out_view = memoryview(self._out).cast("B")
+
+    def _ctl(self, request: int, value: int) -> None:
+        ret = self._lib.opus_encoder_ctl(
+            ctypes.c_void_p(self._state), ctypes.c_int(request), ctypes.c_int32(value)
+        )
+        if ret != _OPUS_OK:
+            raise OpusError(f"opus_encoder_ctl({request}) failed: {_strerror(self._lib, ret)}")
+
+    def encode(self, pcm: bytes, frame_size: int) -> bytes:
+        """Encode exactly frame_size samples per channel of s16le PCM."""
+        if len(pcm) != frame_size * self._channels * 2:
+            raise ValueError(f"Expected {frame_size} samples, got {len(pcm)} bytes")
+        n = self._lib.opus_encode(self._state, pcm, frame_size, self._out, _MAX_PACKET_BYTES)
+        if n < 0:
+            raise OpusError(f"opus_encode failed: {_strerror(self._lib, n)}")
+        return self._out_view[:n].tobytes()
+
+    def close(self) -> None:
+        """Free the native encoder state."""
+        if getattr(self, "_state", None):
+            self._lib.opus_encoder_destroy(self._state)
+            self._state = None
+
+    def __del__(self) -> None:
+        self.close()
+
+
+class OpusDecoder:
+    """Stateful libopus decoder producing s16le PCM from raw Opus packets."""
+
+    def __init__(self, sample_rate: int, channels: int) -> None:
+        """Create the decoder for the given output rate/channels."""
+        lib = _get_libopus()
+        if lib is None:
+            raise OpusError("libopus is not available")
+        self._lib = lib
+        self._channels = channels
+        error = ctypes.c_int()
+        self._state = lib.opus_decoder_create(sample_rate, channels, ctypes.byref(error))
+        if error.value != _OPUS_OK or not self._state:
+            raise OpusError(f"opus_decoder_create failed: {_strerror(lib, error.value)}")
+        self._max_samples = sample_rate * _MAX_PACKET_DURATION_MS // 1000
+        self._out = ctypes.create_string_buffer(self._max_samples * channels * 2)
+        self._out_view = memoryview(self._out).cast("B")
+
+    def decode(self, packet: bytes | memoryview) -> bytes:
+        """Decode one Opus packet to s16le PCM.
+
+        A writable memoryview (e.g. into an AudioArena) is passed to libopus
+        without copying; a read-only one is copied.
+        """
+        data: bytes | ctypes.Array[ctypes.c_char]
+        if isinstance(packet, memoryview):
+            data = (
+                bytes(packet)
+                if packet.readonly
+                else (ctypes.c_char * len(packet)).from_buffer(packet)
+            )
+        else:
+            data = packet
+        n = self._lib.opus_decode(
+            self._state, data, len(packet), self._out, self._max_samples, 0
+        )
+        if n < 0:
+            raise OpusError(f"opus_decode failed: {_strerror(self._lib, n)}")
+        return self._out_view[: n * self._channels * 2].tobytes()
+
+    def close(self) -> None:
+        """Free the native decoder state."""
+        if getattr(self, "_state", None):
+            self._lib.opus_decoder_destroy(self._state)
+            self._state = None
+
+    def __del__(self) -> None:
+        self.close()
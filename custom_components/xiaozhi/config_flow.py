@@ -29,20 +29,54 @@ from homeassistant.helpers.selector import (
 from .client import XiaozhiWebSocketClient
 from .const import (
     CONF_ACCESS_TOKEN,
+    CONF_CACHE_MAX_AUDIO,
+    CONF_CACHE_MAX_ENTRIES,
     CONF_CLIENT_ID,
+    CONF_CONNECTION_POOL_SIZE,
     CONF_DEVICE_ID,
+    CONF_FFMPEG_POOL_SIZE,
     CONF_MCP_URL,
+    CONF_MQTT,
     CONF_PROTOCOL_VERSION,
+    CONF_RECORD_SESSIONS,
     CONF_RESPONSE_TIMEOUT,
     CONF_SERVER_URL,
+    CONF_TRANSPORT,
+    CONF_TTS_OUTPUT_FORMAT,
+    CONF_UPLINK_BITRATE_MAX,
+    CONF_UPLINK_BITRATE_MIN,
+    CONF_VAD_ENABLED,
+    DEFAULT_CACHE_MAX_AUDIO,
+    DEFAULT_CACHE_MAX_ENTRIES,
+    DEFAULT_CONNECTION_POOL_SIZE,
+    DEFAULT_FFMPEG_POOL_SIZE,
     DEFAULT_PROTOCOL_VERSION,
+    DEFAULT_RECORD_SESSIONS,
     DEFAULT_RESPONSE_TIMEOUT,
+    DEFAULT_TRANSPORT,
+    DEFAULT_TTS_OUTPUT_FORMAT,
+    DEFAULT_UPLINK_BITRATE_MAX,
+    DEFAULT_UPLINK_BITRATE_MIN,
+    DEFAULT_VAD_ENABLED,
     DOMAIN,
+    MAX_CACHE_MAX_AUDIO,
+    MAX_CACHE_MAX_ENTRIES,
+    MAX_CONNECTION_POOL_SIZE,
+    MAX_FFMPEG_POOL_SIZE,
     MAX_RESPONSE_TIMEOUT,
+    MAX_UPLINK_BITRATE,
+    MIN_CACHE_MAX_AUDIO,
+    MIN_CACHE_MAX_ENTRIES,
+    MIN_CONNECTION_POOL_SIZE,
+    MIN_FFMPEG_POOL_SIZE,
     MIN_RESPONSE_TIMEOUT,
+    MIN_UPLINK_BITRATE,
+    TRANSPORT_MQTT_UDP,
+    TRANSPORTS,
+    TTS_OUTPUT_FORMATS,
 )
 from .custom_tools import TOOL_TEMPLATES, generate_tool_id
-from .models import XiaozhiConfig
+from .models import MqttConfig, XiaozhiConfig
 from .ota import OTAError, XiaozhiOTAClient
 
 _LOGGER = logging.getLogger(__name__)
@@ -67,6 +101,7 @@ class XiaozhiConfigFlow(ConfigFlow, domain=DOMAIN):
         self._activation_message: str | None = None
         self._ws_url: str | None = None
         self._ws_token: str | None = None
+        self._mqtt: MqttConfig | None = None
 
     async def async_step_user(
         self, user_input: dict[str, Any] | None = None
@@ -97,6 +132,7 @@ class XiaozhiConfigFlow(ConfigFlow, domain=DOMAIN):
             return await self._finish_cloud_setup(
                 result.config.websocket_url,
                 result.config.access_token,
+                result.config.mqtt,
             )
 
         self._activation_code = result.code
@@ -104,6 +140,7 @@ class XiaozhiConfigFlow(ConfigFlow, domain=DOMAIN):
         if result.config:
             self._ws_url = result.config.websocket_url
             self._ws_token = result.config.access_token
+            self._mqtt = result.config.mqtt
 
         return self.async_show_form(
             step_id="poll",
@@ -146,7 +183,9 @@ class XiaozhiConfigFlow(ConfigFlow, domain=DOMAIN):
             ws_url = self._ws_url
             ws_token = self._ws_token or ""
 
-        return await self._finish_cloud_setup(ws_url, ws_token)
+        return await self._finish_cloud_setup(
+            ws_url, ws_token, ota_config.mqtt or self._mqtt
+        )
 
     async def _validate_connection(self, config: XiaozhiConfig) -> str | None:
         """Validate connection. Returns error key or None."""
@@ -163,7 +202,10 @@ class XiaozhiConfigFlow(ConfigFlow, domain=DOMAIN):
         return None
 
     async def _finish_cloud_setup(
-        self, websocket_url: str, access_token: str
+        self,
+        websocket_url: str,
+        access_token: str,
+        mqtt: MqttConfig | None = None,
     ) -> ConfigFlowResult:
         """Validate cloud connection and create entry."""
         assert self._device_id is not None
@@ -180,16 +222,17 @@ class XiaozhiConfigFlow(ConfigFlow, domain=DOMAIN):
         if error:
             return self.async_abort(reason=error)
 
-        return self.async_create_entry(
-            title="Xiaozhi AI",
-            data={
-                CONF_SERVER_URL: websocket_url,
-                CONF_ACCESS_TOKEN: access_token,
-                CONF_DEVICE_ID: self._device_id,
-                CONF_CLIENT_ID: self._client_id,
-                CONF_PROTOCOL_VERSION: DEFAULT_PROTOCOL_VERSION,
-            },
-        )
+        data: dict[str, Any] = {
+            CONF_SERVER_URL: websocket_url,
+            CONF_ACCESS_TOKEN: access_token,
+            CONF_DEVICE_ID: self._device_id,
+            CONF_CLIENT_ID: self._client_id,
+            CONF_PROTOCOL_VERSION: DEFAULT_PROTOCOL_VERSION,
+        }
+        if mqtt is not None:
+            data[CONF_MQTT] = mqtt.as_dict()
+
+        return self.async_create_entry(title="Xiaozhi AI", data=data)
 
     @staticmethod
     @callback
@@ -222,18 +265,66 @@ class XiaozhiOptionsFlow(OptionsFlow):
         self, user_input: dict[str, Any] | None = None
     ) -> ConfigFlowResult:
         """General settings (timeout)."""
+        errors: dict[str, str] = {}
         if user_input is not None:
-            return self.async_create_entry(
-                data={
+            mqtt: dict[str, Any] | None = None
+            if user_input.get(CONF_UPLINK_BITRATE_MIN, 0) > user_input.get(
+                CONF_UPLINK_BITRATE_MAX, MAX_UPLINK_BITRATE
+            ):
+                errors[CONF_UPLINK_BITRATE_MIN] = "bitrate_range"
+            elif user_input.get(CONF_TRANSPORT) == TRANSPORT_MQTT_UDP:
+                mqtt, errors = await self._async_fetch_mqtt_credentials()
+            if not errors:
+                options = {
                     **user_input,
                     "custom_tools": self._custom_tools,
                 }
-            )
+                if mqtt is not None:
+                    # Data and options in one update, so the entry reloads
+                    # once; finishing the flow with the same options is then
+                    # no change
+                    entry = self.config_entry
+                    self.hass.config_entries.async_update_entry(
+                        entry,
+                        data={**entry.data, CONF_MQTT: mqtt},
+                        options=options,
+                    )
+                return self.async_create_entry(data=options)
 
         current_timeout = self.config_entry.options.get(
             CONF_RESPONSE_TIMEOUT, DEFAULT_RESPONSE_TIMEOUT
         )
         current_mcp_url = self.config_entry.options.get(CONF_MCP_URL, "")
+        current_pool_size = self.config_entry.options.get(
+            CONF_FFMPEG_POOL_SIZE, DEFAULT_FFMPEG_POOL_SIZE
+        )
+        current_output_format = self.config_entry.options.get(
+            CONF_TTS_OUTPUT_FORMAT, DEFAULT_TTS_OUTPUT_FORMAT
+        )
+        current_vad = self.config_entry.options.get(
+            CONF_VAD_ENABLED, DEFAULT_VAD_ENABLED
+        )
+        current_connections = self.config_entry.options.get(
+            CONF_CONNECTION_POOL_SIZE, DEFAULT_CONNECTION_POOL_SIZE
+        )
+        current_record = self.config_entry.options.get(
+            CONF_RECORD_SESSIONS, DEFAULT_RECORD_SESSIONS
+        )
+        current_transport = self.config_entry.options.get(
+            CONF_TRANSPORT, DEFAULT_TRANSPORT
+        )
+        current_bitrate_min = self.config_entry.options.get(
+            CONF_UPLINK_BITRATE_MIN, DEFAULT_UPLINK_BITRATE_MIN
+        )
+        current_bitrate_max = self.config_entry.options.get(
+            CONF_UPLINK_BITRATE_MAX, DEFAULT_UPLINK_BITRATE_MAX
+        )
+        current_cache_audio = self.config_entry.options.get(
+            CONF_CACHE_MAX_AUDIO, DEFAULT_CACHE_MAX_AUDIO
+        )
+        current_cache_entries = self.config_entry.options.get(
+            CONF_CACHE_MAX_ENTRIES, DEFAULT_CACHE_MAX_ENTRIES
+        )
 
         return self.async_show_form(
             step_id="settings",
@@ -253,10 +344,102 @@ class XiaozhiOptionsFlow(OptionsFlow):
                         CONF_MCP_URL,
                         default=current_mcp_url,
                     ): str,
+                    vol.Required(
+                        CONF_FFMPEG_POOL_SIZE,
+                        default=current_pool_size,
+                    ): vol.All(
+                        vol.Coerce(int),
+                        vol.Range(
+                            min=MIN_FFMPEG_POOL_SIZE,
+                            max=MAX_FFMPEG_POOL_SIZE,
+                        ),
+                    ),
+                    vol.Required(
+                        CONF_TTS_OUTPUT_FORMAT,
+                        default=current_output_format,
+                    ): vol.In(TTS_OUTPUT_FORMATS),
+                    vol.Required(
+                        CONF_VAD_ENABLED,
+                        default=current_vad,
+                    ): bool,
+                    vol.Required(
+                        CONF_CONNECTION_POOL_SIZE,
+                        default=current_connections,
+                    ): vol.All(
+                        vol.Coerce(int),
+                        vol.Range(
+                            min=MIN_CONNECTION_POOL_SIZE,
+                            max=MAX_CONNECTION_POOL_SIZE,
+                        ),
+                    ),
+                    vol.Required(
+                        CONF_RECORD_SESSIONS,
+                        default=current_record,
+                    ): bool,
+                    vol.Required(
+                        CONF_TRANSPORT,
+                        default=current_transport,
+                    ): vol.In(TRANSPORTS),
+                    vol.Required(
+                        CONF_UPLINK_BITRATE_MIN,
+                        default=current_bitrate_min,
+                    ): vol.All(
+                        vol.Coerce(int),
+                        vol.Range(min=MIN_UPLINK_BITRATE, max=MAX_UPLINK_BITRATE),
+                    ),
+                    vol.Required(
+                        CONF_UPLINK_BITRATE_MAX,
+                        default=current_bitrate_max,
+                    ): vol.All(
+                        vol.Coerce(int),
+                        vol.Range(min=MIN_UPLINK_BITRATE, max=MAX_UPLINK_BITRATE),
+                    ),
+                    vol.Required(
+                        CONF_CACHE_MAX_AUDIO,
+                        default=current_cache_audio,
+                    ): vol.All(
+                        vol.Coerce(int),
+                        vol.Range(min=MIN_CACHE_MAX_AUDIO, max=MAX_CACHE_MAX_AUDIO),
+                    ),
+                    vol.Required(
+                        CONF_CACHE_MAX_ENTRIES,
+                        default=current_cache_entries,
+                    ): vol.All(
+                        vol.Coerce(int),
+                        vol.Range(
+                            min=MIN_CACHE_MAX_ENTRIES,
+                            max=MAX_CACHE_MAX_ENTRIES,
+                        ),
+                    ),
                 }
             ),
+            errors=errors,
         )
 
+    async def _async_fetch_mqtt_credentials(
+        self,
+    ) -> tuple[dict[str, Any] | None, dict[str, str]]:
+        """Fetch MQTT credentials via OTA if the entry has none yet.
+
+        Entries created before MQTT support only stored WebSocket
+        credentials. Returns the credentials to store (None if the entry
+        already has them) and form errors (empty on success).
+        """
+        entry = self.config_entry
+        if entry.data.get(CONF_MQTT):
+            return None, {}
+        ota_client = XiaozhiOTAClient(async_get_clientsession(self.hass))
+        try:
+            result = await ota_client.request_activation(
+                entry.data[CONF_DEVICE_ID], entry.data[CONF_CLIENT_ID]
+            )
+        except OTAError:
+            _LOGGER.warning("Could not fetch MQTT credentials", exc_info=True)
+            return None, {"base": "mqtt_unavailable"}
+        if result.config is None or result.config.mqtt is None:
+            return None, {"base": "mqtt_unavailable"}
+        return result.config.mqtt.as_dict(), {}
+
     async def async_step_custom_tools(
         self, user_input: dict[str, Any] | None = None
     ) -> ConfigFlowResult:
@@ -574,4 +757,34 @@ class XiaozhiOptionsFlow(OptionsFlow):
                 CONF_RESPONSE_TIMEOUT, DEFAULT_RESPONSE_TIMEOUT
             ),
             CONF_MCP_URL: self.config_entry.options.get(CONF_MCP_URL, ""),
+            CONF_FFMPEG_POOL_SIZE: self.config_entry.options.get(
+                CONF_FFMPEG_POOL_SIZE, DEFAULT_FFMPEG_POOL_SIZE
+            ),
+            CONF_TTS_OUTPUT_FORMAT: self.config_entry.options.get(
+                CONF_TTS_OUTPUT_FORMAT, DEFAULT_TTS_OUTPUT_FORMAT
+            ),
+            CONF_VAD_ENABLED: self.config_entry.options.get(
+                CONF_VAD_ENABLED, DEFAULT_VAD_ENABLED
+            ),
+            CONF_CONNECTION_POOL_SIZE: self.config_entry.options.get(
+                CONF_CONNECTION_POOL_SIZE, DEFAULT_CONNECTION_POOL_SIZE
+            ),
+            CONF_RECORD_SESSIONS: self.config_entry.options.get(
+                CONF_RECORD_SESSIONS, DEFAULT_RECORD_SESSIONS
+            ),
+            CONF_TRANSPORT: self.config_entry.options.get(
+                CONF_TRANSPORT, DEFAULT_TRANSPORT
+            ),
+            CONF_UPLINK_BITRATE_MIN: self.config_entry.options.get(
+                CONF_UPLINK_BITRATE_MIN, DEFAULT_UPLINK_BITRATE_MIN
+            ),
+            CONF_UPLINK_BITRATE_MAX: self.config_entry.options.get(
+                CONF_UPLINK_BITRATE_MAX, DEFAULT_UPLINK_BITRATE_MAX
+            ),
+            CONF_CACHE_MAX_AUDIO: self.config_entry.options.get(
+                CONF_CACHE_MAX_AUDIO, DEFAULT_CACHE_MAX_AUDIO
+            ),
+            CONF_CACHE_MAX_ENTRIES: self.config_entry.options.get(
+                CONF_CACHE_MAX_ENTRIES, DEFAULT_CACHE_MAX_ENTRIES
+            ),
         }
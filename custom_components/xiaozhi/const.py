@@ -10,6 +10,17 @@ CONF_CLIENT_ID = "client_id"
 CONF_PROTOCOL_VERSION = "protocol_version"
 CONF_RESPONSE_TIMEOUT = "response_timeout"
 CONF_MCP_URL = "mcp_url"
+CONF_FFMPEG_POOL_SIZE = "ffmpeg_pool_size"
+CONF_TTS_OUTPUT_FORMAT = "tts_output_format"
+CONF_VAD_ENABLED = "vad_enabled"
+CONF_CONNECTION_POOL_SIZE = "connection_pool_size"
+CONF_RECORD_SESSIONS = "record_sessions"
+CONF_TRANSPORT = "transport"
+CONF_MQTT = "mqtt"
+CONF_UPLINK_BITRATE_MIN = "uplink_bitrate_min"
+CONF_UPLINK_BITRATE_MAX = "uplink_bitrate_max"
+CONF_CACHE_MAX_AUDIO = "cache_max_audio"
+CONF_CACHE_MAX_ENTRIES = "cache_max_entries"
 
 # Defaults
 CLOUD_SERVER_URL = "wss://api.tenclass.net/xiaozhi/v1/"
@@ -17,6 +28,33 @@ DEFAULT_PROTOCOL_VERSION = 3
 DEFAULT_RESPONSE_TIMEOUT = 30
 MIN_RESPONSE_TIMEOUT = 5
 MAX_RESPONSE_TIMEOUT = 120
+DEFAULT_FFMPEG_POOL_SIZE = 1
+MIN_FFMPEG_POOL_SIZE = 0
+MAX_FFMPEG_POOL_SIZE = 8
+DEFAULT_TTS_OUTPUT_FORMAT = "wav"
+DEFAULT_VAD_ENABLED = False
+DEFAULT_CONNECTION_POOL_SIZE = 1
+MIN_CONNECTION_POOL_SIZE = 1
+MAX_CONNECTION_POOL_SIZE = 4
+DEFAULT_RECORD_SESSIONS = False
+# Uplink opus bitrate bounds (kbps) for the adaptive encoder
+DEFAULT_UPLINK_BITRATE_MIN = 16
+DEFAULT_UPLINK_BITRATE_MAX = 32
+MIN_UPLINK_BITRATE = 8
+MAX_UPLINK_BITRATE = 64
+# Pipeline cache bounds: total audio (MiB) and number of cached turns
+DEFAULT_CACHE_MAX_AUDIO = 16
+MIN_CACHE_MAX_AUDIO = 1
+MAX_CACHE_MAX_AUDIO = 256
+DEFAULT_CACHE_MAX_ENTRIES = 32
+MIN_CACHE_MAX_ENTRIES = 1
+MAX_CACHE_MAX_ENTRIES = 500
+
+# Transports: WebSocket for everything, or MQTT control messages + UDP audio
+TRANSPORT_WEBSOCKET = "websocket"
+TRANSPORT_MQTT_UDP = "mqtt_udp"
+TRANSPORTS = [TRANSPORT_WEBSOCKET, TRANSPORT_MQTT_UDP]
+DEFAULT_TRANSPORT = TRANSPORT_WEBSOCKET
 
 # OTA
 OTA_URL = "https://api.tenclass.net/xiaozhi/ota/"
@@ -31,6 +69,7 @@ MSG_TYPE_TTS = "tts"
 MSG_TYPE_ABORT = "abort"
 MSG_TYPE_MCP = "mcp"
 MSG_TYPE_LLM = "llm"
+MSG_TYPE_GOODBYE = "goodbye"
 
 # Listen states
 LISTEN_STATE_DETECT = "detect"
@@ -51,11 +90,68 @@ AUDIO_SAMPLE_RATE_INPUT = 16000
 AUDIO_SAMPLE_RATE_OUTPUT = 24000
 AUDIO_CHANNELS = 1
 AUDIO_FRAME_DURATION_MS = 60
+AUDIO_BITRATE = 32000
 BINARY_FRAME_TYPE_AUDIO = 0
 
+# Adaptive uplink: frame durations (ms) to choose from, the bitrate step
+# (bps; few distinct values keep pre-warmed FFmpeg encoders reusable), and
+# the link thresholds. A send slower than UPLINK_SEND_SLOW, bytes left in
+# the write buffer or an RTT above UPLINK_RTT_HIGH mean congestion; RTT
+# below UPLINK_RTT_LOW with instant sends means a good link. Seconds.
+UPLINK_FRAME_DURATIONS_MS = (20, 40, 60)
+UPLINK_BITRATE_STEP = 8000
+UPLINK_SEND_SLOW = 0.02
+UPLINK_SEND_FAST = 0.002
+UPLINK_RTT_HIGH = 0.3
+UPLINK_RTT_LOW = 0.08
+
+# Opus codec backends (in-process libopus, or FFmpeg subprocess fallback)
+CODEC_BACKEND_AUTO = "auto"
+CODEC_BACKEND_LIBOPUS = "libopus"
+CODEC_BACKEND_FFMPEG = "ffmpeg"
+
+# TTS output formats ("ogg" passes server opus through without decoding)
+TTS_OUTPUT_FORMAT_WAV = "wav"
+TTS_OUTPUT_FORMAT_OGG = "ogg"
+TTS_OUTPUT_FORMATS = [TTS_OUTPUT_FORMAT_WAV, TTS_OUTPUT_FORMAT_OGG]
+
+# Per-call TTS option overriding the configured output format
+TTS_OPTION_OUTPUT_FORMAT = "output_format"
+
+# Voice activity detection on the uplink (milliseconds)
+VAD_FRAME_MS = 30
+VAD_MIN_SPEECH_MS = 90
+VAD_HANGOVER_MS = 300
+VAD_END_SILENCE_MS = 800
+VAD_PRE_ROLL_MS = 300
+
+# MCP tool calls: max handled at once per connection, max waiting for a free
+# slot (more are refused), and per-call timeout (seconds)
+MCP_MAX_CONCURRENT_REQUESTS = 4
+MCP_MAX_QUEUED_REQUESTS = 16
+MCP_REQUEST_TIMEOUT = 30
+
 # Pipeline cache
 PIPELINE_CACHE_TTL = 30
 
+# Per-turn audio arena: initial capacity (bytes), about 8 s of 60 ms packets
+AUDIO_ARENA_INITIAL_CAPACITY = 16 * 1024
+# Per-turn cap (about 20 minutes of speech); packets past it are dropped
+AUDIO_ARENA_MAX_BYTES = 4 * 1024 * 1024
+# Process-wide budget for arenas in RAM; past it, arenas spill to a temp file
+AUDIO_MEMORY_BUDGET = 32 * 1024 * 1024
+
+# Turn latency metrics: samples per rolling histogram, turns kept for diagnostics
+METRICS_WINDOW = 200
+METRICS_RECENT_TURNS = 20
+
+# Session recordings: directory under the HA config dir, file suffix, and
+# how long (seconds) / how much (bytes) frames are buffered before writing
+RECORDINGS_DIR = "xiaozhi_recordings"
+RECORDING_SUFFIX = ".xzrec"
+RECORDER_FLUSH_INTERVAL = 1.0
+RECORDER_FLUSH_BYTES = 64 * 1024
+
 # Pipeline timeouts (seconds)
 STT_RESULT_TIMEOUT = 30
 PIPELINE_COLLECT_TIMEOUT = 60
@@ -69,6 +165,16 @@ OTA_BOARD_TYPE = "ha-integration"
 OTA_BOARD_NAME = "HomeAssistant"
 OTA_DEFAULT_TIMEOUT_MS = 300000
 
+# MQTT + UDP transport: broker port (TLS, also used when the endpoint has
+# none), keepalive (seconds), and the encrypted audio packet layout
+MQTT_TLS_PORT = 8883
+MQTT_KEEPALIVE = 240
+UDP_NONCE_SIZE = 16
+UDP_PACKET_TYPE_AUDIO = 0x01
+# tts stop is held until UDP audio has been quiet this long (seconds), so
+# trailing audio that lost the race against MQTT still lands in its turn
+UDP_REORDER_WINDOW = 0.1
+
 # Reconnection
 RECONNECT_MIN_DELAY = 5
 RECONNECT_MAX_DELAY = 60
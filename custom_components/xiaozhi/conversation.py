@@ -3,7 +3,9 @@
 from __future__ import annotations
 
 import asyncio
+import contextlib
 import logging
+from collections.abc import AsyncIterator
 
 from homeassistant.components.conversation import (
     AssistantContent,
@@ -18,10 +20,24 @@ from homeassistant.core import HomeAssistant
 from homeassistant.helpers import intent
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
+from .audio import IncrementalOpusDecoder
 from .base_entity import XiaozhiBaseEntity
-from .client import XiaozhiWebSocketClient
-from .const import DOMAIN, PIPELINE_COLLECT_TIMEOUT
-from .models import PipelineCacheManager
+from .client_pool import XiaozhiClientPool
+from .const import (
+    CONF_TTS_OUTPUT_FORMAT,
+    DEFAULT_TTS_OUTPUT_FORMAT,
+    DOMAIN,
+    PIPELINE_COLLECT_TIMEOUT,
+    TTS_OUTPUT_FORMAT_WAV,
+)
+from .ffmpeg_pool import FFmpegWorkerPool
+from .metrics import TurnMetrics, TurnStage, TurnTimeline
+from .models import (
+    PipelineCacheManager,
+    PipelineResultCollector,
+    TextStreamEvent,
+    TextStreamEventType,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -33,9 +49,15 @@ async def async_setup_entry(
 ) -> None:
     """Set up Xiaozhi conversation entity from a config entry."""
     data = hass.data[DOMAIN][entry.entry_id]
-    client: XiaozhiWebSocketClient = data["client"]
+    client_pool: XiaozhiClientPool = data["client_pool"]
     cache: PipelineCacheManager = data["cache"]
-    async_add_entities([XiaozhiConversationEntity(entry, client, cache)])
+    async_add_entities(
+        [
+            XiaozhiConversationEntity(
+                entry, client_pool, cache, data.get("ffmpeg_pool"), data.get("metrics")
+            )
+        ]
+    )
 
 
 class XiaozhiConversationEntity(XiaozhiBaseEntity, ConversationEntity):
@@ -43,6 +65,8 @@ class XiaozhiConversationEntity(XiaozhiBaseEntity, ConversationEntity):
 
     _attr_name = None
     _attr_supported_features = ConversationEntityFeature.CONTROL
+    # Replies go to the chat log as deltas, so HA can start TTS early
+    _attr_supports_streaming = True
 
     @property
     def supported_languages(self) -> list[str] | str:
@@ -52,13 +76,22 @@ class XiaozhiConversationEntity(XiaozhiBaseEntity, ConversationEntity):
     def __init__(
         self,
         entry: ConfigEntry,
-        client: XiaozhiWebSocketClient,
+        client: XiaozhiClientPool,
         cache: PipelineCacheManager,
+        ffmpeg_pool: FFmpegWorkerPool | None = None,
+        metrics: TurnMetrics | None = None,
     ) -> None:
         """Initialize the conversation entity."""
         XiaozhiBaseEntity.__init__(self, entry)
         self._client = client
         self._cache = cache
+        self._ffmpeg_pool = ffmpeg_pool
+        self._metrics = metrics or TurnMetrics()
+        # TTS replies are decoded while they arrive unless served as OGG
+        self._decode_tts = (
+            entry.options.get(CONF_TTS_OUTPUT_FORMAT, DEFAULT_TTS_OUTPUT_FORMAT)
+            == TTS_OUTPUT_FORMAT_WAV
+        )
         self._attr_unique_id = entry.entry_id
 
     @property
@@ -73,58 +106,59 @@ class XiaozhiConversationEntity(XiaozhiBaseEntity, ConversationEntity):
     ) -> ConversationResult:
         """Handle a conversation turn."""
         # Voice pipeline mode: STT entity returned immediately and started a
-        # background task to collect LLM response + TTS audio.  Wait for it.
+        # background task to collect LLM response + TTS audio.  Stream the
+        # reply from its session, or wait for it.
         is_voice_mode = False
+        # The STT entity bound its turn to the pipeline run's conversation
+        conversation_id = chat_log.conversation_id
 
-        collector = await self._cache.get_collector(user_input.text)
-        if collector:
+        turn = await self._cache.resolve_input(user_input.text, conversation_id)
+        if isinstance(turn, PipelineResultCollector) and turn.session is not None:
+            # Sentences go to the chat log as the server sends them, so HA
+            # starts streaming TTS from the live session
+            response_text = await self._async_stream_voice_reply(
+                user_input, chat_log, turn
+            )
+            await self._cache.bind_turn(turn, conversation_id)
+        elif isinstance(turn, PipelineResultCollector):
+            collector = turn
             is_voice_mode = True
             _LOGGER.debug("Waiting for pipeline collector: %s", user_input.text)
-            if await collector.wait(timeout=PIPELINE_COLLECT_TIMEOUT):
+            try:
+                ready = await collector.wait(timeout=PIPELINE_COLLECT_TIMEOUT)
+            except asyncio.CancelledError:
+                # Pipeline cancelled: end the voice turn (aborts the server reply)
+                session = collector.session
+                if session is not None and not session.tts_future.done():
+                    session.tts_future.cancel()
+                raise
+            if ready:
                 response_text = collector.response_text
                 _LOGGER.debug("Collector ready: %s", response_text)
+                await self._cache.bind_turn(collector, conversation_id)
             elif collector.failed:
                 response_text = "Request was replaced by a new voice command."
                 _LOGGER.debug("Collector cancelled for: %s", user_input.text)
             else:
                 response_text = "Sorry, the request timed out. Please try again."
                 _LOGGER.warning("Collector timeout for: %s", user_input.text)
+        elif turn is not None:
+            # Instant cache (collector already completed before we got here)
+            is_voice_mode = True
+            _LOGGER.debug("Using cached pipeline response for: %s", user_input.text)
+            response_text = turn.response_text
+            await self._cache.bind_turn(turn, conversation_id)
         else:
-            # Check instant cache (collector already completed before we got here)
-            cached = await self._cache.get_by_input(user_input.text)
-            if cached:
-                is_voice_mode = True
-                _LOGGER.debug("Using cached pipeline response for: %s", user_input.text)
-                response_text = cached.response_text
-            else:
-                # Text mode: normal send_text()
-                try:
-                    response_text, audio_chunks = await self._client.send_text(
-                        user_input.text, language=user_input.language
-                    )
-                    if audio_chunks:
-                        await self._cache.store(user_input.text, response_text, audio_chunks)
-                        _LOGGER.debug("Cached %d audio chunks for TTS", len(audio_chunks))
-                    else:
-                        _LOGGER.debug(
-                            "No audio chunks from send_text (server may not send audio for text mode)"
-                        )
-                except asyncio.TimeoutError:
-                    response_text = "Sorry, the request timed out. Please try again."
-                    _LOGGER.warning("Xiaozhi response timeout for: %s", user_input.text)
-                except ConnectionError as err:
-                    response_text = "Sorry, I'm not connected to the Xiaozhi server."
-                    _LOGGER.error("Xiaozhi connection error: %s", err)
-                except Exception:
-                    response_text = "Sorry, an unexpected error occurred."
-                    _LOGGER.exception("Unexpected error in Xiaozhi conversation")
-
-        chat_log.async_add_assistant_content_without_tools(
-            AssistantContent(
-                agent_id=user_input.agent_id,
-                content=response_text,
+            # Text mode: stream the reply into the chat log as it arrives
+            response_text = await self._async_stream_reply(user_input, chat_log)
+
+        if is_voice_mode:
+            chat_log.async_add_assistant_content_without_tools(
+                AssistantContent(
+                    agent_id=user_input.agent_id,
+                    content=response_text,
+                )
             )
-        )
 
         response = intent.IntentResponse(language=user_input.language)
         response.async_set_speech(response_text)
@@ -133,3 +167,142 @@ class XiaozhiConversationEntity(XiaozhiBaseEntity, ConversationEntity):
             response=response,
             conversation_id=chat_log.conversation_id,
         )
+
+    async def _async_stream_voice_reply(
+        self,
+        user_input: ConversationInput,
+        chat_log: ChatLog,
+        collector: PipelineResultCollector,
+    ) -> str:
+        """Stream a voice turn's reply into chat_log as its session receives it.
+
+        Returns the full response text once the server ends the reply,
+        without waiting for its audio to be decoded and cached.
+        """
+        session = collector.session
+        assert session is not None
+        response_text = ""
+
+        async def _deltas() -> AsyncIterator[dict[str, str]]:
+            nonlocal response_text
+            yield {"role": "assistant"}
+            async for sentence in session.iter_sentences():
+                delta = f" {sentence}" if response_text else sentence
+                response_text += delta
+                yield {"content": delta}
+            error: str | None = None
+            if session.tts_future.cancelled():
+                error = "Request was replaced by a new voice command."
+                _LOGGER.debug("Voice turn cancelled for: %s", user_input.text)
+            elif session.tts_future.exception() is not None:
+                error = "Sorry, I'm not connected to the Xiaozhi server."
+                _LOGGER.warning(
+                    "Voice turn failed for %s: %s",
+                    user_input.text,
+                    session.tts_future.exception(),
+                )
+            if error is not None:
+                delta = f" {error}" if response_text else error
+                response_text += delta
+                yield {"content": delta}
+
+        _LOGGER.debug("Streaming voice pipeline reply: %s", user_input.text)
+        try:
+            async for _content in chat_log.async_add_delta_content_stream(
+                user_input.agent_id, _deltas()
+            ):
+                pass
+        except asyncio.CancelledError:
+            # Pipeline cancelled: end the voice turn (aborts the server reply)
+            if not session.tts_future.done():
+                session.tts_future.cancel()
+            raise
+        return response_text
+
+    async def _async_stream_reply(
+        self,
+        user_input: ConversationInput,
+        chat_log: ChatLog,
+    ) -> str:
+        """Send text mode input and stream the reply into chat_log.
+
+        Each sentence is added as a delta while the LLM is still generating,
+        so HA can start streaming TTS early. The audio is cached for the TTS
+        entity before the stream ends. Returns the full response text.
+        """
+        response_text = ""
+
+        async def _deltas() -> AsyncIterator[dict[str, str]]:
+            nonlocal response_text
+            yield {"role": "assistant"}
+            decoder = (
+                IncrementalOpusDecoder(pool=self._ffmpeg_pool)
+                if self._decode_tts
+                else None
+            )
+            timeline = self._metrics.start_turn("text")
+            error: str | None = None
+            done: TextStreamEvent | None = None
+            try:
+                # Closing the stream (also on early exit) ends the request and
+                # hands its pooled connection back
+                async with contextlib.aclosing(
+                    self._client.stream_text(
+                        user_input.text,
+                        language=user_input.language,
+                        decoder=decoder,
+                        timeline=timeline,
+                    )
+                ) as events:
+                    async for event in events:
+                        if event.type is TextStreamEventType.SENTENCE:
+                            delta = f" {event.text}" if response_text else event.text
+                            response_text += delta
+                            yield {"content": delta}
+                        elif event.type is TextStreamEventType.DONE:
+                            done = event
+                # Decode the tail once the connection is free for other turns
+                if done is not None:
+                    await self._async_cache_reply(
+                        user_input.text, done, decoder, timeline
+                    )
+            except asyncio.TimeoutError:
+                error = "Sorry, the request timed out. Please try again."
+                _LOGGER.warning("Xiaozhi response timeout for: %s", user_input.text)
+            except ConnectionError as err:
+                error = "Sorry, I'm not connected to the Xiaozhi server."
+                _LOGGER.error("Xiaozhi connection error: %s", err)
+            except Exception:
+                error = "Sorry, an unexpected error occurred."
+                _LOGGER.exception("Unexpected error in Xiaozhi conversation")
+            finally:
+                if decoder is not None:
+                    await decoder.aclose()
+            if error is not None:
+                delta = f" {error}" if response_text else error
+                response_text += delta
+                yield {"content": delta}
+
+        async for _content in chat_log.async_add_delta_content_stream(
+            user_input.agent_id, _deltas()
+        ):
+            pass
+        return response_text
+
+    async def _async_cache_reply(
+        self,
+        text: str,
+        result: TextStreamEvent,
+        decoder: IncrementalOpusDecoder | None,
+        timeline: TurnTimeline,
+    ) -> None:
+        """Cache a text mode reply's audio for the TTS entity."""
+        if not result.audio_chunks:
+            _LOGGER.debug(
+                "No audio chunks from send_text (server may not send audio for text mode)"
+            )
+            return
+        wav = await decoder.wav() if decoder else None
+        timeline.mark(TurnStage.DECODE_DONE)
+        await self._cache.store(text, result.text, result.audio_chunks, wav, timeline)
+        _LOGGER.debug("Cached %d audio chunks for TTS", len(result.audio_chunks))
@@ -0,0 +1,54 @@
+"""Diagnostics support for Xiaozhi AI Conversation."""
+
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .arena import AUDIO_MEMORY
+from .client_pool import XiaozhiClientPool
+from .const import (
+    CONF_ACCESS_TOKEN,
+    CONF_CLIENT_ID,
+    CONF_DEVICE_ID,
+    CONF_MCP_URL,
+    CONF_MQTT,
+    CONF_SERVER_URL,
+    DOMAIN,
+)
+from .metrics import TurnMetrics
+
+# The URLs may carry a ?token= secret in their query string
+TO_REDACT = {
+    CONF_ACCESS_TOKEN,
+    CONF_CLIENT_ID,
+    CONF_DEVICE_ID,
+    CONF_MCP_URL,
+    CONF_MQTT,
+    CONF_SERVER_URL,
+}
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry: turn latencies and pool state."""
+    data = hass.data[DOMAIN][entry.entry_id]
+    client_pool: XiaozhiClientPool = data["client_pool"]
+    metrics: TurnMetrics = data["metrics"]
+    ffmpeg_pool = data.get("ffmpeg_pool")
+    return {
+        "entry": {
+            "data": async_redact_data(dict(entry.data), TO_REDACT),
+            "options": async_redact_data(dict(entry.options), TO_REDACT),
+        },
+        "connection_pool": client_pool.stats,
+        "pipeline_cache": data["cache"].stats,
+        "ffmpeg_pool": ffmpeg_pool.stats if ffmpeg_pool else None,
+        "uplink": [client.uplink.as_dict() for client in client_pool.clients],
+        "audio_memory": AUDIO_MEMORY.as_dict(),
+        "turn_metrics": metrics.as_dict(),
+    }
@@ -0,0 +1,327 @@
+"""Pre-warmed FFmpeg worker pool for Xiaozhi integration.
+
+An FFmpeg process handles exactly one stream (stdin EOF ends it), so the
+pool keeps a few processes per command line already spawned and blocked on
+stdin. A turn takes a warm worker and the pool spawns its replacement in
+the background, keeping fork/exec and startup off the critical path.
+
+Only the command lines given at start (e.g. the decoder) and the current
+set_warm() set (the encoders the adaptive uplink can pick next) are kept
+warm; workers of a command line dropped from that set are killed.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+import time
+from collections import deque
+from collections.abc import Iterable
+from typing import Any
+
+from .const import DEFAULT_FFMPEG_POOL_SIZE
+
+_LOGGER = logging.getLogger(__name__)
+
+# Timeout for the one-off capability probe at setup (seconds)
+_PROBE_TIMEOUT = 10
+
+# An idle worker dying sooner than this after spawn is treated as a crash
+# loop (e.g. bad arguments) and that command line is no longer pre-warmed
+_MIN_WORKER_LIFETIME = 5.0
+
+
+class FFmpegWorkerPool:
+    """Keeps pre-spawned FFmpeg processes ready for each command line."""
+
+    def __init__(self, size: int = DEFAULT_FFMPEG_POOL_SIZE) -> None:
+        """Initialize the pool; size is the number of warm workers per command."""
+        self._size = size
+        self._idle: dict[tuple[str, ...], deque[asyncio.subprocess.Process]] = {}
+        self._watchers: dict[int, asyncio.Task[None]] = {}
+        self._refill_tasks: set[asyncio.Task[None]] = set()
+        self._refilling: set[tuple[str, ...]] = set()
+        self._disabled: set[tuple[str, ...]] = set()
+        # Command lines kept warm: those given at start, and the set_warm() set
+        self._pinned: set[tuple[str, ...]] = set()
+        self._warm: set[tuple[str, ...]] = set()
+        self._running = False
+        self._probed = False
+        self.available = False
+        self.has_libopus_encoder = False
+        self.has_opus_decoder = False
+        # Stats
+        self._spawned = 0
+        self._restarted = 0
+        self._warm_hits = 0
+        self._cold_misses = 0
+        self._wait_total_ms = 0.0
+        self._wait_max_ms = 0.0
+
+    @property
+    def size(self) -> int:
+        """Return the number of warm workers kept per command line."""
+        return self._size
+
+    async def async_start(
+        self, prewarm: list[tuple[str, ...]] | None = None
+    ) -> None:
+        """Probe FFmpeg capabilities once and pre-spawn workers.
+
+        The prewarm command lines are kept warm for the life of the pool.
+        """
+        await self._probe()
+        self._running = True
+        self._pinned = set(prewarm or [])
+        if not self.available or self._size <= 0:
+            return
+        for argv in self._pinned:
+            self._schedule_refill(argv)
+
+    def set_warm(self, argvs: Iterable[tuple[str, ...]]) -> None:
+        """Keep workers warm for argvs, besides those given at start.
+
+        Idle workers of command lines no longer in the set are killed, so
+        settings the uplink moved away from don't hold processes.
+        """
+        warm = set(argvs)
+        if warm == self._warm:
+            return
+        dropped = self._warm - warm - self._pinned
+        self._warm = warm
+        for argv in dropped:
+            self._retire(argv)
+        if self._running and self.available and self._size > 0:
+            for argv in warm - self._disabled:
+                self._schedule_refill(argv)
+
+    def _keeps_warm(self, argv: tuple[str, ...]) -> bool:
+        """Return True if idle workers are kept for argv."""
+        return (
+            self._running
+            and self._size > 0
+            and argv not in self._disabled
+            and (argv in self._pinned or argv in self._warm)
+            and self._missing_codec(argv) is None
+        )
+
+    def _missing_codec(self, argv: tuple[str, ...]) -> str | None:
+        """Return the codec argv needs that the probed FFmpeg lacks, if any.
+
+        Encoders name libopus; decoders read OGG/Opus.
+        """
+        if not self._probed:
+            return None
+        if "libopus" in argv:
+            return None if self.has_libopus_encoder else "libopus encoder"
+        if "ogg" in argv and not self.has_opus_decoder:
+            return "opus decoder"
+        return None
+
+    def _retire(self, argv: tuple[str, ...]) -> None:
+        """Kill the idle workers of a command line no longer kept warm."""
+        procs = list(self._idle.pop(argv, ()))
+        if not procs:
+            return
+        for proc in procs:
+            watcher = self._watchers.pop(proc.pid, None)
+            if watcher:
+                watcher.cancel()
+        _LOGGER.debug("Retiring %d idle FFmpeg worker(s): %s", len(procs), argv)
+        task = asyncio.get_running_loop().create_task(self._kill_all(procs))
+        self._refill_tasks.add(task)
+        task.add_done_callback(self._refill_tasks.discard)
+
+    async def _probe(self) -> None:
+        """Check that ffmpeg exists and supports libopus encode/opus decode."""
+        try:
+            proc = await asyncio.create_subprocess_exec(
+                "ffmpeg",
+                "-hide_banner",
+                "-encoders",
+                "-decoders",
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.DEVNULL,
+            )
+            stdout, _ = await asyncio.wait_for(proc.communicate(), _PROBE_TIMEOUT)
+        except (OSError, asyncio.TimeoutError):
+            _LOGGER.warning("FFmpeg not found or not responding; voice audio unavailable")
+            self.available = False
+            return
+
+        self._probed = True
+        output = stdout.decode(errors="replace")
+        self.has_libopus_encoder = " libopus " in output
+        self.has_opus_decoder = " opus " in output or self.has_libopus_encoder
+        self.available = True
+        if not self.has_libopus_encoder:
+            _LOGGER.warning("FFmpeg has no libopus encoder; voice uplink unavailable")
+        _LOGGER.debug(
+            "FFmpeg probe: libopus encoder=%s, opus decoder=%s",
+            self.has_libopus_encoder,
+            self.has_opus_decoder,
+        )
+
+    async def acquire(self, argv: tuple[str, ...]) -> asyncio.subprocess.Process:
+        """Return a started FFmpeg process for argv (stdin/stdout/stderr piped).
+
+        Uses a warm worker when one is idle, otherwise spawns one on demand.
+        The caller owns the returned process; a replacement is spawned in the
+        background so the next turn finds a warm worker again. Raises
+        RuntimeError if the probe found FFmpeg lacks the codec argv needs.
+        """
+        missing = self._missing_codec(argv)
+        if missing is not None:
+            raise RuntimeError(f"FFmpeg has no {missing}")
+        start = time.monotonic()
+        proc = self._pop_idle(argv)
+        if proc is not None:
+            self._warm_hits += 1
+        else:
+            self._cold_misses += 1
+            proc = await self._spawn(argv)
+        if self._keeps_warm(argv):
+            self._schedule_refill(argv)
+
+        waited_ms = (time.monotonic() - start) * 1000
+        self._wait_total_ms += waited_ms
+        self._wait_max_ms = max(self._wait_max_ms, waited_ms)
+        return proc
+
+    def _pop_idle(self, argv: tuple[str, ...]) -> asyncio.subprocess.Process | None:
+        """Take a live idle worker for argv, if any."""
+        idle = self._idle.get(argv)
+        while idle:
+            proc = idle.popleft()
+            watcher = self._watchers.pop(proc.pid, None)
+            if watcher:
+                watcher.cancel()
+            if proc.returncode is None:
+                return proc
+        return None
+
+    async def _spawn(self, argv: tuple[str, ...]) -> asyncio.subprocess.Process:
+        """Spawn a new FFmpeg process for argv."""
+        self._spawned += 1
+        return await asyncio.create_subprocess_exec(
+            *argv,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+
+    def _schedule_refill(self, argv: tuple[str, ...]) -> None:
+        """Top up idle workers for argv in the background."""
+        if argv in self._refilling:
+            return
+        self._refilling.add(argv)
+        task = asyncio.get_running_loop().create_task(self._refill(argv))
+        self._refill_tasks.add(task)
+        task.add_done_callback(self._refill_tasks.discard)
+
+    async def _refill(self, argv: tuple[str, ...]) -> None:
+        """Spawn idle workers until argv has `size` of them."""
+        try:
+            while (
+                self._keeps_warm(argv)
+                and len(self._idle.get(argv, ())) < self._size
+            ):
+                try:
+                    proc = await self._spawn(argv)
+                except OSError:
+                    _LOGGER.warning("Failed to pre-spawn FFmpeg worker", exc_info=True)
+                    return
+                # Stopped, or set_warm dropped argv, while spawning
+                if not self._keeps_warm(argv):
+                    await self._kill(proc)
+                    return
+                self._idle.setdefault(argv, deque()).append(proc)
+                self._watchers[proc.pid] = asyncio.get_running_loop().create_task(
+                    self._watch(argv, proc, time.monotonic())
+                )
+        finally:
+            self._refilling.discard(argv)
+
+    async def _watch(
+        self,
+        argv: tuple[str, ...],
+        proc: asyncio.subprocess.Process,
+        spawned_at: float,
+    ) -> None:
+        """Replace an idle worker that exits before being used."""
+        await proc.wait()
+        self._watchers.pop(proc.pid, None)
+        idle = self._idle.get(argv)
+        if not idle or proc not in idle:
+            return
+        idle.remove(proc)
+        stderr = b""
+        if proc.stderr:
+            with contextlib.suppress(Exception):
+                stderr = await proc.stderr.read()
+        reason = stderr.decode(errors="replace").strip()
+
+        if time.monotonic() - spawned_at < _MIN_WORKER_LIFETIME:
+            self._disabled.add(argv)
+            _LOGGER.warning(
+                "FFmpeg worker exited right after start (code %s), "
+                "no longer pre-warming it: %s",
+                proc.returncode,
+                reason,
+            )
+            return
+
+        self._restarted += 1
+        _LOGGER.warning(
+            "Idle FFmpeg worker exited (code %s), restarting: %s",
+            proc.returncode,
+            reason,
+        )
+        if self._keeps_warm(argv):
+            self._schedule_refill(argv)
+
+    @staticmethod
+    async def _kill(proc: asyncio.subprocess.Process) -> None:
+        """Terminate a worker and reap it."""
+        if proc.returncode is None:
+            with contextlib.suppress(ProcessLookupError):
+                proc.kill()
+        with contextlib.suppress(asyncio.TimeoutError):
+            await asyncio.wait_for(proc.wait(), timeout=5)
+
+    @classmethod
+    async def _kill_all(cls, procs: list[asyncio.subprocess.Process]) -> None:
+        """Terminate and reap several workers."""
+        await asyncio.gather(*(cls._kill(proc) for proc in procs))
+
+    @property
+    def stats(self) -> dict[str, Any]:
+        """Return pool counters (spawns, restarts, warm hits, queue wait)."""
+        acquired = self._warm_hits + self._cold_misses
+        return {
+            "size": self._size,
+            "idle": sum(len(q) for q in self._idle.values()),
+            "warm_commands": len(self._pinned | self._warm),
+            "spawned": self._spawned,
+            "restarted": self._restarted,
+            "warm_hits": self._warm_hits,
+            "cold_misses": self._cold_misses,
+            "queue_wait_avg_ms": round(self._wait_total_ms / acquired, 2) if acquired else 0.0,
+            "queue_wait_max_ms": round(self._wait_max_ms, 2),
+        }
+
+    async def async_stop(self) -> None:
+        """Stop refilling and kill all idle workers."""
+        self._running = False
+        for task in list(self._refill_tasks) + list(self._watchers.values()):
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+        self._refill_tasks.clear()
+        self._watchers.clear()
+
+        procs = [proc for idle in self._idle.values() for proc in idle]
+        self._idle.clear()
+        await self._kill_all(procs)
+        _LOGGER.debug("FFmpeg pool stopped: %s", self.stats)
@@ -41,10 +41,16 @@ class MCPWebSocketClient(BaseWebSocketClient):
         _LOGGER.info("MCP WebSocket connected to %s", self._sanitize_url(self._url))
 
     async def _handle_text_message(self, data: dict[str, Any]) -> None:
-        """Handle incoming MCP JSON-RPC message."""
+        """Handle incoming MCP JSON-RPC message without blocking the listener."""
         _LOGGER.debug("MCP received: %s", data.get("method", data.get("id", "?")))
+        if not self._create_background_task(self._process_request(data)):
+            response = self._mcp_handler.busy_response(data)
+            if response:
+                await self._send(json.dumps(response))
 
+    async def _process_request(self, data: dict[str, Any]) -> None:
+        """Run an MCP request and send the response back."""
         response = await self._mcp_handler.handle_request(data)
         if response and self._ws:
-            await self._ws.send(json.dumps(response))
+            await self._send(json.dumps(response))
             _LOGGER.debug("MCP sent response for id=%s", response.get("id"))
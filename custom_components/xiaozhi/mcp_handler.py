@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+import asyncio
 import json
 import logging
 from dataclasses import dataclass
@@ -11,6 +12,8 @@ from typing import Any, Awaitable, Callable
 
 from homeassistant.core import HomeAssistant
 
+from .const import MCP_REQUEST_TIMEOUT
+
 _LOGGER = logging.getLogger(__name__)
 
 MCP_PROTOCOL_VERSION = "2024-11-05"
@@ -460,9 +463,12 @@ DEFAULT_TOOLS: list[MCPTool] = [
 class MCPHandler:
     """Handles MCP JSON-RPC requests from Xiaozhi server."""
 
-    def __init__(self, hass: HomeAssistant) -> None:
+    def __init__(
+        self, hass: HomeAssistant, request_timeout: float = MCP_REQUEST_TIMEOUT
+    ) -> None:
         """Initialize the MCP handler."""
         self._hass = hass
+        self._request_timeout = request_timeout
         self._initialized = False
         self._tools: dict[str, MCPTool] = {}
 
@@ -499,12 +505,32 @@ class MCPHandler:
             return None
 
         try:
-            result = await self._dispatch(method, params)
+            result = await asyncio.wait_for(
+                self._dispatch(method, params), timeout=self._request_timeout
+            )
             return self._success_response(request_id, result)
+        except asyncio.TimeoutError:
+            _LOGGER.warning(
+                "MCP method timed out after %ss: %s", self._request_timeout, method
+            )
+            return self._error_response(
+                request_id, -32000, f"Timed out after {self._request_timeout}s"
+            )
         except Exception as err:
             _LOGGER.warning("MCP method failed: %s - %s", method, err)
             return self._error_response(request_id, -32000, str(err))
 
+    def busy_response(self, data: dict[str, Any]) -> dict[str, Any] | None:
+        """Return the error reply for a request refused as too many are queued.
+
+        Notifications (no id) get no reply.
+        """
+        request_id = data.get("id")
+        if request_id is None:
+            return None
+        _LOGGER.warning("MCP request %s refused: too many in progress", request_id)
+        return self._error_response(request_id, -32000, "Too many requests in progress")
+
     async def _dispatch(self, method: str, params: dict[str, Any]) -> Any:
         """Dispatch a method call to the appropriate handler."""
         if method == "initialize":
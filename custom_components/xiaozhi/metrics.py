@@ -0,0 +1,228 @@
+"""Per-turn latency instrumentation.
+
+Every voice or text turn gets a TurnTimeline. The STT entity, the client and
+the TTS entity mark monotonic timestamps on it as the turn progresses, and
+each latency interval is recorded in a rolling histogram as soon as both of
+its end points are known, so a turn that never reaches TTS still reports the
+stages it did reach.
+
+The intervals separate server time (speech recognition, LLM, TTS stream)
+from local time (opus encode start-up, decode tail, hand-off to HA), so a
+slow turn can be blamed on the right side.
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+import time
+from collections import deque
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from enum import StrEnum
+from typing import Any
+
+from .const import METRICS_RECENT_TURNS, METRICS_WINDOW
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class TurnStage(StrEnum):
+    """Point in a turn at which a timestamp is taken."""
+
+    LISTEN_START = "listen_start"  # listen start (voice) or text sent
+    FIRST_UPLINK = "first_uplink"  # first opus frame sent
+    LISTEN_STOP = "listen_stop"  # listen stop sent
+    STT_RESULT = "stt_result"  # stt message received
+    FIRST_SENTENCE = "first_sentence"  # first tts sentence_start received
+    FIRST_AUDIO = "first_audio"  # first binary audio frame received
+    TTS_STOP = "tts_stop"  # tts stop received
+    DECODE_DONE = "decode_done"  # reply decoded (or cached as-is)
+    TTS_RETURNED = "tts_returned"  # TTS entity handed the audio to HA
+
+
+class TurnMetric(StrEnum):
+    """Latency interval aggregated across turns."""
+
+    UPLINK_START = "uplink_start"
+    STT = "stt"
+    FIRST_SENTENCE = "first_sentence"
+    FIRST_AUDIO = "first_audio"
+    TTS_STREAM = "tts_stream"
+    DECODE = "decode"
+    TTS_HANDOFF = "tts_handoff"
+    TOTAL = "total"
+
+
+# (start stage, end stage) of each metric. For voice turns the reply is
+# measured from the STT result; for text turns there is none, so the
+# fallback start is listen start (the text being sent).
+_METRIC_STAGES: dict[TurnMetric, tuple[tuple[TurnStage, ...], TurnStage]] = {
+    TurnMetric.UPLINK_START: ((TurnStage.LISTEN_START,), TurnStage.FIRST_UPLINK),
+    TurnMetric.STT: ((TurnStage.LISTEN_STOP,), TurnStage.STT_RESULT),
+    TurnMetric.FIRST_SENTENCE: (
+        (TurnStage.STT_RESULT, TurnStage.LISTEN_START),
+        TurnStage.FIRST_SENTENCE,
+    ),
+    TurnMetric.FIRST_AUDIO: (
+        (TurnStage.STT_RESULT, TurnStage.LISTEN_START),
+        TurnStage.FIRST_AUDIO,
+    ),
+    TurnMetric.TTS_STREAM: ((TurnStage.FIRST_AUDIO,), TurnStage.TTS_STOP),
+    TurnMetric.DECODE: ((TurnStage.TTS_STOP,), TurnStage.DECODE_DONE),
+    TurnMetric.TTS_HANDOFF: ((TurnStage.DECODE_DONE,), TurnStage.TTS_RETURNED),
+    TurnMetric.TOTAL: ((TurnStage.LISTEN_START,), TurnStage.TTS_RETURNED),
+}
+
+
+class LatencyHistogram:
+    """Rolling window of latency samples (ms) with percentile queries."""
+
+    def __init__(self, window: int = METRICS_WINDOW) -> None:
+        """Initialize the histogram."""
+        self._samples: deque[float] = deque(maxlen=window)
+        self.total_count = 0
+
+    def add(self, value_ms: float) -> None:
+        """Add a sample."""
+        self._samples.append(value_ms)
+        self.total_count += 1
+
+    @property
+    def count(self) -> int:
+        """Return the number of samples in the window."""
+        return len(self._samples)
+
+    def percentile(self, q: float) -> float | None:
+        """Return the q-th percentile (nearest rank), or None if empty."""
+        if not self._samples:
+            return None
+        return _nearest_rank(sorted(self._samples), q)
+
+    def summary(self) -> dict[str, float | int | None]:
+        """Return p50/p95/p99 (ms) and sample counts."""
+        ordered = sorted(self._samples)
+        result: dict[str, float | int | None] = {
+            f"p{q}": round(_nearest_rank(ordered, q), 1) if ordered else None
+            for q in (50, 95, 99)
+        }
+        result["count"] = len(ordered)
+        result["total"] = self.total_count
+        return result
+
+
+def _nearest_rank(ordered: list[float], q: float) -> float:
+    """Return the q-th percentile of a sorted, non-empty list."""
+    return ordered[max(math.ceil(q / 100 * len(ordered)), 1) - 1]
+
+
+@dataclass
+class TurnTimeline:
+    """Monotonic timestamps of one turn.
+
+    Only the first mark of each stage counts, so callers can mark
+    unconditionally (e.g. on every audio frame). Voice turns also record the
+    uplink encoder settings chosen for them.
+    """
+
+    mode: str
+    metrics: TurnMetrics | None = None
+    marks: dict[TurnStage, float] = field(default_factory=dict)
+    uplink: dict[str, Any] | None = None
+
+    def mark(self, stage: TurnStage, timestamp: float | None = None) -> None:
+        """Record stage at timestamp (default: now) if not yet recorded."""
+        if stage in self.marks:
+            return
+        self.marks[stage] = time.monotonic() if timestamp is None else timestamp
+        if self.metrics is not None:
+            self.metrics.record_stage(self, stage)
+
+    def elapsed_ms(self, start: TurnStage, end: TurnStage) -> float | None:
+        """Return the time between two marked stages in ms, if both are known."""
+        if start not in self.marks or end not in self.marks:
+            return None
+        return (self.marks[end] - self.marks[start]) * 1000
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return stage offsets (ms from the first mark) for diagnostics."""
+        result: dict[str, Any] = {"mode": self.mode, "stages": {}}
+        if self.uplink is not None:
+            result["uplink"] = self.uplink
+        if self.marks:
+            origin = min(self.marks.values())
+            result["stages"] = {
+                stage.value: round((ts - origin) * 1000, 1)
+                for stage, ts in sorted(self.marks.items(), key=lambda item: item[1])
+            }
+        return result
+
+
+class TurnMetrics:
+    """Rolling latency histograms across turns, one per metric."""
+
+    def __init__(
+        self,
+        window: int = METRICS_WINDOW,
+        recent: int = METRICS_RECENT_TURNS,
+    ) -> None:
+        """Initialize the metrics."""
+        self._window = window
+        self._histograms: dict[TurnMetric, LatencyHistogram] = {
+            metric: LatencyHistogram(window) for metric in TurnMetric
+        }
+        self._recent: deque[TurnTimeline] = deque(maxlen=recent)
+        self._listeners: list[Callable[[TurnMetric], None]] = []
+        self.turns = 0
+
+    def start_turn(self, mode: str) -> TurnTimeline:
+        """Start a timeline for a new turn ("voice" or "text")."""
+        timeline = TurnTimeline(mode, self)
+        self._recent.append(timeline)
+        self.turns += 1
+        return timeline
+
+    def record_stage(self, timeline: TurnTimeline, stage: TurnStage) -> None:
+        """Record every metric that ends at the stage just marked."""
+        for metric, (starts, end) in _METRIC_STAGES.items():
+            if end is not stage:
+                continue
+            for start in starts:
+                elapsed = timeline.elapsed_ms(start, end)
+                if elapsed is not None:
+                    self._histograms[metric].add(elapsed)
+                    self._notify(metric)
+                    break
+
+    def histogram(self, metric: TurnMetric) -> LatencyHistogram:
+        """Return the histogram for a metric."""
+        return self._histograms[metric]
+
+    def add_listener(self, listener: Callable[[TurnMetric], None]) -> Callable[[], None]:
+        """Call listener(metric) when a metric gets a sample; returns a remover."""
+        self._listeners.append(listener)
+
+        def _remove() -> None:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+        return _remove
+
+    def _notify(self, metric: TurnMetric) -> None:
+        for listener in list(self._listeners):
+            try:
+                listener(metric)
+            except Exception:
+                _LOGGER.exception("Error in turn metrics listener")
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return all histograms and the most recent turns, for diagnostics."""
+        return {
+            "turns": self.turns,
+            "window": self._window,
+            "latency_ms": {
+                metric.value: histogram.summary()
+                for metric, histogram in self._histograms.items()
+            },
+            "recent_turns": [timeline.as_dict() for timeline in self._recent],
+        }
@@ -3,24 +3,56 @@
 from __future__ import annotations
 
 import asyncio
+import functools
+import heapq
+import itertools
 import logging
+import re
 import time
+import unicodedata
 import uuid
-from collections import deque
+from collections import OrderedDict, deque
+from collections.abc import AsyncIterator
 from dataclasses import dataclass, field
 from enum import StrEnum
+from typing import TYPE_CHECKING, Any
 
+from .arena import AudioArena
 from .const import (
+    DEFAULT_CACHE_MAX_AUDIO,
+    DEFAULT_CACHE_MAX_ENTRIES,
     DEFAULT_PROTOCOL_VERSION,
     DEFAULT_RESPONSE_TIMEOUT,
+    DEFAULT_TRANSPORT,
+    DEFAULT_UPLINK_BITRATE_MAX,
+    DEFAULT_UPLINK_BITRATE_MIN,
+    MQTT_TLS_PORT,
     OTA_DEFAULT_TIMEOUT_MS,
     PIPELINE_CACHE_TTL,
+    PIPELINE_COLLECT_TIMEOUT,
 )
 
+if TYPE_CHECKING:
+    from .audio import IncrementalOpusDecoder
+    from .metrics import TurnTimeline
+
 _LOGGER = logging.getLogger(__name__)
 
-# Minimum interval between cache cleanup runs (seconds)
-_CLEANUP_INTERVAL = 10.0
+
+# Everything but letters and digits
+_NOT_ALNUM = re.compile(r"[\W_]+")
+
+
+@functools.lru_cache(maxsize=1024)
+def normalize_text(text: str) -> str:
+    """Return text reduced for fuzzy matching between pipeline stages.
+
+    Width and case are folded and everything but letters and digits is
+    dropped, so punctuation, whitespace and emoji HA adds or strips between
+    stages don't matter. Cached: a turn's texts are normalized again as it
+    moves from collector to cache entry and out.
+    """
+    return _NOT_ALNUM.sub("", unicodedata.normalize("NFKC", text).casefold())
 
 
 class ConnectionState(StrEnum):
@@ -32,6 +64,64 @@ class ConnectionState(StrEnum):
     AUTHENTICATED = "authenticated"
 
 
+@dataclass
+class MqttConfig:
+    """MQTT control channel credentials, as returned by OTA."""
+
+    endpoint: str
+    client_id: str
+    username: str
+    password: str
+    publish_topic: str
+    subscribe_topic: str = ""
+
+    def __repr__(self) -> str:
+        return (
+            f"MqttConfig(endpoint={self.endpoint!r}, "
+            f"client_id={self.client_id!r}, "
+            f"publish_topic={self.publish_topic!r})"
+        )
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> MqttConfig:
+        """Build from the OTA "mqtt" object (raises KeyError if incomplete)."""
+        return cls(
+            endpoint=str(data["endpoint"]),
+            client_id=str(data["client_id"]),
+            username=str(data.get("username", "")),
+            password=str(data.get("password", "")),
+            publish_topic=str(data["publish_topic"]),
+            subscribe_topic=str(data.get("subscribe_topic", "")),
+        )
+
+    def as_dict(self) -> dict[str, str]:
+        """Return the fields for storing in the config entry."""
+        return {
+            "endpoint": self.endpoint,
+            "client_id": self.client_id,
+            "username": self.username,
+            "password": self.password,
+            "publish_topic": self.publish_topic,
+            "subscribe_topic": self.subscribe_topic,
+        }
+
+    @property
+    def host(self) -> str:
+        """Return the broker host."""
+        return self.endpoint.rpartition(":")[0] or self.endpoint
+
+    @property
+    def port(self) -> int:
+        """Return the broker port (TLS port if the endpoint has none)."""
+        host, _, port = self.endpoint.rpartition(":")
+        return int(port) if host and port.isdigit() else MQTT_TLS_PORT
+
+    @property
+    def tls(self) -> bool:
+        """Return True if the broker expects TLS (like the firmware: by port)."""
+        return self.port == MQTT_TLS_PORT
+
+
 @dataclass
 class XiaozhiConfig:
     """Configuration for Xiaozhi client."""
@@ -43,15 +133,45 @@ class XiaozhiConfig:
     protocol_version: int = DEFAULT_PROTOCOL_VERSION
     response_timeout: int = DEFAULT_RESPONSE_TIMEOUT
     language: str | None = None
+    transport: str = DEFAULT_TRANSPORT
+    mqtt: MqttConfig | None = None
+    # Uplink opus bitrate bounds (bps)
+    uplink_bitrate_min: int = DEFAULT_UPLINK_BITRATE_MIN * 1000
+    uplink_bitrate_max: int = DEFAULT_UPLINK_BITRATE_MAX * 1000
 
     def __repr__(self) -> str:
         return (
             f"XiaozhiConfig(server_url={self.server_url!r}, "
             f"device_id={self.device_id!r}, "
-            f"protocol_version={self.protocol_version})"
+            f"protocol_version={self.protocol_version}, "
+            f"transport={self.transport!r})"
         )
 
 
+class TextStreamEventType(StrEnum):
+    """Kind of event yielded by XiaozhiWebSocketClient.stream_text."""
+
+    SENTENCE = "sentence"
+    AUDIO = "audio"
+    DONE = "done"
+
+
+@dataclass
+class TextStreamEvent:
+    """One step of a streamed text response.
+
+    SENTENCE carries one sentence in text, AUDIO one opus packet in audio
+    (a view into the request's arena). The final DONE carries the joined
+    response text and the arena holding all audio packets; only DONE has
+    an arena.
+    """
+
+    type: TextStreamEventType
+    text: str = ""
+    audio: bytes | memoryview = b""
+    audio_chunks: AudioArena | None = None
+
+
 @dataclass
 class PendingRequest:
     """A pending text request awaiting response."""
@@ -59,8 +179,35 @@ class PendingRequest:
     text: str
     future: asyncio.Future[str]
     response_chunks: list[str] = field(default_factory=list)
-    audio_chunks: list[bytes] = field(default_factory=list)
+    # Created with the first audio packet; replies without audio need none
+    audio_chunks: AudioArena | None = None
     session_id: str | None = None
+    decoder: IncrementalOpusDecoder | None = None
+    # Sentences and audio as they arrive, for stream_text
+    events: asyncio.Queue[TextStreamEvent] | None = None
+    timeline: TurnTimeline | None = None
+
+    def add_sentence(self, text: str) -> None:
+        """Add a sentence of the response."""
+        self.response_chunks.append(text)
+        if self.events is not None:
+            self.events.put_nowait(
+                TextStreamEvent(TextStreamEventType.SENTENCE, text=text)
+            )
+
+    def add_audio(self, payload: bytes | memoryview) -> None:
+        """Add an opus packet of the response (copied into the arena)."""
+        if self.audio_chunks is None:
+            self.audio_chunks = AudioArena()
+        packet = self.audio_chunks.append(payload)
+        if packet is None:  # over the per-turn cap
+            return
+        if self.decoder is not None:
+            self.decoder.feed(packet)
+        if self.events is not None:
+            self.events.put_nowait(
+                TextStreamEvent(TextStreamEventType.AUDIO, audio=packet)
+            )
 
 
 @dataclass
@@ -69,6 +216,7 @@ class OTAConfig:
 
     websocket_url: str
     access_token: str
+    mqtt: MqttConfig | None = None
 
 
 @dataclass
@@ -96,9 +244,19 @@ class PipelineCache:
 
     stt_text: str
     response_text: str
-    audio_chunks: list[bytes]
+    audio_chunks: AudioArena
+    wav: bytes | None = None
+    timeline: TurnTimeline | None = None
+    turn_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    # Conversation ID of the pipeline run that recorded the turn, if known
+    context: str | None = None
     created_at: float = field(default_factory=time.monotonic)
 
+    @property
+    def nbytes(self) -> int:
+        """Return the bytes of audio held: opus packets plus decoded WAV."""
+        return self.audio_chunks.nbytes + (len(self.wav) if self.wav else 0)
+
 
 class VoicePipelineSession:
     """Isolated session for a single voice pipeline run.
@@ -107,14 +265,77 @@ class VoicePipelineSession:
     voice requests don't overwrite each other's data on the client.
     """
 
-    def __init__(self) -> None:
-        """Initialize the voice pipeline session."""
+    def __init__(
+        self,
+        decoder: IncrementalOpusDecoder | None = None,
+        timeline: TurnTimeline | None = None,
+    ) -> None:
+        """Initialize the voice pipeline session.
+
+        If a decoder is given, TTS audio is decoded as it arrives. The
+        timeline, if given, records the turn's latency stages.
+        """
         self.session_id: str = uuid.uuid4().hex
         self.stt_text: str | None = None
         self.stt_event: asyncio.Event = asyncio.Event()
-        self.audio_chunks: list[bytes] = []
+        self.audio_chunks = AudioArena()
         self.tts_future: asyncio.Future[str] = asyncio.get_running_loop().create_future()
         self.response_chunks: list[str] = []
+        self.decoder = decoder
+        self.timeline = timeline
+        self._audio_event = asyncio.Event()
+        self._text_event = asyncio.Event()
+        # Wake readers when the turn ends (stop, failure or cancel)
+        self.tts_future.add_done_callback(self._on_tts_done)
+
+    def _on_tts_done(self, _: asyncio.Future[str]) -> None:
+        self._audio_event.set()
+        self._text_event.set()
+        if self.decoder is not None:
+            self.decoder.finish()
+
+    @property
+    def response_text(self) -> str:
+        """Return the response text received so far."""
+        return " ".join(self.response_chunks)
+
+    def add_sentence(self, text: str) -> None:
+        """Append a sentence of the response, wake readers."""
+        self.response_chunks.append(text)
+        self._text_event.set()
+
+    def add_audio(self, opus_payload: bytes | memoryview) -> None:
+        """Append a TTS audio frame (copied into the arena), wake readers."""
+        packet = self.audio_chunks.append(opus_payload)
+        if packet is None:  # over the per-turn cap
+            return
+        if self.decoder is not None:
+            self.decoder.feed(packet)
+        self._audio_event.set()
+
+    async def iter_audio(self) -> AsyncIterator[memoryview]:
+        """Yield TTS audio frames as they arrive until the turn ends."""
+        index = 0
+        while True:
+            while index < len(self.audio_chunks):
+                yield self.audio_chunks[index]
+                index += 1
+            if self.tts_future.done():
+                return
+            self._audio_event.clear()
+            await self._audio_event.wait()
+
+    async def iter_sentences(self) -> AsyncIterator[str]:
+        """Yield response sentences as they arrive until the turn ends."""
+        index = 0
+        while True:
+            while index < len(self.response_chunks):
+                yield self.response_chunks[index]
+                index += 1
+            if self.tts_future.done():
+                return
+            self._text_event.clear()
+            await self._text_event.wait()
 
 
 class PipelineResultCollector:
@@ -126,16 +347,34 @@ class PipelineResultCollector:
     Conversation and TTS entities await this event before reading results.
     """
 
-    def __init__(self, stt_text: str) -> None:
-        """Initialize the collector."""
+    def __init__(
+        self,
+        stt_text: str,
+        session: VoicePipelineSession | None = None,
+        context: str | None = None,
+    ) -> None:
+        """Initialize the collector.
+
+        The turn ID is the voice session's ID, and follows the results into
+        the cache. context is the conversation ID of the pipeline run that
+        recorded the turn, if known.
+        """
         self.stt_text = stt_text
+        self.session = session
+        self.turn_id = session.session_id if session is not None else uuid.uuid4().hex
+        self.context = context
+        # Set once a conversation has taken this turn
+        self.claimed = False
+        # Set once streaming TTS has taken the session's audio live; the
+        # results are then not cached, nothing would read them
+        self.streamed = False
         self.ready = asyncio.Event()
         self.response_text: str | None = None
-        self.audio_chunks: list[bytes] = []
+        self.audio_chunks = AudioArena()
         self.failed: bool = False
         self.created_at = time.monotonic()
 
-    def complete(self, response_text: str, audio_chunks: list[bytes]) -> None:
+    def complete(self, response_text: str, audio_chunks: AudioArena) -> None:
         """Mark collection as complete with results."""
         self.response_text = response_text
         self.audio_chunks = audio_chunks
@@ -156,8 +395,42 @@ class PipelineResultCollector:
             return False
 
 
+class _NormalizedIndex:
+    """Normalized text -> the keys of the texts that normalize to it."""
+
+    def __init__(self) -> None:
+        """Initialize an empty index."""
+        # Insertion ordered, so find returns the oldest key
+        self._keys: dict[str, dict[str, None]] = {}
+
+    def add(self, text: str, key: str) -> None:
+        """Index key under text."""
+        normalized = normalize_text(text)
+        if normalized:
+            self._keys.setdefault(normalized, {})[key] = None
+
+    def discard(self, text: str, key: str) -> None:
+        """Remove key from under text, if it is there."""
+        normalized = normalize_text(text)
+        keys = self._keys.get(normalized)
+        if keys is not None:
+            keys.pop(key, None)
+            if not keys:
+                del self._keys[normalized]
+
+    def find(self, text: str) -> str | None:
+        """Return the oldest key whose text normalizes as text does."""
+        keys = self._keys.get(normalize_text(text))
+        return next(iter(keys)) if keys else None
+
+
+def _hit_rate(counts: dict[str, int]) -> float | None:
+    total = sum(counts.values())
+    return round(1 - counts["miss"] / total, 3) if total else None
+
+
 class PipelineCacheManager:
-    """Manages cached pipeline results with TTL.
+    """Manages cached pipeline results with TTL, LRU and size bounds.
 
     In voice mode, STT entity returns immediately and creates a collector.
     The background task fills the collector with LLM response + TTS audio.
@@ -165,25 +438,149 @@ class PipelineCacheManager:
 
     Uses async lock for thread safety and deque-based collectors to handle
     duplicate STT text within the same TTL window (FIFO order).
+
+    Cached results whose TTS is never requested are bounded three ways: a
+    timer expires entries after the TTL and fails collectors after the
+    collect timeout (the longest the STT, conversation and TTS entities wait
+    for a reply, so a long reply isn't cut off), and storing an entry
+    evicts the least recently used ones while the cache holds more than
+    max_bytes of audio or more than max_entries entries.
+
+    Every operation is O(1) or O(log n) in the number of turns held:
+
+    - a cached turn is indexed both ways, STT text -> entry (which holds
+      the response text) and response text -> STT text
+    - collectors are only ever removed from the front of their STT text's
+      queue
+    - entries and collectors sit in one expiry min-heap, by STT text and
+      turn ID only; removing them leaves their heap items in place, and
+      the timer skips those stale items when it reaches them (the items
+      hold no reference, so removed results are freed at once)
+    - in-flight voice sessions are kept apart, so find_live_session only
+      looks at those
+
+    The conversation and TTS stages find their turn with resolve_input and
+    resolve_response. Every turn has an ID (its voice session's) and is
+    bound to the conversation ID of the pipeline run that recorded it, so
+    concurrent satellites each get their own turn: resolve_input looks up
+    the conversation's turn first. HA may also normalize the text between
+    stages, so both then try the exact text, then the text with case, width
+    and punctuation folded. TTS gets no conversation ID; bind_turn records
+    the turns the conversation answered, and resolve_response falls back to
+    the oldest of those whose response and the message (both normalized)
+    contain one another. A new turn bound to a conversation replaces the
+    old one.
     """
 
-    def __init__(self, ttl: float = PIPELINE_CACHE_TTL) -> None:
+    def __init__(
+        self,
+        ttl: float = PIPELINE_CACHE_TTL,
+        max_bytes: int = DEFAULT_CACHE_MAX_AUDIO * 1024 * 1024,
+        max_entries: int = DEFAULT_CACHE_MAX_ENTRIES,
+        collect_timeout: float = PIPELINE_COLLECT_TIMEOUT,
+    ) -> None:
         """Initialize the cache manager."""
-        self._cache: dict[str, PipelineCache] = {}
+        # STT text -> entry, least recently used first
+        self._cache: OrderedDict[str, PipelineCache] = OrderedDict()
+        # Response text -> STT text, the reverse of self._cache
         self._response_index: dict[str, str] = {}
         self._collectors: dict[str, deque[PipelineResultCollector]] = {}
+        self._collector_count = 0
+        # Normalized STT and response text -> STT text, for fuzzy matching
+        self._collector_inputs = _NormalizedIndex()
+        self._entry_inputs = _NormalizedIndex()
+        self._entry_responses = _NormalizedIndex()
+        # Conversation ID -> its voice turn no conversation has taken yet
+        self._inputs: dict[str, PipelineResultCollector] = {}
+        # Turn ID -> (STT text, conversation ID) of turns the conversation
+        # answered and TTS hasn't read yet, oldest first
+        self._answered: OrderedDict[str, tuple[str, str]] = OrderedDict()
+        # Conversation ID -> the turn ID it last answered with
+        self._contexts: dict[str, str] = {}
+        # Collectors with a voice session still producing audio
+        self._live: dict[PipelineResultCollector, None] = {}
+        # (expires at, tie-breaker, is an entry (not a collector), STT text,
+        # turn ID)
+        self._expiry: list[tuple[float, int, bool, str, str]] = []
+        self._expiry_seq = itertools.count()
         self._ttl = ttl
+        self._collect_timeout = collect_timeout
+        self._max_bytes = max_bytes
+        self._max_entries = max_entries
+        self._bytes = 0
         self._lock = asyncio.Lock()
-        self._last_cleanup = 0.0
+        self._expiry_handle: asyncio.TimerHandle | None = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        # How resolve_input / resolve_response matched (or missed)
+        self.matches: dict[str, dict[str, int]] = {
+            stage: dict.fromkeys(("exact", "normalized", "turn", "miss"), 0)
+            for stage in ("input", "response")
+        }
+
+    @property
+    def stats(self) -> dict[str, Any]:
+        """Return size, bounds and hit/miss/eviction/correlation counters.
 
-    async def create_collector(self, stt_text: str) -> PipelineResultCollector:
-        """Create a result collector for a voice pipeline run."""
+        Every input match is a voice turn served from the cache instead of
+        a second send_text round trip to the server.
+        """
+        inputs = self.matches["input"]
+        return {
+            "entries": len(self._cache),
+            "audio_bytes": self._bytes,
+            "max_entries": self._max_entries,
+            "max_bytes": self._max_bytes,
+            "collectors": self._collector_count,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "matches": {stage: dict(counts) for stage, counts in self.matches.items()},
+            "input_hit_rate": _hit_rate(inputs),
+            "response_hit_rate": _hit_rate(self.matches["response"]),
+            "round_trips_saved": sum(inputs.values()) - inputs["miss"],
+            "answered_turns": len(self._answered),
+        }
+
+    def close(self) -> None:
+        """Stop the expiry timer (on unload)."""
+        if self._expiry_handle is not None:
+            self._expiry_handle.cancel()
+            self._expiry_handle = None
+
+    async def create_collector(
+        self,
+        stt_text: str,
+        session: VoicePipelineSession | None = None,
+        context: str | None = None,
+    ) -> PipelineResultCollector:
+        """Create a result collector for a voice pipeline run.
+
+        The session, if given, lets streaming TTS read audio before the
+        collector completes. context, the run's conversation ID, binds the
+        turn to it for resolve_input; it replaces the conversation's
+        earlier turn.
+        """
         async with self._lock:
-            self._cleanup_if_needed()
-            collector = PipelineResultCollector(stt_text)
+            collector = PipelineResultCollector(stt_text, session, context)
+            if context is not None:
+                self._inputs[context] = collector
             if stt_text not in self._collectors:
                 self._collectors[stt_text] = deque()
+                self._collector_inputs.add(stt_text, stt_text)
             self._collectors[stt_text].append(collector)
+            self._collector_count += 1
+            if session is not None:
+                self._live[collector] = None
+            self._push_expiry(
+                collector.created_at + self._collect_timeout,
+                False,
+                stt_text,
+                collector.turn_id,
+            )
             return collector
 
     async def get_collector(self, stt_text: str) -> PipelineResultCollector | None:
@@ -194,105 +591,412 @@ class PipelineCacheManager:
                 return q[0]
             return None
 
+    async def find_live_session(self, response_text: str) -> VoicePipelineSession | None:
+        """Find an in-flight voice session whose response begins with text.
+
+        Streaming TTS may receive the first sentence of a response while the
+        server is still sending the rest; this finds the session producing it
+        (matching the text as is, then normalized) and hands its audio over to
+        the caller, so the turn's results are not cached when it completes.
+        """
+        async with self._lock:
+            collector = self._find_live_locked(response_text)
+            if collector is None:
+                return None
+            collector.streamed = True
+            return collector.session
+
+    async def find_live_collector(
+        self, response_text: str
+    ) -> PipelineResultCollector | None:
+        """Find the collector of a live voice session whose response begins with text.
+
+        For callers that wait for the whole reply rather than stream it.
+        """
+        async with self._lock:
+            return self._find_live_locked(response_text)
+
+    def _find_live_locked(self, response_text: str) -> PipelineResultCollector | None:
+        """Match the exact start of a live response, then the normalized one."""
+        text = response_text.strip()
+        if not text:
+            return None
+        for collector in self._live:
+            session = collector.session
+            if (
+                session is not None
+                and not collector.ready.is_set()
+                and session.response_text.startswith(text)
+            ):
+                return collector
+        normalized = normalize_text(text)
+        if not normalized:
+            return None
+        for collector in self._live:
+            session = collector.session
+            if (
+                session is not None
+                and not collector.ready.is_set()
+                and normalize_text(session.response_text).startswith(normalized)
+            ):
+                return collector
+        return None
+
     async def complete_collector(
         self,
         stt_text: str,
         response_text: str,
-        audio_chunks: list[bytes],
+        audio_chunks: AudioArena,
+        wav: bytes | None = None,
+        timeline: TurnTimeline | None = None,
     ) -> None:
-        """Complete the oldest collector and store results in cache."""
+        """Complete the oldest collector and store results in cache.
+
+        Results whose audio streaming TTS already took live are not stored.
+        """
         async with self._lock:
-            q = self._collectors.get(stt_text)
-            if q:
-                collector = q.popleft()
+            collector = self._pop_collector_locked(stt_text)
+            if collector is not None:
                 collector.complete(response_text, audio_chunks)
-                if not q:
-                    del self._collectors[stt_text]
-            self._store_locked(stt_text, response_text, audio_chunks)
+                if collector.streamed:
+                    self._release_input_locked(collector.context, collector.turn_id)
+                    self._unbind_locked(collector.turn_id)
+                    return
+            self._store_locked(
+                stt_text,
+                response_text,
+                audio_chunks,
+                wav,
+                timeline,
+                collector.turn_id if collector is not None else None,
+                collector.context if collector is not None else None,
+            )
 
     async def fail_collector(self, stt_text: str) -> None:
         """Mark the oldest collector as failed."""
         async with self._lock:
-            q = self._collectors.get(stt_text)
-            if q:
-                collector = q.popleft()
+            collector = self._pop_collector_locked(stt_text)
+            if collector is not None:
                 collector.fail()
-                if not q:
-                    del self._collectors[stt_text]
-            # Clean up any partial response index entries for this stt_text
-            keys_to_remove = [k for k, v in self._response_index.items() if v == stt_text]
-            for k in keys_to_remove:
-                del self._response_index[k]
+                self._forget_collector_locked(collector)
+            # TTS can no longer find an earlier result for this stt_text
+            entry = self._cache.get(stt_text)
+            if entry is not None:
+                if self._response_index.get(entry.response_text) == stt_text:
+                    del self._response_index[entry.response_text]
+                self._entry_responses.discard(entry.response_text, stt_text)
 
     async def store(
         self,
         stt_text: str,
         response_text: str,
-        audio_chunks: list[bytes],
+        audio_chunks: AudioArena,
+        wav: bytes | None = None,
+        timeline: TurnTimeline | None = None,
     ) -> None:
-        """Store pipeline results keyed by STT text."""
+        """Store pipeline results keyed by STT text.
+
+        wav is the already decoded audio, if it was decoded while arriving.
+        timeline lets the TTS entity record when it hands the audio over.
+        """
         async with self._lock:
-            self._cleanup_if_needed()
-            self._store_locked(stt_text, response_text, audio_chunks)
+            self._store_locked(stt_text, response_text, audio_chunks, wav, timeline)
 
     async def get_by_input(self, stt_text: str) -> PipelineCache | None:
         """Look up cached results by STT input text (non-destructive).
 
         TTS is the last pipeline stage and pops from cache on read.
-        TTL cleanup handles orphaned entries.
+        TTL expiry and LRU eviction handle orphaned entries.
         """
         async with self._lock:
-            self._cleanup_if_needed()
-            return self._cache.get(stt_text, None)
+            entry = self._cache.get(stt_text)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._cache.move_to_end(stt_text)
+            return entry
 
-    async def get_audio_by_response(self, response_text: str) -> list[bytes] | None:
-        """Look up cached audio by LLM response text (for TTS entity)."""
+    async def get_by_response(self, response_text: str) -> PipelineCache | None:
+        """Pop cached results by LLM response text (for TTS entity)."""
         async with self._lock:
-            self._cleanup_if_needed()
-            stt_text = self._response_index.pop(response_text, None)
-            if stt_text is None:
+            stt_text = self._response_index.get(response_text)
+            entry = self._remove_locked(stt_text) if stt_text is not None else None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry
+
+    async def resolve_input(
+        self, text: str, context: str | None = None
+    ) -> PipelineResultCollector | PipelineCache | None:
+        """Find the voice turn a conversation input belongs to.
+
+        Takes the voice turn bound to the conversation ID (context) first,
+        then matches the exact STT text, then the normalized text. The
+        match is counted as exact or normalized if the turn's text matches
+        that way, as a turn match otherwise. Returns the turn's collector
+        while its results are still being collected, its cached entry once
+        they are, or None (text mode: send_text).
+        """
+        async with self._lock:
+            turn, method = self._find_input_locked(text, context)
+            self.matches["input"][method] += 1
+            if turn is None:
+                self.misses += 1
                 return None
-            entry = self._cache.pop(stt_text, None)
+            self.hits += 1
+            self._release_input_locked(turn.context, turn.turn_id)
+            if isinstance(turn, PipelineResultCollector):
+                turn.claimed = True
+            else:
+                self._cache.move_to_end(turn.stt_text)
+            if method != "exact":
+                _LOGGER.debug(
+                    "Input matched voice turn %s by %s: %s -> %s",
+                    turn.turn_id, method, text, turn.stt_text,
+                )
+            return turn
+
+    async def bind_turn(
+        self, turn: PipelineResultCollector | PipelineCache, context: str
+    ) -> None:
+        """Record that turn answered the conversation ID (context).
+
+        TTS can then find the turn's audio even if its message no longer
+        matches the response text. The turn may still be collecting; it is
+        not bound once it failed or streaming TTS took it. A turn bound
+        earlier to the same conversation is dropped: its TTS is not coming
+        any more.
+        """
+        async with self._lock:
+            entry = self._cache.get(turn.stt_text)
+            cached = entry is not None and entry.turn_id == turn.turn_id
+            if isinstance(turn, PipelineResultCollector):
+                if turn.streamed or (turn.ready.is_set() and not cached):
+                    return
+            elif not cached:
+                return
+            previous = self._contexts.get(context)
+            if previous is not None and previous != turn.turn_id:
+                self._answered.pop(previous, None)
+            self._answered[turn.turn_id] = (turn.stt_text, context)
+            self._contexts[context] = turn.turn_id
+
+    async def resolve_response(self, text: str) -> PipelineCache | None:
+        """Pop the cached results a TTS message belongs to.
+
+        Matches the exact response text, then the normalized text, then the
+        oldest cached turn the conversation answered whose response and the
+        message (both normalized) contain one another.
+        """
+        async with self._lock:
+            stt_text = self._response_index.get(text)
+            method = "exact"
+            if stt_text is None:
+                stt_text = self._entry_responses.find(text)
+                method = "normalized"
+            if stt_text is None:
+                stt_text = self._find_answered_locked(text)
+                method = "turn"
+            entry = self._remove_locked(stt_text) if stt_text is not None else None
             if entry is None:
+                self.matches["response"]["miss"] += 1
+                self.misses += 1
                 return None
-            return entry.audio_chunks
+            self.matches["response"][method] += 1
+            self.hits += 1
+            if method != "exact":
+                _LOGGER.debug(
+                    "TTS message matched voice turn %s by %s: %.50s...",
+                    entry.turn_id, method, text,
+                )
+            return entry
+
+    def _find_input_locked(
+        self, text: str, context: str | None
+    ) -> tuple[PipelineResultCollector | PipelineCache | None, str]:
+        """Return the turn for a conversation input and how it matched."""
+        turn = self._bound_input_locked(context)
+        if turn is not None:
+            if turn.stt_text == text:
+                return turn, "exact"
+            if normalize_text(turn.stt_text) == normalize_text(text):
+                return turn, "normalized"
+            return turn, "turn"
+        q = self._collectors.get(text)
+        if q:
+            return q[0], "exact"
+        entry = self._cache.get(text)
+        if entry is not None:
+            return entry, "exact"
+        stt_text = self._collector_inputs.find(text)
+        if stt_text is not None:
+            return self._collectors[stt_text][0], "normalized"
+        stt_text = self._entry_inputs.find(text)
+        if stt_text is not None:
+            return self._cache[stt_text], "normalized"
+        return None, "miss"
+
+    def _bound_input_locked(
+        self, context: str | None
+    ) -> PipelineResultCollector | PipelineCache | None:
+        """Return the untaken voice turn bound to a conversation ID, if any."""
+        collector = self._inputs.get(context) if context is not None else None
+        if collector is None or collector.claimed:
+            return None
+        if not collector.ready.is_set():
+            return collector
+        entry = self._cache.get(collector.stt_text)
+        if entry is not None and entry.turn_id == collector.turn_id:
+            return entry
+        return None
+
+    def _find_answered_locked(self, text: str) -> str | None:
+        """Return the STT text of the oldest cached answered turn fitting text."""
+        normalized = normalize_text(text)
+        if not normalized:
+            return None
+        for turn_id, (stt_text, _) in self._answered.items():
+            entry = self._cache.get(stt_text)
+            if entry is None or entry.turn_id != turn_id:
+                continue  # still collecting
+            response = normalize_text(entry.response_text)
+            if response and (normalized in response or response in normalized):
+                return stt_text
+        return None
+
+    def _release_input_locked(self, context: str | None, turn_id: str) -> None:
+        """Unbind a voice turn from its conversation ID (under lock)."""
+        collector = self._inputs.get(context) if context is not None else None
+        if collector is not None and collector.turn_id == turn_id:
+            del self._inputs[context]
+
+    def _unbind_locked(self, turn_id: str) -> None:
+        """Forget an answered turn (under lock)."""
+        bound = self._answered.pop(turn_id, None)
+        if bound is not None and self._contexts.get(bound[1]) == turn_id:
+            del self._contexts[bound[1]]
+
+    def _forget_collector_locked(self, collector: PipelineResultCollector) -> None:
+        """Drop the bindings of a collector that failed (under lock)."""
+        self._release_input_locked(collector.context, collector.turn_id)
+        self._unbind_locked(collector.turn_id)
+
+    def _pop_collector_locked(self, stt_text: str) -> PipelineResultCollector | None:
+        """Remove the oldest collector for stt_text (under lock)."""
+        q = self._collectors.get(stt_text)
+        if not q:
+            return None
+        collector = q.popleft()
+        if not q:
+            del self._collectors[stt_text]
+            self._collector_inputs.discard(stt_text, stt_text)
+        self._collector_count -= 1
+        self._live.pop(collector, None)
+        return collector
 
     def _store_locked(
         self,
         stt_text: str,
         response_text: str,
-        audio_chunks: list[bytes],
+        audio_chunks: AudioArena,
+        wav: bytes | None = None,
+        timeline: TurnTimeline | None = None,
+        turn_id: str | None = None,
+        context: str | None = None,
     ) -> None:
-        """Store pipeline results (must be called under lock)."""
+        """Store pipeline results (must be called under lock).
+
+        turn_id and context are the collector's, for a voice turn; text
+        turns get a new turn ID.
+        """
         entry = PipelineCache(
             stt_text=stt_text,
             response_text=response_text,
             audio_chunks=audio_chunks,
+            wav=wav,
+            timeline=timeline,
+            turn_id=turn_id or uuid.uuid4().hex,
+            context=context,
         )
+        self._remove_locked(stt_text)
         self._cache[stt_text] = entry
         self._response_index[response_text] = stt_text
+        self._entry_inputs.add(stt_text, stt_text)
+        self._entry_responses.add(response_text, stt_text)
+        self._bytes += entry.nbytes
+        # Evict least recently used entries, never the one just stored
+        while len(self._cache) > 1 and (
+            self._bytes > self._max_bytes or len(self._cache) > self._max_entries
+        ):
+            self._remove_locked(next(iter(self._cache)))
+            self.evictions += 1
+        self._push_expiry(
+            entry.created_at + self._ttl, True, stt_text, entry.turn_id
+        )
 
-    def _cleanup_if_needed(self) -> None:
-        """Remove expired entries if enough time has passed since last cleanup."""
-        now = time.monotonic()
-        if now - self._last_cleanup < _CLEANUP_INTERVAL:
+    def _remove_locked(self, stt_text: str) -> PipelineCache | None:
+        """Drop one cached entry and its response index (under lock).
+
+        Its expiry heap item stays behind and is skipped when it comes up.
+        """
+        entry = self._cache.pop(stt_text, None)
+        if entry is None:
+            return None
+        if self._response_index.get(entry.response_text) == stt_text:
+            del self._response_index[entry.response_text]
+        self._entry_inputs.discard(stt_text, stt_text)
+        self._entry_responses.discard(entry.response_text, stt_text)
+        self._release_input_locked(entry.context, entry.turn_id)
+        self._unbind_locked(entry.turn_id)
+        self._bytes -= entry.nbytes
+        return entry
+
+    def _push_expiry(
+        self, deadline: float, is_entry: bool, stt_text: str, turn_id: str
+    ) -> None:
+        item = (deadline, next(self._expiry_seq), is_entry, stt_text, turn_id)
+        heapq.heappush(self._expiry, item)
+        # Entries expire sooner than collectors, so a new item may be due
+        # before the one the timer is armed for
+        if self._expiry[0] is item and self._expiry_handle is not None:
+            self._expiry_handle.cancel()
+            self._expiry_handle = None
+        if self._expiry_handle is None:
+            self._schedule_expiry()
+
+    def _schedule_expiry(self) -> None:
+        """Arm the expiry timer for the earliest heap item, if any."""
+        if not self._expiry:
             return
-        self._last_cleanup = now
-
-        expired = [
-            k for k, v in self._cache.items()
-            if now - v.created_at > self._ttl
-        ]
-        for k in expired:
-            entry = self._cache.pop(k)
-            self._response_index.pop(entry.response_text, None)
-        # Clean expired collectors
-        expired_keys: list[str] = []
-        for k, q in self._collectors.items():
-            while q and now - q[0].created_at > self._ttl:
+        delay = max(self._expiry[0][0] - time.monotonic(), 0)
+        self._expiry_handle = asyncio.get_running_loop().call_later(
+            delay, self._expire
+        )
+
+    def _expire(self) -> None:
+        """Drop expired entries and fail timed out collectors, then re-arm.
+
+        Runs from the event loop between the lock holders' critical
+        sections, which never await, so it doesn't take the lock.
+        """
+        self._expiry_handle = None
+        now = time.monotonic()
+        while self._expiry and self._expiry[0][0] <= now:
+            _, _, is_entry, stt_text, turn_id = heapq.heappop(self._expiry)
+            if is_entry:
+                entry = self._cache.get(stt_text)
+                if entry is not None and entry.turn_id == turn_id:
+                    self._remove_locked(stt_text)
+                    self.expirations += 1
+                continue
+            # Collectors leave their queue from the front, in creation
+            # order, so an expired one that is still waiting is at the front
+            q = self._collectors.get(stt_text)
+            if q and q[0].turn_id == turn_id:
                 q[0].fail()
-                q.popleft()
-            if not q:
-                expired_keys.append(k)
-        for k in expired_keys:
-            del self._collectors[k]
+                self._forget_collector_locked(q[0])
+                self._pop_collector_locked(stt_text)
+        self._schedule_expiry()
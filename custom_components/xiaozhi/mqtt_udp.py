@@ -0,0 +1,386 @@
+"""MQTT + UDP transport for the Xiaozhi server.
+
+Control messages (hello, listen, stt, tts, mcp, abort, goodbye) travel as
+JSON over MQTT; opus audio travels as AES-128-CTR encrypted UDP datagrams,
+so one lost audio packet never holds up the ones behind it the way a
+retransmission does on a TCP WebSocket.
+
+MqttUdpConnection presents both channels as one WebSocket-like connection
+(send, recv, async iteration, close), so XiaozhiMqttUdpClient keeps all of
+XiaozhiWebSocketClient's session, turn and MCP handling unchanged.
+
+A UDP packet is a 16-byte nonce followed by the encrypted opus payload. The
+nonce is the server's nonce with the payload size at [2:4], a timestamp at
+[8:12] and a sequence number at [12:16] (big endian); it also serves as the
+AES-CTR counter block.
+
+The two channels are not ordered against each other: the last audio packets
+of a reply can arrive after the MQTT tts stop that ends it. A tts stop (and
+anything behind it) is therefore held until UDP audio has been quiet for
+UDP_REORDER_WINDOW.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import ssl as ssl_module
+import struct
+import time
+from collections.abc import AsyncIterator, Callable
+from functools import partial
+from typing import Any, cast
+
+import paho.mqtt.client as mqtt
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+from paho.mqtt.enums import CallbackAPIVersion
+
+from .audio import pack_audio_frame, unpack_audio_frame
+from .client import XiaozhiWebSocketClient
+from .const import (
+    MQTT_KEEPALIVE,
+    MSG_TYPE_GOODBYE,
+    MSG_TYPE_TTS,
+    TTS_STATE_STOP,
+    UDP_NONCE_SIZE,
+    UDP_PACKET_TYPE_AUDIO,
+    UDP_REORDER_WINDOW,
+)
+from .models import MqttConfig, XiaozhiConfig
+
+_LOGGER = logging.getLogger(__name__)
+
+_AES_KEY_SIZE = 16
+
+
+class UdpAudioChannel(asyncio.DatagramProtocol):
+    """Encrypted opus audio over UDP, one packet per frame."""
+
+    def __init__(
+        self, key: bytes, nonce: bytes, on_audio: Callable[[bytes], None]
+    ) -> None:
+        """Initialize with the session key and nonce from the server hello."""
+        self._algorithm = algorithms.AES(key)
+        self._nonce = nonce
+        self._on_audio = on_audio
+        self._transport: asyncio.DatagramTransport | None = None
+        self._started = time.monotonic()
+        self._local_sequence = 0
+        self._remote_sequence = -1
+        self.lost = 0
+        self.late = 0
+
+    def _crypt(self, nonce: bytes, data: bytes) -> bytes:
+        # CTR mode: encryption and decryption are the same operation
+        return Cipher(self._algorithm, modes.CTR(nonce)).encryptor().update(data)
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        """Keep the transport for sending."""
+        self._transport = cast(asyncio.DatagramTransport, transport)
+
+    def datagram_received(self, data: bytes, addr: tuple[str | Any, int]) -> None:
+        """Decrypt an audio packet and pass the opus payload on."""
+        if len(data) <= UDP_NONCE_SIZE or data[0] != UDP_PACKET_TYPE_AUDIO:
+            _LOGGER.debug("Dropping malformed UDP packet (%d bytes)", len(data))
+            return
+        nonce = data[:UDP_NONCE_SIZE]
+        (sequence,) = struct.unpack_from(">I", nonce, 12)
+        if sequence <= self._remote_sequence:
+            # Overtaken by a newer packet; playing it now would garble audio
+            self.late += 1
+            return
+        if self._remote_sequence >= 0 and sequence != self._remote_sequence + 1:
+            self.lost += sequence - self._remote_sequence - 1
+            _LOGGER.debug(
+                "UDP audio gap: expected %d, got %d", self._remote_sequence + 1, sequence
+            )
+        self._remote_sequence = sequence
+        self._on_audio(self._crypt(nonce, data[UDP_NONCE_SIZE:]))
+
+    def error_received(self, exc: Exception) -> None:
+        """Log ICMP errors (e.g. port unreachable); UDP keeps going."""
+        _LOGGER.debug("UDP audio error: %s", exc)
+
+    def send(self, opus: bytes) -> None:
+        """Encrypt and send one opus frame."""
+        if self._transport is None:
+            raise ConnectionError("UDP audio channel not open")
+        self._local_sequence += 1
+        timestamp = int((time.monotonic() - self._started) * 1000) & 0xFFFFFFFF
+        nonce = bytearray(self._nonce)
+        struct.pack_into(">H", nonce, 2, len(opus))
+        struct.pack_into(">II", nonce, 8, timestamp, self._local_sequence)
+        self._transport.sendto(bytes(nonce) + self._crypt(bytes(nonce), opus))
+
+    def close(self) -> None:
+        """Close the socket."""
+        if self._transport is not None:
+            self._transport.close()
+            self._transport = None
+
+
+class MqttUdpConnection:
+    """MQTT control channel plus UDP audio, used like a WebSocket connection.
+
+    Text messages are published to the publish topic; binary (Protocol V3)
+    audio frames are unpacked and sent over UDP. Incoming MQTT messages and
+    decrypted UDP audio (repacked as binary frames) come out of recv() and
+    async iteration in arrival order. paho-mqtt runs its network loop in
+    its own thread; callbacks hand messages over to the event loop.
+    """
+
+    def __init__(self, config: MqttConfig) -> None:
+        """Initialize (not yet connected)."""
+        self._config = config
+        self._loop = asyncio.get_running_loop()
+        self._inbox: asyncio.Queue[str | bytes | None] = asyncio.Queue()
+        self._connected: asyncio.Future[None] = self._loop.create_future()
+        self._audio: UdpAudioChannel | None = None
+        self._session_id: str | None = None
+        self._goodbye = False
+        self._closed = False
+        self._held: list[str | None] = []
+        self._release_handle: asyncio.TimerHandle | None = None
+        self._last_audio = 0.0
+        self._client = mqtt.Client(
+            CallbackAPIVersion.VERSION2,
+            client_id=config.client_id,
+            protocol=mqtt.MQTTv311,
+        )
+        if config.username:
+            self._client.username_pw_set(config.username, config.password)
+        self._client.on_connect = self._on_connect
+        self._client.on_message = self._on_message
+        self._client.on_disconnect = self._on_disconnect
+
+    async def open(self, ssl_context: ssl_module.SSLContext | None) -> None:
+        """Connect to the broker and subscribe to the reply topic."""
+        config = self._config
+        if ssl_context is not None:
+            self._client.tls_set_context(ssl_context)
+        elif config.password:
+            _LOGGER.warning(
+                "Sending MQTT password over unencrypted connection to %s",
+                config.host,
+            )
+        try:
+            await self._loop.run_in_executor(
+                None,
+                partial(self._client.connect, config.host, config.port, MQTT_KEEPALIVE),
+            )
+            self._client.loop_start()
+            await self._connected
+            if config.subscribe_topic:
+                self._client.subscribe(config.subscribe_topic)
+        except BaseException:
+            await self.close()
+            raise
+        _LOGGER.debug("MQTT connected to %s:%d", config.host, config.port)
+
+    async def open_audio(self, session_id: str | None, udp: dict[str, Any]) -> None:
+        """Open the UDP audio channel described by the server hello."""
+        try:
+            key = bytes.fromhex(udp["key"])
+            nonce = bytes.fromhex(udp["nonce"])
+            server, port = udp["server"], int(udp["port"])
+        except (KeyError, TypeError, ValueError) as err:
+            raise ConnectionError(f"Invalid UDP parameters in hello: {err}") from err
+        if len(key) != _AES_KEY_SIZE or len(nonce) != UDP_NONCE_SIZE:
+            raise ConnectionError("Invalid UDP key or nonce size in hello")
+        self._session_id = session_id
+        _, self._audio = await self._loop.create_datagram_endpoint(
+            partial(UdpAudioChannel, key, nonce, self._on_audio),
+            remote_addr=(server, port),
+        )
+        # The server learns where to send audio from our first packet (the
+        # address may be NATed), so text-only sessions send an empty one
+        self._audio.send(b"")
+        _LOGGER.debug("UDP audio channel open to %s:%d", server, port)
+
+    # -- paho callbacks (network thread) ------------------------------------
+
+    def _on_connect(
+        self, client: mqtt.Client, userdata: Any, flags: Any, reason_code: Any,
+        properties: Any,
+    ) -> None:
+        self._loop.call_soon_threadsafe(self._set_connected, reason_code)
+
+    def _on_message(
+        self, client: mqtt.Client, userdata: Any, message: mqtt.MQTTMessage
+    ) -> None:
+        payload = message.payload.decode(errors="replace")
+        self._loop.call_soon_threadsafe(self._deliver, payload)
+
+    def _on_disconnect(
+        self, client: mqtt.Client, userdata: Any, flags: Any, reason_code: Any,
+        properties: Any,
+    ) -> None:
+        self._loop.call_soon_threadsafe(self._deliver, None)
+
+    # -- Event loop side ----------------------------------------------------
+
+    def _set_connected(self, reason_code: Any) -> None:
+        if self._connected.done():
+            return
+        if reason_code.is_failure:
+            self._connected.set_exception(
+                ConnectionError(f"MQTT connection refused: {reason_code}")
+            )
+        else:
+            self._connected.set_result(None)
+
+    def _on_audio(self, opus: bytes) -> None:
+        self._last_audio = self._loop.time()
+        self._inbox.put_nowait(pack_audio_frame(opus))
+
+    def _deliver(self, message: str | None) -> None:
+        if self._held or (
+            message is not None and self._audio_pending() and _is_tts_stop(message)
+        ):
+            self._held.append(message)
+            self._schedule_release()
+        else:
+            self._inbox.put_nowait(message)
+
+    def _audio_pending(self) -> bool:
+        return self._loop.time() - self._last_audio < UDP_REORDER_WINDOW
+
+    def _schedule_release(self) -> None:
+        if self._release_handle is None:
+            delay = self._last_audio + UDP_REORDER_WINDOW - self._loop.time()
+            self._release_handle = self._loop.call_later(delay, self._release)
+
+    def _release(self) -> None:
+        self._release_handle = None
+        if self._audio_pending():
+            self._schedule_release()
+            return
+        for message in self._held:
+            self._inbox.put_nowait(message)
+        self._held.clear()
+
+    async def send(self, message: str | bytes) -> None:
+        """Publish a JSON message, or send a binary audio frame over UDP."""
+        if isinstance(message, bytes):
+            opus = unpack_audio_frame(message)
+            if opus is None:
+                return
+            if self._audio is None:
+                raise ConnectionError("UDP audio channel not open")
+            self._audio.send(opus)
+            return
+        if self._session_id is not None:
+            # Messages on the shared MQTT channel are matched to the session
+            data = json.loads(message)
+            data.setdefault("session_id", self._session_id)
+            message = json.dumps(data)
+        info = self._client.publish(self._config.publish_topic, message)
+        if info.rc != mqtt.MQTT_ERR_SUCCESS:
+            raise ConnectionError(f"MQTT publish failed: {mqtt.error_string(info.rc)}")
+
+    async def recv(self) -> str | bytes:
+        """Return the next incoming message."""
+        message = await self._inbox.get()
+        if message is None:
+            raise ConnectionError("MQTT connection lost")
+        return message
+
+    async def __aiter__(self) -> AsyncIterator[str | bytes]:
+        """Yield incoming messages until the broker or server ends the session."""
+        try:
+            while (message := await self._inbox.get()) is not None:
+                if isinstance(message, str) and self._is_goodbye(message):
+                    _LOGGER.debug("Server ended the session (goodbye)")
+                    self._goodbye = True
+                    return
+                yield message
+        finally:
+            await self.close()
+
+    def _is_goodbye(self, message: str) -> bool:
+        if MSG_TYPE_GOODBYE not in message:
+            return False
+        try:
+            data = json.loads(message)
+        except json.JSONDecodeError:
+            return False
+        return (
+            isinstance(data, dict)
+            and data.get("type") == MSG_TYPE_GOODBYE
+            and data.get("session_id") in (None, self._session_id)
+        )
+
+    async def close(self) -> None:
+        """Say goodbye, close the audio channel and disconnect from the broker."""
+        if self._closed:
+            return
+        self._closed = True
+        if self._release_handle is not None:
+            self._release_handle.cancel()
+            self._release_handle = None
+        if self._audio is not None:
+            self._audio.close()
+            self._audio = None
+        if self._session_id is not None and not self._goodbye:
+            goodbye = {"session_id": self._session_id, "type": MSG_TYPE_GOODBYE}
+            self._client.publish(self._config.publish_topic, json.dumps(goodbye))
+        self._client.disconnect()
+        # Joins paho's network thread
+        await self._loop.run_in_executor(None, self._client.loop_stop)
+
+
+def _is_tts_stop(message: str) -> bool:
+    if TTS_STATE_STOP not in message:
+        return False
+    try:
+        data = json.loads(message)
+    except json.JSONDecodeError:
+        return False
+    return (
+        isinstance(data, dict)
+        and data.get("type") == MSG_TYPE_TTS
+        and data.get("state") == TTS_STATE_STOP
+    )
+
+
+class XiaozhiMqttUdpClient(XiaozhiWebSocketClient):
+    """Xiaozhi client using MQTT for control messages and UDP for audio."""
+
+    _transport = "udp"
+
+    def __init__(self, config: XiaozhiConfig) -> None:
+        """Initialize the client; config.mqtt must hold the MQTT credentials."""
+        if config.mqtt is None:
+            raise ValueError("MQTT + UDP transport needs MQTT credentials")
+        super().__init__(config)
+        self._mqtt_config = config.mqtt
+        self._connection: MqttUdpConnection | None = None
+
+    def _get_ws_url(self) -> str:
+        """Return the broker address (for TLS selection and logging)."""
+        config = self._mqtt_config
+        scheme = "mqtts" if config.tls else "mqtt"
+        return f"{scheme}://{config.host}:{config.port}"
+
+    def _get_ws_headers(self) -> None:
+        """MQTT authenticates with username/password instead of headers."""
+        return None
+
+    async def _open_connection(
+        self,
+        url: str,
+        headers: dict[str, str] | None,
+        ssl_context: ssl_module.SSLContext | None,
+    ) -> MqttUdpConnection:  # type: ignore[override]
+        """Connect to the MQTT broker; UDP opens after the hello."""
+        self._connection = MqttUdpConnection(self._mqtt_config)
+        await self._connection.open(ssl_context)
+        return self._connection
+
+    async def _on_server_hello(self, data: dict[str, Any]) -> None:
+        """Open the UDP audio channel the server hello describes."""
+        udp = data.get("udp")
+        if not isinstance(udp, dict) or self._connection is None:
+            raise ConnectionError("Server hello has no UDP audio channel")
+        await self._connection.open_audio(data.get("session_id"), udp)
@@ -16,7 +16,7 @@ from .const import (
     OTA_TIMEOUT,
     OTA_URL,
 )
-from .models import ActivationResult, OTAConfig
+from .models import ActivationResult, MqttConfig, OTAConfig
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -111,7 +111,7 @@ class XiaozhiOTAClient:
     @staticmethod
     def _parse_response(data: dict) -> ActivationResult:
         """Parse OTA response into ActivationResult."""
-        safe = {k: v for k, v in data.items() if k != "websocket"}
+        safe = {k: v for k, v in data.items() if k not in ("websocket", "mqtt")}
         _LOGGER.debug("OTA response: %s", safe)
 
         if not isinstance(data, dict):
@@ -131,6 +131,7 @@ class XiaozhiOTAClient:
             ota_config = OTAConfig(
                 websocket_url=ws_url,
                 access_token=ws_token,
+                mqtt=_parse_mqtt(data.get("mqtt")),
             )
 
         # If activation code present — device needs activation (even if websocket present)
@@ -156,3 +157,14 @@ class XiaozhiOTAClient:
             return ActivationResult(config=ota_config)
 
         raise OTAError(f"Unexpected OTA response: {data}")
+
+
+def _parse_mqtt(mqtt_info: object) -> MqttConfig | None:
+    """Parse the optional MQTT + UDP credentials of an OTA response."""
+    if not isinstance(mqtt_info, dict):
+        return None
+    try:
+        return MqttConfig.from_dict(mqtt_info)
+    except KeyError:
+        _LOGGER.debug("Incomplete MQTT credentials in OTA response")
+        return None
@@ -0,0 +1,175 @@
+"""Append-only recording of WebSocket sessions.
+
+Every frame a client sends or receives is written as a fixed 13-byte record
+header (``<dBI``: seconds since the recording started, direction/kind byte,
+payload length) followed by the raw payload. Connects and disconnects are
+recorded as payload-less markers so a replay can tell connections apart.
+
+Frames are buffered in memory and written from the executor, so recording
+never blocks the event loop on disk I/O.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+import struct
+import time
+from collections.abc import Iterator
+from dataclasses import dataclass
+from enum import IntEnum
+from pathlib import Path
+from typing import BinaryIO
+
+from .const import RECORDER_FLUSH_BYTES, RECORDER_FLUSH_INTERVAL
+
+_LOGGER = logging.getLogger(__name__)
+
+RECORDING_MAGIC = b"XZREC1\n"
+_RECORD = struct.Struct("<dBI")
+
+
+class FrameDirection(IntEnum):
+    """Which side sent a recorded frame."""
+
+    INBOUND = 0
+    OUTBOUND = 1
+
+
+class FrameKind(IntEnum):
+    """What a recorded frame holds."""
+
+    TEXT = 0
+    BINARY = 1
+    CONNECT = 2
+    DISCONNECT = 3
+
+
+@dataclass(frozen=True, slots=True)
+class RecordedFrame:
+    """One frame read back from a recording."""
+
+    timestamp: float
+    direction: FrameDirection
+    kind: FrameKind
+    payload: bytes
+
+    @property
+    def message(self) -> str | bytes:
+        """Return the frame as the WebSocket delivered it."""
+        if self.kind is FrameKind.BINARY:
+            return self.payload
+        return self.payload.decode()
+
+
+class SessionRecorder:
+    """Buffered append-only writer for one client's frames."""
+
+    def __init__(
+        self,
+        path: Path,
+        flush_interval: float = RECORDER_FLUSH_INTERVAL,
+        flush_bytes: int = RECORDER_FLUSH_BYTES,
+    ) -> None:
+        """Initialize; the file is created on the first flush."""
+        self.path = path
+        self._flush_interval = flush_interval
+        self._flush_bytes = flush_bytes
+        self._started = time.monotonic()
+        self._buffer = bytearray()
+        self._file: BinaryIO | None = None
+        self._flush_handle: asyncio.TimerHandle | None = None
+        self._flush_task: asyncio.Task[None] | None = None
+        self.frames = 0
+
+    def record(self, direction: FrameDirection, message: str | bytes) -> None:
+        """Record one text or binary frame."""
+        if isinstance(message, bytes):
+            self._append(direction, FrameKind.BINARY, message)
+        else:
+            self._append(direction, FrameKind.TEXT, message.encode())
+
+    def record_event(self, kind: FrameKind, info: str = "") -> None:
+        """Record a connect or disconnect marker."""
+        self._append(FrameDirection.OUTBOUND, kind, info.encode())
+
+    def _append(
+        self, direction: FrameDirection, kind: FrameKind, payload: bytes
+    ) -> None:
+        self._buffer += _RECORD.pack(
+            time.monotonic() - self._started, direction << 4 | kind, len(payload)
+        )
+        self._buffer += payload
+        self.frames += 1
+        if len(self._buffer) >= self._flush_bytes:
+            self._schedule_flush(0)
+        elif self._flush_handle is None:
+            self._schedule_flush(self._flush_interval)
+
+    def _schedule_flush(self, delay: float) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+        self._flush_handle = asyncio.get_running_loop().call_later(
+            delay, self._start_flush
+        )
+
+    def _start_flush(self) -> None:
+        self._flush_handle = None
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.get_running_loop().create_task(self.flush())
+
+    async def flush(self) -> None:
+        """Write buffered frames to disk."""
+        while self._buffer:
+            chunk = bytes(self._buffer)
+            self._buffer.clear()
+            try:
+                await asyncio.get_running_loop().run_in_executor(
+                    None, self._write, chunk
+                )
+            except OSError:
+                _LOGGER.warning("Could not write recording %s", self.path, exc_info=True)
+                return
+
+    def _write(self, chunk: bytes) -> None:
+        if self._file is None:
+            self._file = self.path.open("ab")
+            if self._file.tell() == 0:
+                self._file.write(RECORDING_MAGIC)
+        self._file.write(chunk)
+        self._file.flush()
+
+    async def aclose(self) -> None:
+        """Flush and close the file; recording again reopens it for append."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if self._flush_task is not None:
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._flush_task
+            self._flush_task = None
+        await self.flush()
+        if self._file is not None:
+            await asyncio.get_running_loop().run_in_executor(None, self._file.close)
+            self._file = None
+
+
+def read_recording(path: Path) -> Iterator[RecordedFrame]:
+    """Yield the frames of a recording in the order they were written.
+
+    A record cut short (e.g. by a crash mid-write) ends the iteration.
+    """
+    with path.open("rb") as file:
+        if file.read(len(RECORDING_MAGIC)) != RECORDING_MAGIC:
+            raise ValueError(f"{path} is not a Xiaozhi session recording")
+        while header := file.read(_RECORD.size):
+            if len(header) < _RECORD.size:
+                return
+            timestamp, tag, size = _RECORD.unpack(header)
+            payload = file.read(size)
+            if len(payload) < size:
+                return
+            yield RecordedFrame(
+                timestamp, FrameDirection(tag >> 4), FrameKind(tag & 0x0F), payload
+            )
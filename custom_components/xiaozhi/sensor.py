@@ -0,0 +1,124 @@
+"""Xiaozhi turn latency sensors for Home Assistant.
+
+One diagnostic sensor per latency interval. The state is the p95 over the
+rolling window; p50, p99 and the sample count are attributes. Another
+diagnostic sensor shows the turn audio held in memory.
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.components.sensor import (
+    SensorDeviceClass,
+    SensorEntity,
+    SensorStateClass,
+)
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import EntityCategory, UnitOfInformation, UnitOfTime
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+
+from .arena import AUDIO_MEMORY
+from .base_entity import XiaozhiBaseEntity
+from .const import DOMAIN
+from .metrics import TurnMetric, TurnMetrics
+
+_METRIC_NAMES: dict[TurnMetric, str] = {
+    TurnMetric.UPLINK_START: "Uplink start latency",
+    TurnMetric.STT: "STT latency",
+    TurnMetric.FIRST_SENTENCE: "First sentence latency",
+    TurnMetric.FIRST_AUDIO: "First audio latency",
+    TurnMetric.TTS_STREAM: "TTS stream duration",
+    TurnMetric.DECODE: "Decode latency",
+    TurnMetric.TTS_HANDOFF: "TTS hand-off latency",
+    TurnMetric.TOTAL: "Turn latency",
+}
+
+
+async def async_setup_entry(
+    hass: HomeAssistant,
+    entry: ConfigEntry,
+    async_add_entities: AddEntitiesCallback,
+) -> None:
+    """Set up Xiaozhi latency sensors from a config entry."""
+    metrics: TurnMetrics = hass.data[DOMAIN][entry.entry_id]["metrics"]
+    async_add_entities(
+        [
+            *(XiaozhiLatencySensor(entry, metrics, metric) for metric in TurnMetric),
+            XiaozhiAudioMemorySensor(entry),
+        ]
+    )
+
+
+class XiaozhiLatencySensor(XiaozhiBaseEntity, SensorEntity):
+    """p95 of one turn latency interval."""
+
+    _attr_device_class = SensorDeviceClass.DURATION
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_native_unit_of_measurement = UnitOfTime.MILLISECONDS
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _attr_suggested_display_precision = 0
+
+    def __init__(
+        self,
+        entry: ConfigEntry,
+        metrics: TurnMetrics,
+        metric: TurnMetric,
+    ) -> None:
+        """Initialize the sensor."""
+        XiaozhiBaseEntity.__init__(self, entry)
+        self._metrics = metrics
+        self._metric = metric
+        self._attr_name = _METRIC_NAMES[metric]
+        self._attr_unique_id = f"{entry.entry_id}_latency_{metric}"
+
+    async def async_added_to_hass(self) -> None:
+        """Update when the metric gets a new sample."""
+        self.async_on_remove(self._metrics.add_listener(self._handle_sample))
+
+    @callback
+    def _handle_sample(self, metric: TurnMetric) -> None:
+        if metric is self._metric:
+            self.async_write_ha_state()
+
+    @property
+    def native_value(self) -> float | None:
+        """Return the p95 latency in ms."""
+        return self._metrics.histogram(self._metric).percentile(95)
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        """Return p50/p99 and sample counts."""
+        return self._metrics.histogram(self._metric).summary()
+
+
+class XiaozhiAudioMemorySensor(XiaozhiBaseEntity, SensorEntity):
+    """Turn audio held in RAM by all audio arenas (polled).
+
+    The budget, bytes spilled to disk, spill count and truncated turns are
+    attributes. The counters are process-wide, shared by all entries.
+    """
+
+    _attr_device_class = SensorDeviceClass.DATA_SIZE
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_native_unit_of_measurement = UnitOfInformation.BYTES
+    _attr_state_class = SensorStateClass.MEASUREMENT
+    _attr_name = "Audio buffer memory"
+
+    def __init__(self, entry: ConfigEntry) -> None:
+        """Initialize the sensor."""
+        XiaozhiBaseEntity.__init__(self, entry)
+        self._attr_unique_id = f"{entry.entry_id}_audio_memory"
+
+    @property
+    def native_value(self) -> int:
+        """Return the bytes of turn audio held in RAM."""
+        return AUDIO_MEMORY.memory_bytes
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        """Return the budget and spill counters."""
+        stats = AUDIO_MEMORY.as_dict()
+        del stats["memory_bytes"]
+        return stats
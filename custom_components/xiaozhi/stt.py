@@ -11,6 +11,7 @@ fills the PipelineResultCollector, which Conversation and TTS entities await.
 from __future__ import annotations
 
 import asyncio
+import contextlib
 import logging
 from collections.abc import AsyncIterable
 
@@ -27,13 +28,32 @@ from homeassistant.components.stt import (
 )
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
+from homeassistant.helpers import chat_session
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
-from .audio import pcm_to_opus_frames
+from .audio import (
+    IncrementalOpusDecoder,
+    ffmpeg_uplink_encoder_args,
+    pcm_to_opus_frames,
+)
 from .base_entity import XiaozhiBaseEntity
 from .client import XiaozhiWebSocketClient
-from .const import DOMAIN, PIPELINE_COLLECT_TIMEOUT, STT_RESULT_TIMEOUT, SUPPORTED_LANGUAGES
+from .client_pool import XiaozhiClientPool
+from .const import (
+    CONF_TTS_OUTPUT_FORMAT,
+    CONF_VAD_ENABLED,
+    DEFAULT_TTS_OUTPUT_FORMAT,
+    DEFAULT_VAD_ENABLED,
+    DOMAIN,
+    PIPELINE_COLLECT_TIMEOUT,
+    STT_RESULT_TIMEOUT,
+    SUPPORTED_LANGUAGES,
+    TTS_OUTPUT_FORMAT_WAV,
+)
+from .ffmpeg_pool import FFmpegWorkerPool
+from .metrics import TurnMetrics, TurnStage
 from .models import PipelineCacheManager, VoicePipelineSession
+from .vad import EnergyVAD, vad_filter
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -45,9 +65,25 @@ async def async_setup_entry(
 ) -> None:
     """Set up Xiaozhi STT entity from a config entry."""
     data = hass.data[DOMAIN][entry.entry_id]
-    client: XiaozhiWebSocketClient = data["client"]
+    client_pool: XiaozhiClientPool = data["client_pool"]
     cache: PipelineCacheManager = data["cache"]
-    async_add_entities([XiaozhiSTTEntity(entry, client, cache)])
+    async_add_entities(
+        [
+            XiaozhiSTTEntity(
+                entry, client_pool, cache, data.get("ffmpeg_pool"), data.get("metrics")
+            )
+        ]
+    )
+
+
+def _pipeline_conversation_id() -> str | None:
+    """Return the conversation ID of the pipeline run calling us, if any.
+
+    The assist pipeline holds its chat session open for the whole run, so
+    the conversation stage later gets the same ID.
+    """
+    session = chat_session.current_session.get()
+    return session.conversation_id if session is not None else None
 
 
 class XiaozhiSTTEntity(XiaozhiBaseEntity, SpeechToTextEntity):
@@ -56,6 +92,10 @@ class XiaozhiSTTEntity(XiaozhiBaseEntity, SpeechToTextEntity):
     Streams audio to the Xiaozhi WebSocket, which runs the full pipeline
     (STT → LLM → TTS). Returns STT text immediately and collects
     LLM response + TTS audio in a background task.
+
+    Each pipeline run (e.g. one per satellite) leases its own connection
+    from the pool for the whole turn, so concurrent runs get their own
+    server session and audio is never routed to the wrong one.
     """
 
     _attr_name = "STT"
@@ -63,14 +103,36 @@ class XiaozhiSTTEntity(XiaozhiBaseEntity, SpeechToTextEntity):
     def __init__(
         self,
         entry: ConfigEntry,
-        client: XiaozhiWebSocketClient,
+        client_pool: XiaozhiClientPool,
         cache: PipelineCacheManager,
+        ffmpeg_pool: FFmpegWorkerPool | None = None,
+        metrics: TurnMetrics | None = None,
     ) -> None:
         """Initialize the STT entity."""
         XiaozhiBaseEntity.__init__(self, entry)
-        self._client = client
+        self._client_pool = client_pool
         self._cache = cache
+        self._ffmpeg_pool = ffmpeg_pool
+        self._metrics = metrics or TurnMetrics()
+        # TTS replies are decoded while they arrive unless served as OGG
+        self._decode_tts = (
+            entry.options.get(CONF_TTS_OUTPUT_FORMAT, DEFAULT_TTS_OUTPUT_FORMAT)
+            == TTS_OUTPUT_FORMAT_WAV
+        )
+        self._vad_enabled = entry.options.get(CONF_VAD_ENABLED, DEFAULT_VAD_ENABLED)
         self._attr_unique_id = f"{entry.entry_id}_stt"
+        # Running collection tasks, cancelled on unload
+        self._collect_tasks: set[asyncio.Task[None]] = set()
+
+    async def async_will_remove_from_hass(self) -> None:
+        """Cancel pipeline collection still running (aborts the server turns)."""
+        tasks = list(self._collect_tasks)
+        for task in tasks:
+            task.cancel()
+        for task in tasks:
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+        self._collect_tasks.clear()
 
     @property
     def supported_languages(self) -> list[str]:
@@ -105,7 +167,7 @@ class XiaozhiSTTEntity(XiaozhiBaseEntity, SpeechToTextEntity):
     @property
     def available(self) -> bool:
         """Return True if the entity is available."""
-        return self._client.is_connected
+        return self._client_pool.is_connected
 
     async def async_process_audio_stream(
         self,
@@ -114,69 +176,135 @@ class XiaozhiSTTEntity(XiaozhiBaseEntity, SpeechToTextEntity):
     ) -> SpeechResult:
         """Process audio stream through Xiaozhi pipeline.
 
-        1. Stream PCM audio → convert to opus → send as binary WS frames
+        1. Stream PCM audio → (optional VAD: drop silence, end at end of
+           speech) → convert to opus → send as binary WS frames
         2. Wait for STT result from server (fast: 1-5 sec after audio ends)
         3. Start background task to collect LLM response + TTS audio
         4. Return STT text immediately (non-blocking)
         """
-        if not self._client.is_connected:
+        # Lease a connection for this run; waits (FIFO) if all are busy
+        try:
+            client = await self._client_pool.acquire()
+        except ConnectionError:
             _LOGGER.warning("STT unavailable: not connected to Xiaozhi server")
             return SpeechResult(text=None, result=SpeechResultState.ERROR)
+        except asyncio.TimeoutError:
+            _LOGGER.warning("STT unavailable: all Xiaozhi connections are busy")
+            return SpeechResult(text=None, result=SpeechResultState.ERROR)
 
         # Create an isolated voice session for this pipeline run
-        session = VoicePipelineSession()
-        self._client.register_voice_session(session)
+        decoder = (
+            IncrementalOpusDecoder(pool=self._ffmpeg_pool) if self._decode_tts else None
+        )
+        timeline = self._metrics.start_turn("voice")
+        session = VoicePipelineSession(decoder, timeline)
+        client.register_voice_session(session)
+        # The collection task releases the connection once it takes over
+        handed_off = False
 
         try:
             # Signal Xiaozhi to start listening for audio
-            await self._client.start_listening(language=metadata.language)
+            await client.start_listening(language=metadata.language)
+            timeline.mark(TurnStage.LISTEN_START)
 
             # Stream audio: PCM → opus → binary frames → WebSocket
+            pcm_stream = stream.__aiter__()
+            vad: EnergyVAD | None = None
+            if self._vad_enabled:
+                vad = EnergyVAD()
+                pcm_stream = vad_filter(pcm_stream, vad)
+            # Encoder settings adapt to this connection's link quality
+            uplink = client.choose_uplink_params()
+            timeline.uplink = uplink.as_dict()
+            if self._ffmpeg_pool is not None:
+                # Keep only the encoders the uplink can pick next warm
+                self._ffmpeg_pool.set_warm(
+                    ffmpeg_uplink_encoder_args(self._client_pool.uplink_choices())
+                )
             frame_count = 0
-            async for opus_frame in pcm_to_opus_frames(stream.__aiter__()):
-                await self._client.send_audio_frame(opus_frame)
+            async for opus_frame in pcm_to_opus_frames(
+                pcm_stream,
+                frame_duration_ms=uplink.frame_duration_ms,
+                pool=self._ffmpeg_pool,
+                bitrate=uplink.bitrate,
+            ):
+                await client.send_audio_frame(opus_frame)
+                timeline.mark(TurnStage.FIRST_UPLINK)
                 frame_count += 1
 
-            _LOGGER.debug("Audio streaming complete: sent %d opus frames", frame_count)
+            _LOGGER.debug(
+                "Audio streaming complete: sent %d opus frames (%d ms, %d bps)",
+                frame_count,
+                uplink.frame_duration_ms,
+                uplink.bitrate,
+            )
+
+            if vad is not None and not vad.triggered:
+                # The audio ended without speech: no STT result will come,
+                # so end the turn now instead of waiting for one
+                _LOGGER.debug("No speech detected, ending the turn")
+                await client.abort(session=session)
+                client.unregister_voice_session(session.session_id)
+                return SpeechResult(text=None, result=SpeechResultState.ERROR)
 
             # Tell server we're done sending audio
-            await self._client.stop_listening()
+            await client.stop_listening()
+            timeline.mark(TurnStage.LISTEN_STOP)
 
             # Wait for STT result (should be fast: 1-5 sec)
             try:
                 await asyncio.wait_for(session.stt_event.wait(), timeout=STT_RESULT_TIMEOUT)
             except asyncio.TimeoutError:
                 _LOGGER.warning("Timeout waiting for STT result")
-                self._client.unregister_voice_session(session.session_id)
+                # Keep a late reply from being routed to the next turn
+                await client.abort(session=session)
+                client.unregister_voice_session(session.session_id)
                 return SpeechResult(text=None, result=SpeechResultState.ERROR)
 
             stt_text = session.stt_text
             if not stt_text:
-                self._client.unregister_voice_session(session.session_id)
+                client.unregister_voice_session(session.session_id)
                 return SpeechResult(text=None, result=SpeechResultState.ERROR)
 
-            # Create collector for Conversation + TTS entities to await
-            await self._cache.create_collector(stt_text)
+            # Create collector for Conversation + TTS entities to await,
+            # bound to this pipeline run's conversation so a concurrent
+            # satellite's conversation can't take it
+            await self._cache.create_collector(
+                stt_text, session, _pipeline_conversation_id()
+            )
 
             # Start background task to collect LLM response + TTS audio
-            asyncio.create_task(
-                self._collect_pipeline_results(session, stt_text)
+            task = asyncio.create_task(
+                self._collect_pipeline_results(client, session, stt_text)
             )
+            self._collect_tasks.add(task)
+            task.add_done_callback(self._collect_tasks.discard)
+            handed_off = True
 
             # Return STT text immediately — don't block the pipeline
             _LOGGER.debug("STT result: %s (pipeline collecting in background)", stt_text)
             return SpeechResult(text=stt_text, result=SpeechResultState.SUCCESS)
 
+        except asyncio.CancelledError:
+            # HA cancelled the pipeline: stop the server generating a reply
+            _LOGGER.debug("STT cancelled, aborting server turn")
+            await client.abort(session=session)
+            client.unregister_voice_session(session.session_id)
+            raise
         except Exception:
             _LOGGER.exception("Error during STT processing")
-            self._client.unregister_voice_session(session.session_id)
+            client.unregister_voice_session(session.session_id)
             # Cancel the TTS future if not yet done
             if not session.tts_future.done():
                 session.tts_future.cancel()
             return SpeechResult(text=None, result=SpeechResultState.ERROR)
+        finally:
+            if not handed_off:
+                self._client_pool.release(client)
 
     async def _collect_pipeline_results(
         self,
+        client: XiaozhiWebSocketClient,
         session: VoicePipelineSession,
         stt_text: str,
     ) -> None:
@@ -186,9 +314,19 @@ class XiaozhiSTTEntity(XiaozhiBaseEntity, SpeechToTextEntity):
                 session.tts_future, timeout=PIPELINE_COLLECT_TIMEOUT
             )
 
-            # Store in cache and signal collector
+            # Audio was decoded as it arrived; only the tail is left
+            wav = await session.decoder.wav() if session.decoder else None
+            if session.timeline is not None:
+                session.timeline.mark(TurnStage.DECODE_DONE)
+
+            # Store in cache and signal collector; the cache takes over the
+            # session's audio arena (the turn has ended, nothing appends)
             await self._cache.complete_collector(
-                stt_text, response_text, list(session.audio_chunks)
+                stt_text,
+                response_text,
+                session.audio_chunks,
+                wav,
+                session.timeline,
             )
             _LOGGER.debug(
                 "Pipeline collected: stt=%s, response=%.50s..., audio=%d chunks",
@@ -197,12 +335,20 @@ class XiaozhiSTTEntity(XiaozhiBaseEntity, SpeechToTextEntity):
 
         except asyncio.TimeoutError:
             _LOGGER.warning("Timeout collecting pipeline results for: %s", stt_text)
+            # Keep a late reply from being routed to the connection's next turn
+            await client.abort(session=session)
             await self._cache.fail_collector(stt_text)
         except asyncio.CancelledError:
             _LOGGER.debug("Pipeline collection cancelled for: %s", stt_text)
+            await client.abort(session=session)
             await self._cache.fail_collector(stt_text)
+            raise
         except Exception:
             _LOGGER.exception("Error collecting pipeline results")
+            await client.abort(session=session)
             await self._cache.fail_collector(stt_text)
         finally:
-            self._client.unregister_voice_session(session.session_id)
+            client.unregister_voice_session(session.session_id)
+            self._client_pool.release(client)
+            if session.decoder is not None:
+                await session.decoder.aclose()
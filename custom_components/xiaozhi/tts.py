@@ -3,21 +3,52 @@
 Returns cached audio from the voice pipeline. When the STT entity processes
 a voice request, it captures the full pipeline output including TTS audio.
 This entity serves that cached audio back to HA's pipeline.
+
+With HA's streaming TTS, audio is decoded and yielded as the server sends
+it, so playback can start before the whole response is synthesized.
+
+Audio is returned as WAV (decoded PCM) or, with the "ogg" output format,
+as the server's opus packets muxed into OGG without decoding.
 """
 
 from __future__ import annotations
 
 import logging
+from collections.abc import AsyncGenerator, AsyncIterator, Iterable
 
-from homeassistant.components.tts import TextToSpeechEntity, TtsAudioType
+from homeassistant.components.tts import (
+    TextToSpeechEntity,
+    TTSAudioRequest,
+    TTSAudioResponse,
+    TtsAudioType,
+)
 from homeassistant.config_entries import ConfigEntry
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.entity_platform import AddEntitiesCallback
 
-from .audio import generate_silence_wav, opus_frames_to_wav
+from .audio import (
+    generate_silence_ogg,
+    generate_silence_wav,
+    opus_frames_to_ogg,
+    opus_frames_to_wav,
+    opus_stream_to_ogg,
+    opus_stream_to_pcm,
+    wav_stream_header,
+)
 from .base_entity import XiaozhiBaseEntity
-from .const import DOMAIN, PIPELINE_COLLECT_TIMEOUT, SUPPORTED_LANGUAGES
-from .models import PipelineCacheManager
+from .const import (
+    CONF_TTS_OUTPUT_FORMAT,
+    DEFAULT_TTS_OUTPUT_FORMAT,
+    DOMAIN,
+    PIPELINE_COLLECT_TIMEOUT,
+    SUPPORTED_LANGUAGES,
+    TTS_OPTION_OUTPUT_FORMAT,
+    TTS_OUTPUT_FORMAT_OGG,
+    TTS_OUTPUT_FORMAT_WAV,
+)
+from .ffmpeg_pool import FFmpegWorkerPool
+from .metrics import TurnStage, TurnTimeline
+from .models import PipelineCache, PipelineCacheManager
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -28,8 +59,9 @@ async def async_setup_entry(
     async_add_entities: AddEntitiesCallback,
 ) -> None:
     """Set up Xiaozhi TTS entity from a config entry."""
-    cache: PipelineCacheManager = hass.data[DOMAIN][entry.entry_id]["cache"]
-    async_add_entities([XiaozhiTTSEntity(entry, cache)])
+    data = hass.data[DOMAIN][entry.entry_id]
+    cache: PipelineCacheManager = data["cache"]
+    async_add_entities([XiaozhiTTSEntity(entry, cache, data.get("ffmpeg_pool"))])
 
 
 class XiaozhiTTSEntity(XiaozhiBaseEntity, TextToSpeechEntity):
@@ -47,14 +79,29 @@ class XiaozhiTTSEntity(XiaozhiBaseEntity, TextToSpeechEntity):
         """Return the default language."""
         return "zh"
 
+    @property
+    def supported_options(self) -> list[str]:
+        """Return supported per-call options."""
+        return [TTS_OPTION_OUTPUT_FORMAT]
+
+    @property
+    def default_options(self) -> dict[str, str]:
+        """Return default options (the configured output format)."""
+        return {TTS_OPTION_OUTPUT_FORMAT: self._output_format}
+
     def __init__(
         self,
         entry: ConfigEntry,
         cache: PipelineCacheManager,
+        ffmpeg_pool: FFmpegWorkerPool | None = None,
     ) -> None:
         """Initialize the TTS entity."""
         XiaozhiBaseEntity.__init__(self, entry)
         self._cache = cache
+        self._ffmpeg_pool = ffmpeg_pool
+        self._output_format = entry.options.get(
+            CONF_TTS_OUTPUT_FORMAT, DEFAULT_TTS_OUTPUT_FORMAT
+        )
         self._attr_unique_id = f"{entry.entry_id}_tts"
 
     async def async_get_tts_audio(
@@ -69,24 +116,23 @@ class XiaozhiTTSEntity(XiaozhiBaseEntity, TextToSpeechEntity):
         This avoids a second request to Xiaozhi server.
         If no audio is available, returns silence to prevent pipeline errors.
         """
-        # Wait for async collector if the background task hasn't finished yet
-        collector = await self._cache.get_collector(message)
-        if collector:
-            _LOGGER.debug("TTS waiting for pipeline collector: %.50s...", message)
-            if not await collector.wait(timeout=PIPELINE_COLLECT_TIMEOUT):
-                _LOGGER.warning("TTS collector timeout: %.50s...", message)
-                return ("wav", generate_silence_wav())
-        else:
-            _LOGGER.debug(
-                "TTS no collector (fast-server path): %.50s...", message
-            )
-
-        _LOGGER.debug("TTS looking up cache for response: %.80s...", message)
-        audio_chunks = await self._cache.get_audio_by_response(message)
+        output_format = self._get_output_format(options)
+        entry = await self._get_cached_entry(message)
+        audio_chunks = entry.audio_chunks if entry else None
+        timeline = entry.timeline if entry else None
+        if entry and entry.wav and output_format == TTS_OUTPUT_FORMAT_WAV:
+            _LOGGER.debug("Serving TTS audio decoded while it arrived")
+            _mark_returned(timeline)
+            return ("wav", entry.wav)
+        if audio_chunks and output_format == TTS_OUTPUT_FORMAT_OGG:
+            _LOGGER.debug("Serving cached TTS audio as OGG (%d chunks)", len(audio_chunks))
+            _mark_returned(timeline)
+            return ("ogg", opus_frames_to_ogg(audio_chunks))
         if audio_chunks:
             _LOGGER.debug("Serving cached TTS audio (%d chunks)", len(audio_chunks))
-            wav_data = await opus_frames_to_wav(audio_chunks)
+            wav_data = await opus_frames_to_wav(audio_chunks, pool=self._ffmpeg_pool)
             if wav_data is not None and wav_data:
+                _mark_returned(timeline)
                 return ("wav", wav_data)
             _LOGGER.warning("Failed to decode cached opus audio to WAV")
 
@@ -96,4 +142,116 @@ class XiaozhiTTSEntity(XiaozhiBaseEntity, TextToSpeechEntity):
             "No cached audio for response, returning silence: %.50s...",
             message,
         )
+        if output_format == TTS_OUTPUT_FORMAT_OGG:
+            return ("ogg", generate_silence_ogg())
         return ("wav", generate_silence_wav())
+
+    async def async_stream_tts_audio(
+        self, request: TTSAudioRequest
+    ) -> TTSAudioResponse:
+        """Stream TTS audio as it arrives from the Xiaozhi server.
+
+        If the voice session that produced the message is still receiving
+        audio, its frames are decoded and yielded live. Otherwise the cached
+        audio is streamed, or silence if there is none.
+        """
+        output_format = self._get_output_format(request.options)
+        return TTSAudioResponse(
+            output_format, self._stream_audio(request.message_gen, output_format)
+        )
+
+    def _get_output_format(self, options: dict | None) -> str:
+        """Return the output format requested by options, or the configured one."""
+        output_format = (options or {}).get(TTS_OPTION_OUTPUT_FORMAT, self._output_format)
+        if output_format == TTS_OUTPUT_FORMAT_OGG:
+            return TTS_OUTPUT_FORMAT_OGG
+        return TTS_OUTPUT_FORMAT_WAV
+
+    async def _stream_audio(
+        self, message_gen: AsyncGenerator[str], output_format: str
+    ) -> AsyncGenerator[bytes]:
+        """Yield a streaming WAV or OGG for the message from message_gen."""
+        # The first sentence is enough to find a live session
+        message = ""
+        async for chunk in message_gen:
+            message += chunk
+            if message.strip():
+                break
+
+        pcm_chunks: AsyncIterator[bytes] | None = None
+        session = await self._cache.find_live_session(message)
+        if session is not None:
+            _LOGGER.debug("TTS streaming live session audio: %.50s...", message)
+            packets = session.iter_audio()
+            timeline = session.timeline
+            if session.decoder is not None:
+                # Already being decoded as it arrives
+                pcm_chunks = session.decoder.iter_pcm()
+        else:
+            async for chunk in message_gen:
+                message += chunk
+            entry = await self._get_cached_entry(message)
+            timeline = entry.timeline if entry else None
+            if entry and entry.wav and output_format == TTS_OUTPUT_FORMAT_WAV:
+                _mark_returned(timeline)
+                yield entry.wav
+                return
+            packets = _iter_packets(entry.audio_chunks if entry else [])
+
+        started = False
+        if output_format == TTS_OUTPUT_FORMAT_OGG:
+            async for page in opus_stream_to_ogg(packets):
+                started = True
+                yield page
+        else:
+            if pcm_chunks is None:
+                pcm_chunks = opus_stream_to_pcm(packets, pool=self._ffmpeg_pool)
+            async for pcm in pcm_chunks:
+                if not started:
+                    started = True
+                    yield wav_stream_header()
+                yield pcm
+
+        if started:
+            _mark_returned(timeline)
+        else:
+            _LOGGER.debug(
+                "No audio for streamed response, returning silence: %.50s...",
+                message,
+            )
+            if output_format == TTS_OUTPUT_FORMAT_OGG:
+                yield generate_silence_ogg()
+            else:
+                yield generate_silence_wav()
+
+    async def _get_cached_entry(self, message: str) -> PipelineCache | None:
+        """Wait for the pipeline collector, then pop cached results for message."""
+        # The conversation streams a voice reply before it is complete; wait
+        # for the rest if the background task hasn't finished yet
+        collector = await self._cache.find_live_collector(message)
+        if collector:
+            _LOGGER.debug("TTS waiting for pipeline collector: %.50s...", message)
+            if not await collector.wait(timeout=PIPELINE_COLLECT_TIMEOUT):
+                _LOGGER.warning("TTS collector timeout: %.50s...", message)
+                return None
+        else:
+            _LOGGER.debug(
+                "TTS no collector (fast-server path): %.50s...", message
+            )
+
+        _LOGGER.debug("TTS looking up cache for response: %.80s...", message)
+        return await self._cache.resolve_response(message)
+
+
+def _mark_returned(timeline: TurnTimeline | None) -> None:
+    """Record on the turn's timeline that its audio was handed to HA."""
+    if timeline is not None:
+        timeline.mark(TurnStage.TTS_RETURNED)
+
+
+async def _iter_packets(
+    packets: Iterable[bytes | memoryview],
+) -> AsyncIterator[bytes | memoryview]:
+    """Yield already-received opus packets."""
+    for packet in packets:
+        yield packet
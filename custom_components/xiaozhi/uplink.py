@@ -0,0 +1,137 @@
+"""Adaptive opus encoder settings for the microphone uplink.
+
+Each connection keeps an UplinkController. Every audio frame sent reports
+how long the send took and how many bytes were still queued in the socket's
+write buffer (backpressure); keepalive pings report the round-trip time.
+At the start of each voice turn the controller picks the frame duration and
+bitrate for that turn's encoder:
+
+- good link (low RTT, sends never wait): shorter frames, for lower latency,
+  and the bitrate steps back up
+- congested link (slow sends, queued bytes or high RTT): longer frames, so
+  fewer packets, and a lower bitrate, so smaller ones
+- otherwise the previous choice is kept
+
+Settings change only between turns, one step at a time, so a single slow
+send can't make the encoder flap.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any
+
+from .const import (
+    AUDIO_BITRATE,
+    AUDIO_FRAME_DURATION_MS,
+    UPLINK_BITRATE_STEP,
+    UPLINK_FRAME_DURATIONS_MS,
+    UPLINK_RTT_HIGH,
+    UPLINK_RTT_LOW,
+    UPLINK_SEND_FAST,
+    UPLINK_SEND_SLOW,
+)
+
+# Smoothing of the per-frame send time
+_SEND_EWMA_ALPHA = 0.2
+
+
+@dataclass(frozen=True, slots=True)
+class UplinkParams:
+    """Encoder settings chosen for one turn."""
+
+    frame_duration_ms: int = AUDIO_FRAME_DURATION_MS
+    bitrate: int = AUDIO_BITRATE
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the settings for per-turn diagnostics."""
+        return {"frame_duration_ms": self.frame_duration_ms, "bitrate": self.bitrate}
+
+
+class UplinkController:
+    """Chooses uplink encoder settings from one connection's link quality."""
+
+    def __init__(self, bitrate_min: int, bitrate_max: int) -> None:
+        """Initialize with bitrate bounds (bps); starts at the fixed defaults."""
+        self._bitrate_min = min(bitrate_min, bitrate_max)
+        self._bitrate_max = bitrate_max
+        self._params = UplinkParams(bitrate=self._clamp(AUDIO_BITRATE))
+        self._send_time: float | None = None
+        self._buffered = 0
+        self._rtt: float | None = None
+        self.congested_turns = 0
+
+    def _clamp(self, bitrate: int) -> int:
+        return max(self._bitrate_min, min(self._bitrate_max, bitrate))
+
+    @property
+    def params(self) -> UplinkParams:
+        """Return the settings chosen last."""
+        return self._params
+
+    def observe_send(self, seconds: float, buffered: int) -> None:
+        """Record one audio frame send and the bytes still queued after it."""
+        if self._send_time is None:
+            self._send_time = seconds
+        else:
+            self._send_time += _SEND_EWMA_ALPHA * (seconds - self._send_time)
+        self._buffered = max(self._buffered, buffered)
+
+    def observe_rtt(self, seconds: float | None) -> None:
+        """Record a round-trip time measurement (None means not yet measured)."""
+        if seconds is not None:
+            self._rtt = seconds
+
+    def choose(self) -> UplinkParams:
+        """Pick the settings for the next turn from what was observed."""
+        if self._congested():
+            self.congested_turns += 1
+            self._params = self._step(1)
+        elif self._good():
+            self._params = self._step(-1)
+        self._buffered = 0
+        return self._params
+
+    def next_choices(self) -> list[UplinkParams]:
+        """Return the settings choose() can pick next, for pre-warming encoders."""
+        return list(dict.fromkeys((self._params, self._step(1), self._step(-1))))
+
+    def _step(self, direction: int) -> UplinkParams:
+        """Return the settings one step toward a congested (1) or good (-1) link."""
+        durations = UPLINK_FRAME_DURATIONS_MS
+        index = durations.index(self._params.frame_duration_ms) + direction
+        index = max(0, min(index, len(durations) - 1))
+        return UplinkParams(
+            durations[index],
+            self._clamp(self._params.bitrate - direction * UPLINK_BITRATE_STEP),
+        )
+
+    def _congested(self) -> bool:
+        return (
+            (self._send_time is not None and self._send_time > UPLINK_SEND_SLOW)
+            or self._buffered > 0
+            or (self._rtt is not None and self._rtt > UPLINK_RTT_HIGH)
+        )
+
+    def _good(self) -> bool:
+        # Fast sends only show the local buffer is empty; shorter frames
+        # also need a measured low RTT
+        return (
+            self._rtt is not None
+            and self._rtt < UPLINK_RTT_LOW
+            and (self._send_time is None or self._send_time < UPLINK_SEND_FAST)
+        )
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the current choice and link measurements, for diagnostics."""
+        return {
+            **self._params.as_dict(),
+            "bitrate_min": self._bitrate_min,
+            "bitrate_max": self._bitrate_max,
+            "send_ms": (
+                round(self._send_time * 1000, 2) if self._send_time is not None else None
+            ),
+            "peak_buffered_bytes": self._buffered,
+            "rtt_ms": round(self._rtt * 1000, 1) if self._rtt is not None else None,
+            "congested_turns": self.congested_turns,
+        }
@@ -0,0 +1,161 @@
+"""Voice activity detection for Xiaozhi integration.
+
+Energy-based detector with an adaptive noise floor, applied to the 16 kHz
+microphone PCM before it is encoded and sent. Leading silence is trimmed
+(apart from a short pre-roll), long pauses are not sent (DTX), and the
+stream ends as soon as the speaker has stopped, so the STT entity can send
+`listen stop` without waiting for HA to close the audio stream.
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+import operator
+from array import array
+from collections import deque
+from collections.abc import AsyncIterator
+from enum import StrEnum
+
+from .const import (
+    AUDIO_SAMPLE_RATE_INPUT,
+    VAD_END_SILENCE_MS,
+    VAD_FRAME_MS,
+    VAD_HANGOVER_MS,
+    VAD_MIN_SPEECH_MS,
+    VAD_PRE_ROLL_MS,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+# Frame energy (dBFS) always treated as silence / as speech
+_SILENCE_FLOOR_DB = -60.0
+_SPEECH_CEILING_DB = -25.0
+# A frame is speech when it is this far above the noise floor
+_SPEECH_MARGIN_DB = 12.0
+# Noise floor smoothing: fast to fall, slow to rise
+_FLOOR_FALL = 0.2
+_FLOOR_RISE = 0.02
+_INITIAL_FLOOR_DB = -50.0
+
+
+class VADEvent(StrEnum):
+    """Outcome of feeding one frame to the detector."""
+
+    SILENCE = "silence"  # before speech or in a long pause: drop
+    SPEECH = "speech"  # send
+    END = "end"  # end of speech detected
+
+
+def frame_energy_db(frame: bytes) -> float:
+    """Return the RMS level of an s16le frame in dBFS."""
+    samples = array("h", frame)
+    if not samples:
+        return _SILENCE_FLOOR_DB
+    mean_square = sum(map(operator.mul, samples, samples)) / len(samples)
+    if mean_square <= 0:
+        return _SILENCE_FLOOR_DB
+    return max(_SILENCE_FLOOR_DB, 10 * math.log10(mean_square / (32768 * 32768)))
+
+
+class EnergyVAD:
+    """Frame-by-frame speech detector with start/end hysteresis."""
+
+    def __init__(
+        self,
+        sample_rate: int = AUDIO_SAMPLE_RATE_INPUT,
+        frame_ms: int = VAD_FRAME_MS,
+        min_speech_ms: int = VAD_MIN_SPEECH_MS,
+        hangover_ms: int = VAD_HANGOVER_MS,
+        end_silence_ms: int = VAD_END_SILENCE_MS,
+    ) -> None:
+        """Initialize the detector for mono s16le frames of frame_ms."""
+        self.frame_ms = frame_ms
+        self.frame_bytes = sample_rate * frame_ms // 1000 * 2
+        self._min_speech_frames = max(1, min_speech_ms // frame_ms)
+        self._hangover_frames = hangover_ms // frame_ms
+        self._end_frames = max(1, end_silence_ms // frame_ms)
+        self._floor_db = _INITIAL_FLOOR_DB
+        self._speech_run = 0
+        self._silence_run = 0
+        self.triggered = False
+
+    def _is_speech(self, energy_db: float) -> bool:
+        threshold = min(self._floor_db + _SPEECH_MARGIN_DB, _SPEECH_CEILING_DB)
+        speech = energy_db > threshold
+        if not speech:
+            rate = _FLOOR_FALL if energy_db < self._floor_db else _FLOOR_RISE
+            self._floor_db += (energy_db - self._floor_db) * rate
+        return speech
+
+    def process(self, frame: bytes) -> VADEvent:
+        """Classify one frame of frame_bytes."""
+        speech = self._is_speech(frame_energy_db(frame))
+
+        if not self.triggered:
+            self._speech_run = self._speech_run + 1 if speech else 0
+            if self._speech_run >= self._min_speech_frames:
+                self.triggered = True
+                self._silence_run = 0
+                return VADEvent.SPEECH
+            return VADEvent.SILENCE
+
+        if speech:
+            self._silence_run = 0
+            return VADEvent.SPEECH
+        self._silence_run += 1
+        if self._silence_run >= self._end_frames:
+            return VADEvent.END
+        if self._silence_run <= self._hangover_frames:
+            return VADEvent.SPEECH
+        return VADEvent.SILENCE
+
+
+async def vad_filter(
+    stream: AsyncIterator[bytes],
+    vad: EnergyVAD | None = None,
+    pre_roll_ms: int = VAD_PRE_ROLL_MS,
+) -> AsyncIterator[bytes]:
+    """Yield only the speech part of a 16 kHz PCM stream.
+
+    Frames before speech starts are held in a short pre-roll buffer so the
+    first syllable is not clipped; the stream ends at end of speech. A
+    partial frame left when the input ends during speech is sent too. If
+    the input ends before speech starts, nothing is yielded and
+    vad.triggered stays False, so the caller can end the turn at once.
+    """
+    vad = vad or EnergyVAD()
+    frame_bytes = vad.frame_bytes
+    pre_roll: deque[bytes] = deque(maxlen=max(1, pre_roll_ms // vad.frame_ms))
+    buffer = bytearray()
+    received = sent = 0
+
+    try:
+        async for chunk in stream:
+            buffer.extend(chunk)
+            while len(buffer) >= frame_bytes:
+                frame = bytes(buffer[:frame_bytes])
+                del buffer[:frame_bytes]
+                received += 1
+                was_triggered = vad.triggered
+                event = vad.process(frame)
+                if event is VADEvent.END:
+                    _LOGGER.debug("VAD end of speech")
+                    return
+                if event is VADEvent.SILENCE:
+                    if not was_triggered:
+                        pre_roll.append(frame)
+                    continue
+                if not was_triggered:
+                    _LOGGER.debug("VAD speech start")
+                    sent += len(pre_roll)
+                    for held in pre_roll:
+                        yield held
+                    pre_roll.clear()
+                sent += 1
+                yield frame
+        if vad.triggered and buffer:
+            sent += 1
+            yield bytes(buffer)
+    finally:
+        _LOGGER.debug("VAD sent %d of %d frames", sent, received)
@@ -0,0 +1 @@
+"""Developer tools for running the integration against a local server."""
@@ -0,0 +1,371 @@
+"""Load generator: N simulated users running text and voice turns.
+
+Each user loops over turns against a Xiaozhi server (by default an embedded
+mock server). Text users call send_text() like the conversation entity; voice
+users run the STT entity's path: lease a connection, stream synthetic
+speech PCM through the opus encoder, wait for the STT result, then collect
+and decode the TTS reply.
+
+    python -m devtools.loadgen --users 8 --mode mixed --duration 30 --pool-size 2
+
+Every --interval seconds a line reports throughput, p50/p99 end-to-end turn
+latency, event-loop lag, live FFmpeg processes and RSS, so scaling cliffs
+(connections serialized behind one send lock, an FFmpeg spawn per turn)
+show up as latency growing with --users while throughput stays flat.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import random
+import time
+from collections.abc import AsyncIterator
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from benchmarks._common import load, percentile, sine_pcm
+
+from .mock_server import MockServerConfig, MockXiaozhiServer
+
+arena = load("arena")
+audio = load("audio")
+client_pool = load("client_pool")
+const = load("const")
+ffmpeg_pool = load("ffmpeg_pool")
+models = load("models")
+
+# HA delivers microphone audio in chunks of 1024 samples (64 ms at 16 kHz)
+_CHUNK_BYTES = 2048
+_CHUNK_SECONDS = _CHUNK_BYTES / 2 / const.AUDIO_SAMPLE_RATE_INPUT
+
+# Event-loop lag probe period (seconds)
+_LAG_PROBE_INTERVAL = 0.05
+
+
+@dataclass
+class _Window:
+    """Samples collected since the last report."""
+
+    latencies_ms: list[float] = field(default_factory=list)
+    loop_lag_ms: list[float] = field(default_factory=list)
+    errors: int = 0
+
+
+@dataclass
+class _Totals:
+    """Samples over the whole run."""
+
+    latencies_ms: dict[str, list[float]] = field(
+        default_factory=lambda: {"text": [], "voice": []}
+    )
+    loop_lag_ms: list[float] = field(default_factory=list)
+    errors: dict[str, int] = field(default_factory=dict)
+    max_ffmpeg: int = 0
+    max_rss_mb: float = 0.0
+
+
+class LoadGenerator:
+    """Runs simulated users and reports load metrics."""
+
+    def __init__(
+        self,
+        args: argparse.Namespace,
+        pool: client_pool.XiaozhiClientPool,
+        workers: ffmpeg_pool.FFmpegWorkerPool | None,
+    ) -> None:
+        self._args = args
+        self._pool = pool
+        self._workers = workers
+        self._window = _Window()
+        self._totals = _Totals()
+        self._speech = sine_pcm(args.speech_seconds, const.AUDIO_SAMPLE_RATE_INPUT)
+        self._deadline = 0.0
+        self._random = random.Random(args.seed)
+
+    async def run(self) -> None:
+        """Run all users until the duration elapses, reporting periodically."""
+        args = self._args
+        start = time.perf_counter()
+        self._deadline = start + args.duration
+        probe = asyncio.create_task(self._probe_loop_lag())
+        reporter = asyncio.create_task(self._report_loop(start))
+        try:
+            await asyncio.gather(*(self._user(i) for i in range(args.users)))
+        finally:
+            probe.cancel()
+            reporter.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await asyncio.gather(probe, reporter)
+        self._summary(time.perf_counter() - start)
+
+    # -- Users --------------------------------------------------------------
+
+    async def _user(self, index: int) -> None:
+        mode = self._args.mode
+        if mode == "mixed":
+            mode = "voice" if index % 2 else "text"
+        # Spread user start times over one think time
+        await asyncio.sleep(self._random.uniform(0, self._args.think_time / 1000))
+        while time.perf_counter() < self._deadline:
+            start = time.perf_counter()
+            try:
+                if mode == "voice":
+                    await self._voice_turn()
+                else:
+                    await self._text_turn(index)
+            except Exception as err:  # noqa: BLE001
+                name = type(err).__name__
+                self._totals.errors[name] = self._totals.errors.get(name, 0) + 1
+                self._window.errors += 1
+            else:
+                elapsed = (time.perf_counter() - start) * 1000
+                self._window.latencies_ms.append(elapsed)
+                self._totals.latencies_ms[mode].append(elapsed)
+            await asyncio.sleep(self._args.think_time / 1000)
+
+    async def _text_turn(self, index: int) -> None:
+        decoder = self._decoder()
+        try:
+            _, audio_chunks = await self._pool.send_text(
+                f"user {index}: what time is it?", decoder=decoder
+            )
+            if decoder is not None and audio_chunks:
+                await decoder.wav()
+        finally:
+            if decoder is not None:
+                await decoder.aclose()
+
+    async def _voice_turn(self) -> None:
+        """Mirror XiaozhiSTTEntity.async_process_audio_stream and its collector."""
+        client = await self._pool.acquire()
+        session = models.VoicePipelineSession(self._decoder())
+        client.register_voice_session(session)
+        try:
+            await client.start_listening()
+            uplink = client.choose_uplink_params()
+            if self._workers is not None:
+                self._workers.set_warm(
+                    audio.ffmpeg_uplink_encoder_args(self._pool.uplink_choices())
+                )
+            async for opus_frame in audio.pcm_to_opus_frames(
+                self._mic(),
+                frame_duration_ms=uplink.frame_duration_ms,
+                backend=self._args.codec,
+                pool=self._workers,
+                bitrate=uplink.bitrate,
+            ):
+                await client.send_audio_frame(opus_frame)
+            await client.stop_listening()
+            await asyncio.wait_for(session.stt_event.wait(), const.STT_RESULT_TIMEOUT)
+            if not session.stt_text:
+                raise RuntimeError("empty STT result")
+            await asyncio.wait_for(session.tts_future, const.PIPELINE_COLLECT_TIMEOUT)
+            if session.decoder is not None:
+                await session.decoder.wav()
+        except BaseException:
+            await client.abort(session=session)
+            raise
+        finally:
+            client.unregister_voice_session(session.session_id)
+            self._pool.release(client)
+            if session.decoder is not None:
+                await session.decoder.aclose()
+
+    async def _mic(self) -> AsyncIterator[bytes]:
+        """Yield the synthetic speech in microphone-sized chunks."""
+        for i in range(0, len(self._speech), _CHUNK_BYTES):
+            yield self._speech[i : i + _CHUNK_BYTES]
+            if self._args.realtime:
+                await asyncio.sleep(_CHUNK_SECONDS)
+
+    def _decoder(self) -> audio.IncrementalOpusDecoder | None:
+        if self._args.no_decode:
+            return None
+        return audio.IncrementalOpusDecoder(backend=self._args.codec, pool=self._workers)
+
+    # -- Measurements -------------------------------------------------------
+
+    async def _probe_loop_lag(self) -> None:
+        """Measure how late a periodic sleep wakes up (event-loop lag)."""
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + _LAG_PROBE_INTERVAL
+            await asyncio.sleep(_LAG_PROBE_INTERVAL)
+            lag = max(loop.time() - expected, 0.0) * 1000
+            self._window.loop_lag_ms.append(lag)
+            self._totals.loop_lag_ms.append(lag)
+
+    async def _report_loop(self, start: float) -> None:
+        print(
+            f"{'t(s)':>6} {'turns/s':>8} {'p50 ms':>9} {'p99 ms':>9} "
+            f"{'lag p99':>8} {'lag max':>8} {'ffmpeg':>6} {'rss MB':>7} {'err':>4}"
+        )
+        while True:
+            await asyncio.sleep(self._args.interval)
+            window, self._window = self._window, _Window()
+            ffmpeg = _ffmpeg_processes()
+            rss = _rss_mb()
+            self._totals.max_ffmpeg = max(self._totals.max_ffmpeg, ffmpeg or 0)
+            self._totals.max_rss_mb = max(self._totals.max_rss_mb, rss or 0.0)
+            lat = window.latencies_ms
+            lag = window.loop_lag_ms
+            print(
+                f"{time.perf_counter() - start:6.1f} "
+                f"{len(lat) / self._args.interval:8.2f} "
+                f"{percentile(lat, 50):9.1f} {percentile(lat, 99):9.1f} "
+                f"{percentile(lag, 99):8.1f} {max(lag, default=0.0):8.1f} "
+                f"{_fmt(ffmpeg):>6} {_fmt(rss):>7} {window.errors:4d}"
+            )
+
+    def _summary(self, wall: float) -> None:
+        totals = self._totals
+        turns = sum(len(values) for values in totals.latencies_ms.values())
+        summary = {
+            "users": self._args.users,
+            "mode": self._args.mode,
+            "wall_s": round(wall, 2),
+            "turns": turns,
+            "throughput_turns_s": round(turns / wall, 2),
+            "latency_ms": {
+                mode: {
+                    "count": len(values),
+                    "p50": round(percentile(values, 50), 1),
+                    "p99": round(percentile(values, 99), 1),
+                }
+                for mode, values in totals.latencies_ms.items()
+                if values
+            },
+            "loop_lag_ms": {
+                "p99": round(percentile(totals.loop_lag_ms, 99), 1),
+                "max": round(max(totals.loop_lag_ms, default=0.0), 1),
+            },
+            "errors": totals.errors,
+            "max_ffmpeg_processes": totals.max_ffmpeg,
+            "max_rss_mb": round(totals.max_rss_mb, 1),
+            "connection_pool": self._pool.stats,
+            "uplink": [client.uplink.as_dict() for client in self._pool.clients],
+            "audio_memory": arena.AUDIO_MEMORY.as_dict(),
+            "ffmpeg_pool": self._workers.stats if self._workers else None,
+        }
+        print(json.dumps(summary, indent=2))
+
+
+def _ffmpeg_processes() -> int | None:
+    """Count live ffmpeg child processes (Linux /proc only)."""
+    proc = Path("/proc")
+    if not proc.is_dir():
+        return None
+    pid = str(os.getpid())
+    count = 0
+    for stat in proc.glob("[0-9]*/stat"):
+        try:
+            fields = stat.read_text().split()
+        except OSError:
+            continue
+        # fields: pid (comm) state ppid ...
+        if fields[1] == "(ffmpeg)" and fields[3] == pid:
+            count += 1
+    return count
+
+
+def _rss_mb() -> float | None:
+    """Return this process's resident set size in MB (Linux /proc only)."""
+    try:
+        pages = int(Path("/proc/self/statm").read_text().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return pages * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+
+
+def _fmt(value: float | None) -> str:
+    if value is None:
+        return "n/a"
+    return f"{value:.0f}" if isinstance(value, int) else f"{value:.1f}"
+
+
+async def _main(args: argparse.Namespace) -> None:
+    server: MockXiaozhiServer | None = None
+    url = args.url
+    if url is None:
+        server = MockXiaozhiServer(
+            MockServerConfig(
+                port=0,
+                stt_latency_ms=args.mock_latency / 2,
+                latency_ms=args.mock_latency,
+                jitter_ms=args.mock_jitter,
+                reply_seconds=args.reply_seconds,
+                seed=args.seed,
+            )
+        )
+        await server.start()
+        url = server.url
+
+    workers: ffmpeg_pool.FFmpegWorkerPool | None = None
+    if args.ffmpeg_pool:
+        workers = ffmpeg_pool.FFmpegWorkerPool(args.ffmpeg_pool)
+        await workers.async_start(prewarm=[audio.ffmpeg_decoder_args()])
+
+    config = models.XiaozhiConfig(
+        server_url=url,
+        access_token=args.token,
+        device_id="loadgen",
+        client_id="loadgen",
+        response_timeout=args.response_timeout,
+    )
+    pool = client_pool.XiaozhiClientPool(config, args.pool_size)
+    if workers is not None:
+        workers.set_warm(audio.ffmpeg_uplink_encoder_args(pool.uplink_choices()))
+    await pool.connect()
+    print(
+        f"{args.users} {args.mode} user(s) → {url} "
+        f"(pool={pool.size}, codec={args.codec}, ffmpeg pool={args.ffmpeg_pool})"
+    )
+    try:
+        await LoadGenerator(args, pool, workers).run()
+    finally:
+        await pool.disconnect()
+        if workers is not None:
+            await workers.async_stop()
+        if server is not None:
+            print(f"mock server: {json.dumps(server.stats.as_dict())}")
+            await server.stop()
+
+
+def main() -> None:
+    """Parse arguments and run the load test."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="server URL (default: embedded mock server)")
+    parser.add_argument("--token", default="")
+    parser.add_argument("--users", type=int, default=4)
+    parser.add_argument("--mode", choices=["text", "voice", "mixed"], default="mixed")
+    parser.add_argument("--duration", type=float, default=20.0, metavar="S")
+    parser.add_argument("--interval", type=float, default=2.0, metavar="S")
+    parser.add_argument("--think-time", type=float, default=200.0, metavar="MS")
+    parser.add_argument("--pool-size", type=int, default=1)
+    parser.add_argument(
+        "--codec",
+        choices=[
+            const.CODEC_BACKEND_AUTO,
+            const.CODEC_BACKEND_LIBOPUS,
+            const.CODEC_BACKEND_FFMPEG,
+        ],
+        default=const.CODEC_BACKEND_AUTO,
+    )
+    parser.add_argument("--ffmpeg-pool", type=int, default=0, metavar="N")
+    parser.add_argument("--no-decode", action="store_true", help="skip reply decoding")
+    parser.add_argument("--speech-seconds", type=float, default=2.0)
+    parser.add_argument("--realtime", action="store_true", help="pace mic audio in real time")
+    parser.add_argument("--response-timeout", type=int, default=30)
+    parser.add_argument("--reply-seconds", type=float, default=3.0, help="mock reply audio")
+    parser.add_argument("--mock-latency", type=float, default=200.0, metavar="MS")
+    parser.add_argument("--mock-jitter", type=float, default=50.0, metavar="MS")
+    parser.add_argument("--seed", type=int)
+    asyncio.run(_main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
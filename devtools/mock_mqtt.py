@@ -0,0 +1,236 @@
+"""MQTT + UDP front end for the mock Xiaozhi server.
+
+Connects to an MQTT broker (e.g. a local Mosquitto) as the server side and
+serves every device that publishes a hello. Each device gets its own
+session of the mock protocol, with an AES-128-CTR key and nonce for the UDP
+audio channel announced in the hello reply, exactly like the cloud's MQTT
+gateway. Devices publish to "<prefix>/<device>/up" and are answered on
+"<prefix>/<device>/down"; use those as the publish and subscribe topics.
+
+    mosquitto -p 1883 &
+    python -m devtools.mock_server --mqtt 127.0.0.1:1883 --echo
+
+UDP packets are matched to their session by the connection id in bytes
+4-8 of the nonce; the device's address is learned from its first packet.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import struct
+import time
+from typing import TYPE_CHECKING, Any
+
+import paho.mqtt.client as mqtt
+from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+from paho.mqtt.enums import CallbackAPIVersion
+
+from benchmarks._common import load
+
+if TYPE_CHECKING:
+    from .mock_server import MockXiaozhiServer
+
+audio = load("audio")
+const = load("const")
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def _crypt(key: bytes, nonce: bytes, data: bytes) -> bytes:
+    return Cipher(algorithms.AES(key), modes.CTR(nonce)).encryptor().update(data)
+
+
+class _Session:
+    """One device's session, shaped like a server-side WebSocket."""
+
+    def __init__(
+        self, frontend: MqttUdpFrontend, device: str, connection_id: int
+    ) -> None:
+        self.device = device
+        self.key = os.urandom(16)
+        # type, flags, size, connection id, timestamp, sequence
+        self.nonce = struct.pack(">BBHIII", const.UDP_PACKET_TYPE_AUDIO, 0, 0, connection_id, 0, 0)
+        self.addr: tuple[str, int] | None = None
+        self.inbox: asyncio.Queue[str | bytes | None] = asyncio.Queue()
+        self._frontend = frontend
+        self._sequence = 0
+        self._started = time.monotonic()
+        self.task: asyncio.Task[None] | None = None
+
+    async def recv(self) -> str | bytes:
+        message = await self.inbox.get()
+        if message is None:
+            raise ConnectionError("session ended")
+        return message
+
+    async def __aiter__(self):  # noqa: ANN204
+        while (message := await self.inbox.get()) is not None:
+            yield message
+
+    async def send(self, message: str | bytes) -> None:
+        if isinstance(message, str):
+            self._frontend.publish(self.device, message)
+            return
+        packet = audio.unpack_audio_frame(message)
+        if packet is None:
+            return
+        if self.addr is None:
+            # The device hasn't sent a UDP packet yet; nowhere to send audio
+            self._frontend.udp_unroutable += 1
+            return
+        self._sequence += 1
+        timestamp = int((time.monotonic() - self._started) * 1000) & 0xFFFFFFFF
+        nonce = bytearray(self.nonce)
+        struct.pack_into(">H", nonce, 2, len(packet))
+        struct.pack_into(">II", nonce, 8, timestamp, self._sequence)
+        self._frontend.sendto(bytes(nonce) + _crypt(self.key, bytes(nonce), packet), self.addr)
+
+    async def close(self, code: int = 1000, reason: str = "") -> None:
+        if self._frontend.end_session(self):
+            self.publish_goodbye()
+        self.inbox.put_nowait(None)
+
+    def publish_goodbye(self) -> None:
+        self._frontend.publish(
+            self.device, json.dumps({"type": const.MSG_TYPE_GOODBYE})
+        )
+
+    def datagram(self, data: bytes, addr: tuple[str, int]) -> None:
+        self.addr = addr
+        payload = _crypt(self.key, data[: const.UDP_NONCE_SIZE], data[const.UDP_NONCE_SIZE :])
+        if payload:
+            self.inbox.put_nowait(audio.pack_audio_frame(payload))
+
+
+class _UdpEndpoint(asyncio.DatagramProtocol):
+    def __init__(self, frontend: MqttUdpFrontend) -> None:
+        self._frontend = frontend
+
+    def datagram_received(self, data: bytes, addr: tuple[str, int]) -> None:
+        if len(data) < const.UDP_NONCE_SIZE or data[0] != const.UDP_PACKET_TYPE_AUDIO:
+            return
+        (connection_id,) = struct.unpack_from(">I", data, 4)
+        session = self._frontend.sessions_by_id.get(connection_id)
+        if session is not None:
+            session.datagram(data, addr)
+
+
+class MqttUdpFrontend:
+    """Serves mock sessions to devices over an MQTT broker and UDP."""
+
+    def __init__(self, server: MockXiaozhiServer) -> None:
+        """Initialize from the server's config (mqtt_broker, mqtt_prefix, udp_port)."""
+        config = server.config
+        assert config.mqtt_broker is not None
+        self._server = server
+        host, _, port = config.mqtt_broker.partition(":")
+        self._broker = (host, int(port or 1883))
+        self._prefix = config.mqtt_prefix
+        self._loop = asyncio.get_running_loop()
+        self._client = mqtt.Client(
+            CallbackAPIVersion.VERSION2,
+            client_id=f"xiaozhi-mock-{os.getpid()}",
+            protocol=mqtt.MQTTv311,
+        )
+        self._client.on_message = self._on_message
+        self._udp: asyncio.DatagramTransport | None = None
+        self.udp_port = 0
+        self._next_id = 1
+        self.sessions: dict[str, _Session] = {}
+        self.sessions_by_id: dict[int, _Session] = {}
+        self.udp_unroutable = 0
+
+    async def start(self) -> None:
+        """Open the UDP endpoint and start consuming device messages."""
+        config = self._server.config
+        self._udp, _ = await self._loop.create_datagram_endpoint(
+            lambda: _UdpEndpoint(self), local_addr=(config.host, config.udp_port)
+        )
+        self.udp_port = self._udp.get_extra_info("sockname")[1]
+        await self._loop.run_in_executor(None, self._client.connect, *self._broker)
+        self._client.subscribe(f"{self._prefix}/+/up")
+        self._client.loop_start()
+        _LOGGER.info(
+            "Serving MQTT devices on %s:%d (%s/<device>/up), UDP audio on port %d",
+            *self._broker, self._prefix, self.udp_port,
+        )
+
+    async def stop(self) -> None:
+        """End all sessions and disconnect."""
+        for session in list(self.sessions.values()):
+            await session.close()
+            if session.task is not None:
+                with contextlib.suppress(asyncio.CancelledError):
+                    await session.task
+        self._client.disconnect()
+        await self._loop.run_in_executor(None, self._client.loop_stop)
+        if self._udp is not None:
+            self._udp.close()
+
+    def publish(self, device: str, message: str) -> None:
+        """Send a message to a device."""
+        self._client.publish(f"{self._prefix}/{device}/down", message)
+
+    def sendto(self, data: bytes, addr: tuple[str, int]) -> None:
+        """Send a UDP packet."""
+        if self._udp is not None:
+            self._udp.sendto(data, addr)
+
+    def end_session(self, session: _Session) -> bool:
+        """Forget a session; returns False if it had already ended."""
+        if self.sessions.get(session.device) is not session:
+            return False
+        del self.sessions[session.device]
+        self.sessions_by_id.pop(struct.unpack_from(">I", session.nonce, 4)[0], None)
+        return True
+
+    def _on_message(
+        self, client: mqtt.Client, userdata: Any, message: mqtt.MQTTMessage
+    ) -> None:
+        device = message.topic.split("/")[-2]
+        payload = message.payload.decode(errors="replace")
+        self._loop.call_soon_threadsafe(self._dispatch, device, payload)
+
+    def _dispatch(self, device: str, payload: str) -> None:
+        try:
+            msg_type = json.loads(payload).get("type")
+        except (json.JSONDecodeError, AttributeError):
+            return
+        session = self.sessions.get(device)
+        if msg_type == const.MSG_TYPE_HELLO:
+            if session is not None:
+                self.end_session(session)
+                session.inbox.put_nowait(None)
+            self._start_session(device, payload)
+        elif msg_type == const.MSG_TYPE_GOODBYE:
+            if session is not None and self.end_session(session):
+                session.inbox.put_nowait(None)
+        elif session is not None:
+            session.inbox.put_nowait(payload)
+
+    def _start_session(self, device: str, hello: str) -> None:
+        connection_id = self._next_id
+        self._next_id += 1
+        session = _Session(self, device, connection_id)
+        self.sessions[device] = session
+        self.sessions_by_id[connection_id] = session
+        session.inbox.put_nowait(hello)
+        host = self._server.config.host
+        session.task = self._loop.create_task(
+            self._server.serve_session(
+                session,
+                {
+                    "transport": "udp",
+                    "udp": {
+                        "server": host,
+                        "port": self.udp_port,
+                        "key": session.key.hex(),
+                        "nonce": session.nonce.hex(),
+                    },
+                },
+            )
+        )
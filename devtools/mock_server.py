@@ -0,0 +1,558 @@
+"""Local stand-in for the Xiaozhi server, for offline end-to-end testing.
+
+Speaks the same WebSocket protocol as the cloud server: hello handshake,
+`listen` detect (text) and start/stop (voice), `stt`, `tts`
+start/sentence_start/stop with Protocol V3 binary opus frames, `abort`, and
+server-initiated MCP `initialize`/`tools/list`/`tools/call` round trips.
+Replies can be slowed down, jittered, partly dropped or cut off by a
+disconnect, so reconnects and pipeline latency can be measured locally.
+
+    python -m devtools.mock_server --port 8765 --latency 300 --jitter 100
+
+Then point the integration (server URL) at ws://<host>:8765/xiaozhi/v1/.
+Turns are answered one at a time per connection, in order, like the real
+server; `abort` ends the current turn with a `tts stop`.
+
+With --mqtt BROKER the same sessions are also served over MQTT + UDP (see
+devtools.mock_mqtt), and --echo answers voice turns with the caller's own
+audio, which makes the server a UDP echo stand-in.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import itertools
+import json
+import logging
+import random
+import time
+import uuid
+from collections.abc import AsyncIterator
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any
+
+from websockets.asyncio.server import Server, ServerConnection, serve
+from websockets.exceptions import ConnectionClosed
+
+from benchmarks._common import load, sine_pcm
+
+if TYPE_CHECKING:
+    from .mock_mqtt import MqttUdpFrontend
+
+audio = load("audio")
+const = load("const")
+
+_LOGGER = logging.getLogger(__name__)
+
+# CELT silence (20 ms), used as reply audio when no opus encoder is available
+_SILENCE_PACKET = bytes((0xF8, 0xFF, 0xFE))
+_SILENCE_PACKET_MS = 20
+
+_PCM_CHUNK_BYTES = 4096
+
+
+@dataclass
+class MockServerConfig:
+    """Behaviour of the mock server.
+
+    Latencies are in milliseconds; every delay is latency ± jitter. A
+    dropped message is silently not sent. A disconnect closes the
+    connection in the middle of a reply.
+    """
+
+    host: str = "127.0.0.1"
+    port: int = 8765
+    access_token: str | None = None
+    stt_text: str = "What time is it?"
+    reply_sentences: list[str] = field(
+        default_factory=lambda: ["It is noon.", "Have a nice day."]
+    )
+    reply_seconds: float = 2.0
+    stt_latency_ms: float = 200.0
+    latency_ms: float = 300.0
+    jitter_ms: float = 0.0
+    realtime: bool = False
+    drop_rate: float = 0.0
+    disconnect_rate: float = 0.0
+    mcp: bool = False
+    mcp_tool: str | None = None
+    mcp_arguments: dict[str, Any] = field(default_factory=dict)
+    mcp_timeout: float = 10.0
+    echo: bool = False
+    mqtt_broker: str | None = None
+    mqtt_prefix: str = "xiaozhi"
+    udp_port: int = 0
+    seed: int | None = None
+
+
+@dataclass
+class MockServerStats:
+    """Counters across all connections."""
+
+    connections: int = 0
+    text_turns: int = 0
+    voice_turns: int = 0
+    aborts: int = 0
+    audio_frames_in: int = 0
+    audio_frames_out: int = 0
+    dropped: int = 0
+    disconnects: int = 0
+    mcp_requests: int = 0
+    mcp_errors: int = 0
+    mcp_rtt_ms: list[float] = field(default_factory=list)
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the counters, with the MCP round-trip average."""
+        rtts = self.mcp_rtt_ms
+        return {
+            "connections": self.connections,
+            "text_turns": self.text_turns,
+            "voice_turns": self.voice_turns,
+            "aborts": self.aborts,
+            "audio_frames_in": self.audio_frames_in,
+            "audio_frames_out": self.audio_frames_out,
+            "dropped": self.dropped,
+            "disconnects": self.disconnects,
+            "mcp_requests": self.mcp_requests,
+            "mcp_errors": self.mcp_errors,
+            "mcp_rtt_avg_ms": round(sum(rtts) / len(rtts), 2) if rtts else 0.0,
+        }
+
+
+class _Disconnect(Exception):
+    """Raised to cut the connection off mid-reply."""
+
+
+class MockXiaozhiServer:
+    """Mock Xiaozhi WebSocket server.
+
+    Use as an async context manager, or call start() and stop().
+    """
+
+    def __init__(self, config: MockServerConfig | None = None) -> None:
+        """Initialize the server (not yet listening)."""
+        self.config = config or MockServerConfig()
+        self.stats = MockServerStats()
+        self.random = random.Random(self.config.seed)
+        self._server: Server | None = None
+        self._mqtt: MqttUdpFrontend | None = None
+        # Reply audio, split across the reply sentences
+        self.reply_packets: list[bytes] = []
+        self.packet_ms = _SILENCE_PACKET_MS
+        # Tools the last client listed over MCP
+        self.tools: list[dict[str, Any]] = []
+
+    async def __aenter__(self) -> MockXiaozhiServer:
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        await self.stop()
+
+    @property
+    def url(self) -> str:
+        """Return the ws:// URL clients should connect to."""
+        port = self.config.port
+        if self._server is not None:
+            port = next(iter(self._server.sockets)).getsockname()[1]
+        return f"ws://{self.config.host}:{port}/xiaozhi/v1/"
+
+    async def start(self) -> None:
+        """Prepare reply audio and start listening (port 0 picks a free port)."""
+        await self._build_reply_audio()
+        self._server = await serve(
+            self._handle_connection, self.config.host, self.config.port
+        )
+        _LOGGER.info("Mock Xiaozhi server listening on %s", self.url)
+        if self.config.mqtt_broker:
+            # paho-mqtt and cryptography are only needed for this mode
+            from .mock_mqtt import MqttUdpFrontend
+
+            self._mqtt = MqttUdpFrontend(self)
+            await self._mqtt.start()
+
+    async def stop(self) -> None:
+        """Close all connections and stop listening."""
+        if self._mqtt is not None:
+            await self._mqtt.stop()
+            self._mqtt = None
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _build_reply_audio(self) -> None:
+        """Encode a tone as the reply audio, or fall back to silence packets."""
+        sample_rate = const.AUDIO_SAMPLE_RATE_OUTPUT
+        pcm = sine_pcm(self.config.reply_seconds, sample_rate, freq=220.0)
+
+        async def _chunks() -> AsyncIterator[bytes]:
+            for i in range(0, len(pcm), _PCM_CHUNK_BYTES):
+                yield pcm[i : i + _PCM_CHUNK_BYTES]
+
+        try:
+            self.reply_packets = [
+                packet
+                async for packet in audio.pcm_to_opus_frames(
+                    _chunks(), sample_rate=sample_rate
+                )
+            ]
+            self.packet_ms = const.AUDIO_FRAME_DURATION_MS
+        except Exception:  # noqa: BLE001
+            _LOGGER.warning("No opus encoder available, replying with silence")
+            self.reply_packets = []
+        if not self.reply_packets:
+            count = int(self.config.reply_seconds * 1000 / _SILENCE_PACKET_MS)
+            self.reply_packets = [_SILENCE_PACKET] * max(count, 1)
+            self.packet_ms = _SILENCE_PACKET_MS
+
+    # -- Connection ---------------------------------------------------------
+
+    async def _handle_connection(self, ws: ServerConnection) -> None:
+        """Serve one client connection."""
+        headers = ws.request.headers if ws.request else {}
+        token = self.config.access_token
+        if token is not None and headers.get("Authorization") != f"Bearer {token}":
+            _LOGGER.info("Rejecting connection with a bad access token")
+            await ws.close(4001, "unauthorized")
+            return
+        await self.serve_session(ws)
+
+    async def serve_session(
+        self, ws: Any, hello_fields: dict[str, Any] | None = None
+    ) -> None:
+        """Run the protocol over one client connection.
+
+        ws is a WebSocket connection or a stand-in with the same send,
+        recv, close and async iteration calls; hello_fields are merged
+        into the server hello (e.g. the UDP audio channel).
+        """
+        self.stats.connections += 1
+        conn = _Connection(self, ws, hello_fields)
+        try:
+            await conn.run()
+        except (ConnectionClosed, ConnectionError):
+            pass
+        finally:
+            await conn.close()
+
+    async def delay(self, latency_ms: float) -> None:
+        """Sleep latency ± jitter milliseconds."""
+        jitter = self.config.jitter_ms
+        delay = latency_ms + self.random.uniform(-jitter, jitter)
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+
+    def roll(self, rate: float) -> bool:
+        """Return True with probability rate."""
+        return rate > 0 and self.random.random() < rate
+
+
+class _Connection:
+    """State of one client connection: its turn queue and MCP calls."""
+
+    def __init__(
+        self,
+        server: MockXiaozhiServer,
+        ws: ServerConnection,
+        hello_fields: dict[str, Any] | None = None,
+    ) -> None:
+        self._server = server
+        self._config = server.config
+        self._stats = server.stats
+        self._ws = ws
+        self._hello_fields = hello_fields or {}
+        self._session_id = uuid.uuid4().hex
+        # (mode, text, uplink audio) per queued turn
+        self._turns: asyncio.Queue[tuple[str, str, list[bytes]]] = asyncio.Queue()
+        self._reply_task: asyncio.Task[None] | None = None
+        self._worker: asyncio.Task[None] | None = None
+        self._mcp_task: asyncio.Task[None] | None = None
+        self._mcp_ids = itertools.count(1)
+        self._mcp_waiters: dict[int, asyncio.Future[dict[str, Any]]] = {}
+        self._listening = False
+        self._uplink: list[bytes] = []
+
+    async def run(self) -> None:
+        """Handshake, then read client messages until the connection closes."""
+        if not await self._hello():
+            return
+        self._worker = asyncio.create_task(self._process_turns())
+        if self._config.mcp:
+            self._mcp_task = asyncio.create_task(self._mcp_setup())
+        async for message in self._ws:
+            if isinstance(message, bytes):
+                self._handle_audio(message)
+            else:
+                self._handle_text(json.loads(message))
+
+    async def close(self) -> None:
+        """Stop background tasks."""
+        for task in (self._worker, self._mcp_task):
+            if task is not None:
+                task.cancel()
+                with contextlib.suppress(asyncio.CancelledError, Exception):
+                    await task
+        for waiter in self._mcp_waiters.values():
+            if not waiter.done():
+                waiter.cancel()
+
+    async def _hello(self) -> bool:
+        """Answer the client hello; returns False if it didn't send one."""
+        message = json.loads(await self._ws.recv())
+        if message.get("type") != const.MSG_TYPE_HELLO:
+            await self._ws.close(4000, "expected hello")
+            return False
+        await self._ws.send(
+            json.dumps(
+                {
+                    "type": const.MSG_TYPE_HELLO,
+                    "transport": "websocket",
+                    "session_id": self._session_id,
+                    "audio_params": {
+                        "format": "opus",
+                        "sample_rate": const.AUDIO_SAMPLE_RATE_OUTPUT,
+                        "channels": const.AUDIO_CHANNELS,
+                        "frame_duration": const.AUDIO_FRAME_DURATION_MS,
+                    },
+                    **self._hello_fields,
+                }
+            )
+        )
+        return True
+
+    def _handle_audio(self, data: bytes) -> None:
+        # Over MQTT + UDP audio can trail the listen stop; late frames still
+        # join the turn's uplink, which is read when the reply starts
+        packet = audio.unpack_audio_frame(data)
+        if packet:
+            self._uplink.append(packet)
+            self._stats.audio_frames_in += 1
+
+    def _handle_text(self, message: dict[str, Any]) -> None:
+        msg_type = message.get("type")
+        if msg_type == const.MSG_TYPE_LISTEN:
+            state = message.get("state")
+            if state == const.LISTEN_STATE_DETECT:
+                self._turns.put_nowait(("text", message.get("text", ""), []))
+            elif state == const.LISTEN_STATE_START:
+                self._listening = True
+                self._uplink = []
+            elif state == const.LISTEN_STATE_STOP and self._listening:
+                self._listening = False
+                self._turns.put_nowait(("voice", "", self._uplink))
+        elif msg_type == const.MSG_TYPE_ABORT:
+            self._stats.aborts += 1
+            if self._reply_task is not None and not self._reply_task.done():
+                self._reply_task.cancel()
+        elif msg_type == const.MSG_TYPE_MCP:
+            payload = message.get("payload") or {}
+            waiter = self._mcp_waiters.pop(payload.get("id"), None)
+            if waiter is not None and not waiter.done():
+                waiter.set_result(payload)
+
+    # -- Turns --------------------------------------------------------------
+
+    async def _process_turns(self) -> None:
+        """Answer queued turns one at a time."""
+        while True:
+            mode, text, uplink = await self._turns.get()
+            self._reply_task = asyncio.create_task(self._reply(mode, text, uplink))
+            try:
+                await self._reply_task
+            except asyncio.CancelledError:
+                if asyncio.current_task().cancelling():
+                    raise
+                # Aborted: the stream still ends with a stop
+                await self._send_json({"type": const.MSG_TYPE_TTS, "state": "stop"})
+            except _Disconnect:
+                self._stats.disconnects += 1
+                await self._ws.close(1011, "mock disconnect")
+                return
+
+    async def _reply(self, mode: str, text: str, uplink: list[bytes]) -> None:
+        if mode == "voice":
+            self._stats.voice_turns += 1
+            await self._server.delay(self._config.stt_latency_ms)
+            text = self._config.stt_text
+            await self._send_json({"type": const.MSG_TYPE_STT, "text": text})
+        else:
+            self._stats.text_turns += 1
+
+        if self._config.mcp_tool:
+            # The LLM calls a tool before answering
+            with contextlib.suppress(asyncio.TimeoutError):
+                await self._mcp_call(
+                    "tools/call",
+                    {
+                        "name": self._config.mcp_tool,
+                        "arguments": self._config.mcp_arguments,
+                    },
+                )
+
+        await self._server.delay(self._config.latency_ms)
+        await self._send_json({"type": const.MSG_TYPE_TTS, "state": "start"})
+
+        sentences = self._config.reply_sentences or [f"You said: {text}"]
+        packets = uplink if self._config.echo and uplink else self._server.reply_packets
+        per_sentence = max(len(packets) // len(sentences), 1)
+        disconnect_at = (
+            self._server.random.randrange(len(sentences))
+            if self._server.roll(self._config.disconnect_rate)
+            else -1
+        )
+        for index, sentence in enumerate(sentences):
+            if index:
+                await self._server.delay(self._config.latency_ms / 2)
+            await self._send_json(
+                {
+                    "type": const.MSG_TYPE_TTS,
+                    "state": const.TTS_STATE_SENTENCE_START,
+                    "text": sentence,
+                }
+            )
+            if index == disconnect_at:
+                raise _Disconnect
+            start = index * per_sentence
+            end = len(packets) if index == len(sentences) - 1 else start + per_sentence
+            for packet in packets[start:end]:
+                await self._send(audio.pack_audio_frame(packet))
+                self._stats.audio_frames_out += 1
+                if self._config.realtime:
+                    await asyncio.sleep(self._server.packet_ms / 1000)
+        await self._send_json({"type": const.MSG_TYPE_TTS, "state": const.TTS_STATE_STOP})
+
+    # -- MCP ----------------------------------------------------------------
+
+    async def _mcp_setup(self) -> None:
+        """Initialize MCP and list the client's tools, like the server does."""
+        try:
+            await self._mcp_call(
+                "initialize",
+                {"protocolVersion": "2024-11-05", "capabilities": {}},
+            )
+            result = await self._mcp_call("tools/list", {})
+        except (asyncio.TimeoutError, ConnectionClosed):
+            return
+        self._server.tools = result.get("result", {}).get("tools", [])
+        _LOGGER.info("Client lists %d MCP tool(s)", len(self._server.tools))
+
+    async def _mcp_call(self, method: str, params: dict[str, Any]) -> dict[str, Any]:
+        """Send an MCP request to the client and wait for its response."""
+        request_id = next(self._mcp_ids)
+        waiter: asyncio.Future[dict[str, Any]] = (
+            asyncio.get_running_loop().create_future()
+        )
+        self._mcp_waiters[request_id] = waiter
+        self._stats.mcp_requests += 1
+        start = time.perf_counter()
+        await self._ws.send(
+            json.dumps(
+                {
+                    "session_id": self._session_id,
+                    "type": const.MSG_TYPE_MCP,
+                    "payload": {
+                        "jsonrpc": "2.0",
+                        "id": request_id,
+                        "method": method,
+                        "params": params,
+                    },
+                }
+            )
+        )
+        try:
+            response = await asyncio.wait_for(waiter, self._config.mcp_timeout)
+        except asyncio.TimeoutError:
+            self._stats.mcp_errors += 1
+            self._mcp_waiters.pop(request_id, None)
+            _LOGGER.warning("MCP %s got no response", method)
+            raise
+        self._stats.mcp_rtt_ms.append((time.perf_counter() - start) * 1000)
+        if "error" in response:
+            self._stats.mcp_errors += 1
+            _LOGGER.info("MCP %s error: %s", method, response["error"])
+        return response
+
+    # -- Sending ------------------------------------------------------------
+
+    async def _send_json(self, message: dict[str, Any]) -> None:
+        message.setdefault("session_id", self._session_id)
+        await self._send(json.dumps(message))
+
+    async def _send(self, data: str | bytes) -> None:
+        """Send a reply message, unless the drop rate says to lose it."""
+        if self._server.roll(self._config.drop_rate):
+            self._stats.dropped += 1
+            return
+        await self._ws.send(data)
+
+
+async def _serve(config: MockServerConfig) -> None:
+    async with MockXiaozhiServer(config) as server:
+        print(f"Mock Xiaozhi server on {server.url} (Ctrl+C to stop)")
+        try:
+            await asyncio.Future()
+        finally:
+            print(json.dumps(server.stats.as_dict(), indent=2))
+
+
+def main() -> None:
+    """Parse arguments and run the server until interrupted."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--token", help="required access token (default: any)")
+    parser.add_argument("--stt-text", default=MockServerConfig.stt_text)
+    parser.add_argument(
+        "--sentence", action="append", dest="sentences", metavar="TEXT",
+        help="reply sentence (repeatable)",
+    )
+    parser.add_argument("--reply-seconds", type=float, default=2.0)
+    parser.add_argument("--stt-latency", type=float, default=200.0, metavar="MS")
+    parser.add_argument("--latency", type=float, default=300.0, metavar="MS")
+    parser.add_argument("--jitter", type=float, default=0.0, metavar="MS")
+    parser.add_argument("--realtime", action="store_true", help="pace audio in real time")
+    parser.add_argument("--drop", type=float, default=0.0, metavar="RATE")
+    parser.add_argument("--disconnect", type=float, default=0.0, metavar="RATE")
+    parser.add_argument("--mcp", action="store_true", help="list client tools on connect")
+    parser.add_argument("--mcp-tool", help="call this tool at the start of every turn")
+    parser.add_argument("--mcp-args", default="{}", help="tool arguments (JSON)")
+    parser.add_argument("--echo", action="store_true", help="reply with the voice uplink")
+    parser.add_argument("--mqtt", metavar="HOST[:PORT]", help="also serve MQTT + UDP via this broker")
+    parser.add_argument("--mqtt-prefix", default=MockServerConfig.mqtt_prefix)
+    parser.add_argument("--udp-port", type=int, default=0)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("-v", "--verbose", action="store_true")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO)
+    config = MockServerConfig(
+        host=args.host,
+        port=args.port,
+        access_token=args.token,
+        stt_text=args.stt_text,
+        reply_sentences=args.sentences or MockServerConfig().reply_sentences,
+        reply_seconds=args.reply_seconds,
+        stt_latency_ms=args.stt_latency,
+        latency_ms=args.latency,
+        jitter_ms=args.jitter,
+        realtime=args.realtime,
+        drop_rate=args.drop,
+        disconnect_rate=args.disconnect,
+        mcp=args.mcp or bool(args.mcp_tool),
+        mcp_tool=args.mcp_tool,
+        mcp_arguments=json.loads(args.mcp_args),
+        echo=args.echo,
+        mqtt_broker=args.mqtt,
+        mqtt_prefix=args.mqtt_prefix,
+        udp_port=args.udp_port,
+        seed=args.seed,
+    )
+    with contextlib.suppress(KeyboardInterrupt):
+        asyncio.run(_serve(config))
+
+
+if __name__ == "__main__":
+    main()
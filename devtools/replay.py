@@ -0,0 +1,501 @@
+"""Replay a recorded Xiaozhi session without a network.
+
+Recordings are written by the integration when "Record server sessions" is
+enabled (one .xzrec file per pooled connection under
+config/xiaozhi_recordings). The replay runs a real XiaozhiWebSocketClient
+against a stand-in connection that plays back the recorded server frames,
+and re-runs each recorded turn the way the entities do: text turns through
+stream_text() like the conversation entity, voice turns through the STT
+entity's session/collector path with the recorded microphone frames and
+found again by their conversation ID like the conversation entity does, and
+the reply fetched back like the TTS entity: text turns from the pipeline
+cache, voice turns streamed from the live session while they arrive.
+
+    python -m devtools.replay recording.xzrec            # real speed
+    python -m devtools.replay recording.xzrec --fast     # as fast as possible
+
+A recorded server frame is only released once the client has sent the
+frames that preceded it in the recording (hello, listen and audio frames),
+so replies route to the same turns every run. At real speed each frame is
+then held back by its recorded delay; with --fast it is released at once.
+MCP requests are answered with the recorded responses. Aborts are not
+replayed: the turn runs to the recorded tts stop.
+
+The report lists every turn with its latency stages, audio frames, decoded
+size and whether the TTS lookup hit (for voice turns: whether streaming TTS
+found the live session and read all its audio), plus any outbound frame that
+differs from the recording. The exit status is 1 if a turn failed or the
+client diverged from the recording, so a captured incident can be kept as a
+regression test.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+import uuid
+from collections.abc import AsyncIterator
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from benchmarks._common import load
+
+arena = load("arena")
+audio = load("audio")
+client = load("client")
+const = load("const")
+metrics = load("metrics")
+models = load("models")
+recorder = load("recorder")
+
+FrameDirection = recorder.FrameDirection
+FrameKind = recorder.FrameKind
+RecordedFrame = recorder.RecordedFrame
+
+# Divergent outbound frames kept in the report
+_MAX_DIVERGENCES = 10
+
+
+def split_connections(path: Path) -> list[list[RecordedFrame]]:
+    """Return the frames of each recorded connection, in order."""
+    connections: list[list[RecordedFrame]] = []
+    for frame in recorder.read_recording(path):
+        if frame.kind is FrameKind.CONNECT:
+            connections.append([])
+        elif frame.kind is not FrameKind.DISCONNECT and connections:
+            connections[-1].append(frame)
+    return connections
+
+
+def _parse(frame: RecordedFrame) -> dict[str, Any]:
+    if frame.kind is not FrameKind.TEXT:
+        return {}
+    try:
+        data = json.loads(frame.payload)
+    except json.JSONDecodeError:
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def _is_gating(frame: RecordedFrame) -> bool:
+    """Return True for client frames that server frames wait for."""
+    if frame.direction is not FrameDirection.OUTBOUND:
+        return False
+    if frame.kind is FrameKind.BINARY:
+        return True
+    return _parse(frame).get("type") in (const.MSG_TYPE_HELLO, const.MSG_TYPE_LISTEN)
+
+
+class ReplayConnection:
+    """Stand-in for a websockets ClientConnection playing back one connection."""
+
+    def __init__(self, frames: list[RecordedFrame], realtime: bool) -> None:
+        """Schedule the inbound frames behind the outbound frames they follow."""
+        self._realtime = realtime
+        self.expected: list[RecordedFrame] = []
+        # (inbound frame, gating frames that must be sent first, recorded delay)
+        self._inbound: list[tuple[RecordedFrame, int, float]] = []
+        last_gate = frames[0].timestamp if frames else 0.0
+        for frame in frames:
+            if _is_gating(frame):
+                self.expected.append(frame)
+                last_gate = frame.timestamp
+            elif frame.direction is FrameDirection.INBOUND:
+                self._inbound.append(
+                    (frame, len(self.expected), frame.timestamp - last_gate)
+                )
+        self._mcp_responses = {
+            str(payload.get("id")): payload
+            for frame in frames
+            if frame.direction is FrameDirection.OUTBOUND
+            and (data := _parse(frame)).get("type") == const.MSG_TYPE_MCP
+            and isinstance(payload := data.get("payload"), dict)
+        }
+        self._cursor = 0
+        self._sent_at: list[float] = [time.monotonic()]
+        self._progress = asyncio.Event()
+        self._closed = asyncio.Event()
+        self.divergences: list[str] = []
+        self.diverged = 0
+
+    def mcp_response(self, request_id: Any) -> dict[str, Any] | None:
+        """Return the recorded response to an MCP request, if any."""
+        return self._mcp_responses.get(str(request_id))
+
+    async def send(self, message: str | bytes) -> None:
+        """Take a client frame and release the server frames waiting on it."""
+        kind = FrameKind.BINARY if isinstance(message, bytes) else FrameKind.TEXT
+        payload = message if isinstance(message, bytes) else message.encode()
+        frame = RecordedFrame(0.0, FrameDirection.OUTBOUND, kind, payload)
+        if not _is_gating(frame):
+            return
+        index = len(self._sent_at) - 1
+        expected = self.expected[index] if index < len(self.expected) else None
+        if expected is None or not _same_frame(frame, expected):
+            self.diverged += 1
+            if len(self.divergences) < _MAX_DIVERGENCES:
+                self.divergences.append(
+                    f"frame {index}: sent {_describe(frame)}, "
+                    f"recorded {_describe(expected) if expected else 'nothing'}"
+                )
+        self._sent_at.append(time.monotonic())
+        self._progress.set()
+
+    async def recv(self) -> str | bytes:
+        """Return the next server frame (used by the hello handshake)."""
+        message = await self._next()
+        if message is None:
+            raise ConnectionError("Recording ended")
+        return message
+
+    async def __aiter__(self) -> AsyncIterator[str | bytes]:
+        """Yield server frames until the recording ends and the client closes."""
+        while (message := await self._next()) is not None:
+            yield message
+        await self._closed.wait()
+
+    async def _next(self) -> str | bytes | None:
+        if self._cursor >= len(self._inbound):
+            return None
+        frame, gate, delay = self._inbound[self._cursor]
+        while len(self._sent_at) <= gate and not self._closed.is_set():
+            self._progress.clear()
+            await self._progress.wait()
+        if self._closed.is_set():
+            return None
+        if self._realtime:
+            await asyncio.sleep(max(self._sent_at[gate] + delay - time.monotonic(), 0))
+        else:
+            await asyncio.sleep(0)
+        self._cursor += 1
+        return frame.message
+
+    @property
+    def frames_left(self) -> int:
+        """Return how many recorded server frames were never delivered."""
+        return len(self._inbound) - self._cursor
+
+    async def close(self) -> None:
+        """End the connection."""
+        self._closed.set()
+        self._progress.set()
+
+
+def _same_frame(sent: RecordedFrame, recorded: RecordedFrame) -> bool:
+    if sent.kind is not recorded.kind:
+        return False
+    if sent.kind is FrameKind.BINARY:
+        return sent.payload == recorded.payload
+    return _parse(sent) == _parse(recorded)
+
+
+def _describe(frame: RecordedFrame) -> str:
+    if frame.kind is FrameKind.BINARY:
+        return f"binary({len(frame.payload)} bytes)"
+    return frame.payload.decode(errors="replace")[:120]
+
+
+class _ReplayMCPHandler:
+    """Answers MCP requests with the responses the client sent when recorded."""
+
+    def __init__(self, connection: ReplayConnection) -> None:
+        self._connection = connection
+
+    async def handle_request(self, data: dict[str, Any]) -> dict[str, Any] | None:
+        return self._connection.mcp_response(data.get("id"))
+
+
+class ReplayClient(client.XiaozhiWebSocketClient):
+    """XiaozhiWebSocketClient connected to a recording instead of a server."""
+
+    def __init__(self, config: models.XiaozhiConfig, connection: ReplayConnection) -> None:
+        super().__init__(config)
+        self._connection = connection
+        self.set_mcp_handler(_ReplayMCPHandler(connection))
+
+    async def _open_connection(
+        self, url: str, headers: dict[str, str] | None, ssl_context: Any
+    ) -> ReplayConnection:
+        return self._connection
+
+
+@dataclass
+class _Turn:
+    """One recorded turn to re-run."""
+
+    mode: str
+    pause: float
+    text: str = ""
+    language: str | None = None
+    # (seconds since listen start, opus payload) of each microphone frame
+    audio: list[tuple[float, bytes]] = field(default_factory=list)
+
+
+def recorded_turns(frames: list[RecordedFrame]) -> list[_Turn]:
+    """Rebuild the turns the client ran from its outbound frames."""
+    turns: list[_Turn] = []
+    voice: _Turn | None = None
+    start = 0.0
+    previous = frames[0].timestamp if frames else 0.0
+    for frame in frames:
+        if not _is_gating(frame):
+            previous = frame.timestamp
+            continue
+        if frame.kind is FrameKind.BINARY:
+            opus = audio.unpack_audio_frame(frame.payload)
+            if voice is not None and opus is not None:
+                voice.audio.append((frame.timestamp - start, opus))
+            previous = frame.timestamp
+            continue
+        data = _parse(frame)
+        state = data.get("state") if data.get("type") == const.MSG_TYPE_LISTEN else None
+        if state == const.LISTEN_STATE_DETECT:
+            turns.append(
+                _Turn("text", frame.timestamp - previous, data.get("text", ""),
+                      data.get("language"))
+            )
+        elif state == const.LISTEN_STATE_START:
+            voice = _Turn("voice", frame.timestamp - previous, language=data.get("language"))
+            start = frame.timestamp
+            turns.append(voice)
+        elif state == const.LISTEN_STATE_STOP:
+            voice = None
+        previous = frame.timestamp
+    return turns
+
+
+class SessionReplay:
+    """Re-runs one recorded connection and reports each turn."""
+
+    def __init__(self, args: argparse.Namespace, frames: list[RecordedFrame]) -> None:
+        self._args = args
+        self._frames = frames
+        self._connection = ReplayConnection(frames, realtime=not args.fast)
+        self._metrics = metrics.TurnMetrics()
+        self._cache = models.PipelineCacheManager()
+        self.turns: list[dict[str, Any]] = []
+
+    async def run(self) -> dict[str, Any]:
+        """Connect, re-run every turn, and return the report."""
+        hello = next(
+            (_parse(f) for f in self._connection.expected
+             if _parse(f).get("type") == const.MSG_TYPE_HELLO),
+            {},
+        )
+        config = models.XiaozhiConfig(
+            server_url="wss://replay.invalid/",
+            access_token="",
+            device_id="replay",
+            client_id="replay",
+            response_timeout=self._args.response_timeout,
+            language=hello.get("audio_params", {}).get("language"),
+        )
+        ws_client = ReplayClient(config, self._connection)
+        start = time.perf_counter()
+        await ws_client.connect()
+        try:
+            for turn in recorded_turns(self._frames):
+                if not self._args.fast:
+                    await asyncio.sleep(turn.pause)
+                self.turns.append(await self._run_turn(ws_client, turn))
+        finally:
+            await ws_client.disconnect()
+        return {
+            "wall_s": round(time.perf_counter() - start, 3),
+            "turns": self.turns,
+            "failed": sum(1 for turn in self.turns if turn["error"]),
+            "server_frames_left": self._connection.frames_left,
+            "diverged": self._connection.diverged,
+            "divergences": self._connection.divergences,
+            "latency_ms": self._metrics.as_dict()["latency_ms"],
+        }
+
+    async def _run_turn(
+        self, ws_client: ReplayClient, turn: _Turn
+    ) -> dict[str, Any]:
+        timeline = self._metrics.start_turn(turn.mode)
+        decoder = None if self._args.no_decode else audio.IncrementalOpusDecoder(
+            backend=self._args.codec
+        )
+        report: dict[str, Any] = {"mode": turn.mode, "input": turn.text, "error": None}
+        start = time.perf_counter()
+        try:
+            if turn.mode == "text":
+                stt_text, response, chunks = await self._text_turn(
+                    ws_client, turn, decoder, timeline
+                )
+                wav = await decoder.wav() if decoder is not None and chunks else None
+                timeline.mark(metrics.TurnStage.DECODE_DONE)
+                await self._cache.store(stt_text, response, chunks, wav, timeline)
+                # The TTS entity looks the reply up by its text
+                hit = await self._cache.resolve_response(response) is not None
+            else:
+                stt_text, response, chunks, live_frames = await self._voice_turn(
+                    ws_client, turn, decoder, timeline
+                )
+                wav = await decoder.wav() if decoder is not None and chunks else None
+                timeline.mark(metrics.TurnStage.DECODE_DONE)
+                # Streaming TTS read the audio from the live session
+                hit = live_frames == len(chunks) and live_frames > 0
+                if chunks and not hit:
+                    raise RuntimeError(
+                        f"live TTS stream got {live_frames} of {len(chunks)} frames"
+                    )
+            if hit:
+                timeline.mark(metrics.TurnStage.TTS_RETURNED)
+            report.update(
+                input=stt_text,
+                response=response,
+                audio_frames=len(chunks),
+                wav_bytes=len(wav) if wav else 0,
+                cache_hit=hit,
+            )
+        except Exception as err:  # noqa: BLE001
+            report["error"] = f"{type(err).__name__}: {err}"
+        finally:
+            if decoder is not None:
+                await decoder.aclose()
+        report["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        report["stages_ms"] = timeline.as_dict()["stages"]
+        return report
+
+    async def _text_turn(
+        self,
+        ws_client: ReplayClient,
+        turn: _Turn,
+        decoder: audio.IncrementalOpusDecoder | None,
+        timeline: metrics.TurnTimeline,
+    ) -> tuple[str, str, arena.AudioArena]:
+        """Mirror the conversation entity's streamed text turn."""
+        async for event in ws_client.stream_text(
+            turn.text, turn.language, decoder=decoder, timeline=timeline
+        ):
+            if event.type is models.TextStreamEventType.DONE:
+                return turn.text, event.text, event.audio_chunks
+        raise RuntimeError("stream ended without a reply")
+
+    async def _voice_turn(
+        self,
+        ws_client: ReplayClient,
+        turn: _Turn,
+        decoder: audio.IncrementalOpusDecoder | None,
+        timeline: metrics.TurnTimeline,
+    ) -> tuple[str, str, arena.AudioArena, int]:
+        """Mirror XiaozhiSTTEntity.async_process_audio_stream and its collector.
+
+        Streaming TTS runs alongside, as the conversation entity hands the
+        reply over sentence by sentence; returns the audio frames it read.
+        """
+        session = models.VoicePipelineSession(decoder, timeline)
+        ws_client.register_voice_session(session)
+        try:
+            await ws_client.start_listening(turn.language)
+            timeline.mark(metrics.TurnStage.LISTEN_START)
+            started = time.monotonic()
+            for offset, opus in turn.audio:
+                if not self._args.fast:
+                    await asyncio.sleep(max(started + offset - time.monotonic(), 0))
+                await ws_client.send_audio_frame(opus)
+                timeline.mark(metrics.TurnStage.FIRST_UPLINK)
+            await ws_client.stop_listening()
+            timeline.mark(metrics.TurnStage.LISTEN_STOP)
+            await asyncio.wait_for(session.stt_event.wait(), const.STT_RESULT_TIMEOUT)
+            stt_text = session.stt_text
+            if not stt_text:
+                raise RuntimeError("empty STT result")
+            # Each replayed turn is its own pipeline run (conversation)
+            conversation_id = uuid.uuid4().hex
+            collector = await self._cache.create_collector(
+                stt_text, session, conversation_id
+            )
+            if await self._cache.resolve_input(stt_text, conversation_id) is not collector:
+                raise RuntimeError("conversation did not find its voice turn")
+            tts = asyncio.create_task(self._stream_live(session))
+            try:
+                response = await asyncio.wait_for(
+                    session.tts_future, const.PIPELINE_COLLECT_TIMEOUT
+                )
+            finally:
+                # Ending the turn (even by failing) ends its sentences and
+                # audio, so the TTS stream finishes too
+                live_frames = await tts
+            await self._cache.complete_collector(
+                stt_text, response, session.audio_chunks, None, timeline
+            )
+            return stt_text, response, session.audio_chunks, live_frames
+        finally:
+            ws_client.unregister_voice_session(session.session_id)
+
+    async def _stream_live(self, session: models.VoicePipelineSession) -> int:
+        """Mirror XiaozhiTTSEntity's live branch; return the frames it read."""
+        # The TTS entity gets the reply's first sentence from the chat log
+        first = await anext(session.iter_sentences(), None)
+        if first is None:
+            return 0
+        live = await self._cache.find_live_session(first)
+        if live is None:
+            return 0
+        return sum([1 async for _ in live.iter_audio()])
+
+
+def _print_report(index: int, report: dict[str, Any]) -> None:
+    print(f"connection {index}: {len(report['turns'])} turn(s) in {report['wall_s']} s")
+    for turn in report["turns"]:
+        if turn["error"]:
+            outcome = f"FAILED {turn['error']}"
+        else:
+            outcome = (
+                f"{turn['audio_frames']:4d} frames "
+                f"{'hit ' if turn['cache_hit'] else 'MISS'} {turn['response'][:40]!r}"
+            )
+        print(
+            f"  {turn['mode']:5} {turn['elapsed_ms']:9.1f} ms  "
+            f"{turn['input'][:30]!r:34} {outcome}"
+        )
+    for divergence in report["divergences"]:
+        print(f"  diverged: {divergence}")
+
+
+async def _main(args: argparse.Namespace) -> int:
+    connections = split_connections(args.recording)
+    if args.connection is not None:
+        connections = [connections[args.connection]]
+    reports = []
+    for index, frames in enumerate(connections):
+        report = await SessionReplay(args, frames).run()
+        _print_report(index, report)
+        reports.append(report)
+    if args.json:
+        args.json.write_text(json.dumps(reports, indent=2))
+        print(f"report written to {args.json}")
+    failed = any(report["failed"] or report["diverged"] for report in reports)
+    return 1 if failed else 0
+
+
+def main() -> None:
+    """Parse arguments and replay the recording."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("recording", type=Path)
+    parser.add_argument("--fast", action="store_true", help="no recorded delays")
+    parser.add_argument("--connection", type=int, metavar="N", help="replay one connection")
+    parser.add_argument(
+        "--codec",
+        choices=[
+            const.CODEC_BACKEND_AUTO,
+            const.CODEC_BACKEND_LIBOPUS,
+            const.CODEC_BACKEND_FFMPEG,
+        ],
+        default=const.CODEC_BACKEND_AUTO,
+    )
+    parser.add_argument("--no-decode", action="store_true", help="skip reply decoding")
+    parser.add_argument("--response-timeout", type=int, default=30)
+    parser.add_argument("--json", type=Path, metavar="PATH", help="write the report")
+    sys.exit(asyncio.run(_main(parser.parse_args())))
+
+
+if __name__ == "__main__":
+    main()
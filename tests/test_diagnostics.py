@@ -0,0 +1,25 @@
+"""Tests for the diagnostics download's redaction."""
+
+from __future__ import annotations
+
+import pytest
+
+pytest.importorskip("homeassistant")
+
+from homeassistant.components.diagnostics import async_redact_data  # noqa: E402
+
+from custom_components.xiaozhi.const import (  # noqa: E402
+    CONF_MCP_URL,
+    CONF_SERVER_URL,
+)
+from custom_components.xiaozhi.diagnostics import TO_REDACT  # noqa: E402
+
+
+def test_token_bearing_urls_are_redacted() -> None:
+    """No URL with a ?token= secret survives redaction."""
+    entry = {
+        CONF_SERVER_URL: "wss://api.tenclass.net/xiaozhi/v1/?token=server-secret",
+        CONF_MCP_URL: "wss://api.xiaozhi.me/mcp/?token=mcp-secret",
+    }
+    redacted = async_redact_data(entry, TO_REDACT)
+    assert "secret" not in repr(redacted)
@@ -0,0 +1,96 @@
+"""Tests for PipelineCacheManager expiry."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Any
+
+import pytest
+
+from benchmarks._common import load
+
+arena = load("arena")
+const = load("const")
+models = load("models")
+
+
+def _expire_at(
+    monkeypatch: pytest.MonkeyPatch, cache: Any, now: float
+) -> None:
+    """Run the expiry timer as if the clock read now."""
+    with monkeypatch.context() as patch:
+        patch.setattr(time, "monotonic", lambda: now)
+        cache._expire()
+
+
+def test_collector_completes_after_cache_ttl(monkeypatch: pytest.MonkeyPatch) -> None:
+    """A reply arriving between the cache TTL and the collect timeout is kept."""
+    assert const.PIPELINE_CACHE_TTL < 45 < const.PIPELINE_COLLECT_TIMEOUT
+
+    async def run() -> None:
+        cache = models.PipelineCacheManager()
+        session = models.VoicePipelineSession()
+        collector = await cache.create_collector("What time is it?", session)
+        try:
+            _expire_at(monkeypatch, cache, collector.created_at + 45)
+            assert not collector.failed
+            assert await cache.find_live_collector("It is noon.") is None
+            session.add_sentence("It is noon.")
+            assert await cache.find_live_collector("It is noon.") is collector
+
+            await cache.complete_collector(
+                "What time is it?",
+                "It is noon.",
+                arena.AudioArena.from_packets([b"\xf8" * 120]),
+            )
+            assert collector.ready.is_set() and collector.response_text == "It is noon."
+            entry = await cache.resolve_response("It is noon.")
+            assert entry is not None and entry.turn_id == collector.turn_id
+        finally:
+            cache.close()
+
+    asyncio.run(run())
+
+
+def test_collector_fails_after_collect_timeout(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """A collector nobody completes fails once the entities stop waiting."""
+
+    async def run() -> None:
+        cache = models.PipelineCacheManager()
+        collector = await cache.create_collector(
+            "What time is it?", models.VoicePipelineSession()
+        )
+        try:
+            _expire_at(
+                monkeypatch,
+                cache,
+                collector.created_at + const.PIPELINE_COLLECT_TIMEOUT,
+            )
+            assert collector.failed
+            assert await cache.get_collector("What time is it?") is None
+        finally:
+            cache.close()
+
+    asyncio.run(run())
+
+
+def test_entry_expires_before_older_collector() -> None:
+    """An entry stored after a collector still expires after the TTL."""
+
+    async def run() -> None:
+        cache = models.PipelineCacheManager(ttl=0.05, collect_timeout=0.2)
+        collector = await cache.create_collector("What time is it?")
+        try:
+            await cache.store("Hello", "Hi there.", arena.AudioArena())
+            await asyncio.sleep(0.1)
+            assert cache.stats["entries"] == 0
+            assert not collector.failed
+            await asyncio.sleep(0.15)
+            assert collector.failed
+        finally:
+            cache.close()
+
+    asyncio.run(run())